@@ -0,0 +1,15 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent
+
+# Make the tss_model package importable when running pytest from the repo root
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+
+@pytest.fixture
+def scripts_dir():
+    """Directory holding the model artifacts (model_tss_predictor.bst, ...)."""
+    return SCRIPTS_DIR
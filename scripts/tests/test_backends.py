@@ -0,0 +1,40 @@
+import pytest
+
+from tss_model import backends
+
+
+@pytest.fixture
+def fake_hummingbird(monkeypatch):
+    cost = {'gemm': 0.02, 'tree_trav': 0.01}
+
+    def convert(model, n_features, opset, strategy):
+        if strategy not in cost:
+            raise RuntimeError('tree too deep')
+        return strategy.encode()
+
+    def benchmark(onnx_bytes, n_features, batch_sizes, work_dir):
+        return {'ms_per_row': cost[onnx_bytes.decode()] * len(batch_sizes)}
+
+    monkeypatch.setattr(backends, '_hummingbird_convert', convert)
+    monkeypatch.setattr(backends, 'benchmark_strategy', benchmark)
+
+
+def test_auto_strategy_keeps_the_fastest_and_records_why(fake_hummingbird, tmp_path):
+    spec = backends.get_backend('hummingbird')
+
+    onnx_bytes, details = spec.run(None, 3, 15, str(tmp_path), workload='bulk')
+
+    assert onnx_bytes == b'tree_trav'
+    assert details['treeStrategy'] == 'tree_trav'
+    assert details['workload'] == 'bulk'
+    assert sorted(details['strategyBenchmark']) == ['gemm', 'tree_trav']
+    assert 'perf_tree_trav' in details['strategyErrors']
+
+
+def test_fixed_strategy_skips_the_benchmark(fake_hummingbird, tmp_path):
+    spec = backends.get_backend('hummingbird')
+
+    onnx_bytes, details = spec.run(None, 3, 15, str(tmp_path), tree_strategy='gemm')
+
+    assert onnx_bytes == b'gemm'
+    assert details == {'treeStrategy': 'gemm'}
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from tss_model.backfill import backfill, daily_tss, ema_alpha, ema_filter
+
+
+def _ema_loop(values, alpha, initial):
+    out, ema = [], initial
+    for value in values:
+        ema = ema + alpha * (value - ema)
+        out.append(ema)
+    return np.array(out)
+
+
+@pytest.mark.parametrize('days', [1, 5, 64, 200])
+def test_ema_filter_matches_recurrence(days):
+    values = np.random.default_rng(days).uniform(0, 200, (days, 3))
+    initial = np.array([0.0, 40.0, 80.0])
+    alpha = ema_alpha(42)
+
+    result = ema_filter(values, alpha, initial, block=16)
+    for series in range(3):
+        np.testing.assert_allclose(result[:, series], _ema_loop(values[:, series], alpha, initial[series]),
+                                   rtol=1e-12, atol=1e-9)
+
+
+@pytest.fixture
+def activities():
+    return {
+        'dates': np.array(['2025-03-01', '2025-03-01', '2025-03-04', '2025-03-02', '2025-03-10'],
+                          dtype='datetime64[D]'),
+        'tss': np.array([50.0, 30.0, 100.0, 70.0, 20.0]),
+        'athlete_ids': np.array(['a', 'a', 'a', 'b', 'b']),
+    }
+
+
+def test_daily_tss_sums_days_and_fills_rest_days(activities):
+    grid = daily_tss(**activities)
+
+    assert grid['athlete_ids'].tolist() == ['a', 'b']
+    assert grid['lengths'].tolist() == [4, 9]
+    np.testing.assert_array_equal(grid['tss'][:4, 0], [80, 0, 0, 100])
+    assert grid['tss'][:, 1].sum() == 90
+
+
+def test_backfill_matches_app_recurrence(activities):
+    daily, state = backfill(**activities)
+
+    a = daily['athlete_ids'] == 'a'
+    np.testing.assert_allclose(daily['ctl'][a], _ema_loop([80, 0, 0, 100], 2 / 43, 0.0))
+    np.testing.assert_allclose(daily['atl'][a], _ema_loop([80, 0, 0, 100], 2 / 8, 0.0))
+    np.testing.assert_allclose(daily['tsb'], daily['ctl'] - daily['atl'])
+    assert str(daily['dates'][a][-1]) == '2025-03-04'
+    assert state['b']['date'] == '2025-03-10'
+
+
+def test_resume_equals_full_run():
+    rng = np.random.default_rng(1)
+    dates = np.datetime64('2023-01-01') + rng.integers(0, 700, 400).astype('timedelta64[D]')
+    tss = rng.uniform(10, 200, 400)
+    ids = rng.choice(['x', 'y', 'z'], 400)
+    full, full_state = backfill(dates, tss, ids)
+
+    cutoff = np.datetime64('2024-01-01')
+    early = dates < cutoff
+    _, state = backfill(dates[early], tss[early], ids[early])
+    resumed, resumed_state = backfill(dates[~early], tss[~early], ids[~early], state=state)
+
+    for athlete in ('x', 'y', 'z'):
+        assert resumed_state[athlete] == pytest.approx(full_state[athlete])
+        tail = (full['athlete_ids'] == athlete) & (full['dates'] > np.datetime64(state[athlete]['date']))
+        np.testing.assert_allclose(resumed['ctl'][resumed['athlete_ids'] == athlete], full['ctl'][tail])
+
+
+def test_resume_drops_activities_up_to_the_stored_day(activities):
+    state = {'a': {'date': '2025-03-02', 'ctl': 10.0, 'atl': 20.0}}
+    daily, new_state = backfill(**activities, state=state)
+
+    a = daily['athlete_ids'] == 'a'
+    assert daily['dates'][a].astype(str).tolist() == ['2025-03-03', '2025-03-04']
+    np.testing.assert_allclose(daily['ctl'][a], _ema_loop([0, 100], 2 / 43, 10.0))
+    assert new_state['b']['date'] == '2025-03-10'
@@ -0,0 +1,69 @@
+import argparse
+
+import numpy as np
+
+from tss_model.bench import compare_to_baseline, measure, run, run_benchmark, summarize
+
+
+def _result(model, batch_size, rows_per_second, threads=1, optimization='all'):
+    return {'model': model, 'threads': threads, 'optimization': optimization,
+            'batch_size': batch_size, 'rows_per_second': rows_per_second}
+
+
+def test_summarize_percentiles():
+    latencies = np.linspace(0.001, 0.1, 100)
+    summary = summarize(latencies, batch_size=10)
+
+    assert summary['repeats'] == 100
+    assert summary['p50_ms'] < summary['p95_ms'] < summary['p99_ms']
+    assert summary['rows_per_second'] == 10 / np.median(latencies)
+
+
+def test_measure_respects_min_repeats():
+    calls = []
+    latencies = measure(lambda X: calls.append(len(X)), np.zeros((4, 2)),
+                        min_time=0.0, min_repeats=7, warmup=1)
+    assert len(latencies) == 7
+    assert len(calls) == 8
+
+
+def test_compare_flags_only_regressions_beyond_tolerance():
+    baseline = {'results': [
+        _result('a.onnx', 1, 1000.0),
+        _result('a.onnx', 100, 1000.0),
+        _result('b.onnx', 1, 1000.0),
+    ]}
+    results = [
+        _result('a.onnx', 1, 850.0),       # within 20%
+        _result('a.onnx', 100, 700.0),     # regressed
+        _result('b.onnx', 1, 2000.0),      # faster
+        _result('c.onnx', 1, 1.0),         # not in baseline
+    ]
+
+    regressions = compare_to_baseline(results, baseline, tolerance=0.2)
+    assert [(r['model'], r['batch_size']) for r in regressions] == [('a.onnx', 100)]
+    assert regressions[0]['ratio'] == 0.7
+
+
+def test_run_benchmark_forest(tmp_path):
+    from tss_model.forest import TreeEnsemble
+
+    doc = {'learner': {
+        'learner_model_param': {'base_score': '0', 'num_feature': '2'},
+        'gradient_booster': {'name': 'gbtree', 'model': {'trees': [{
+            'left_children': [-1], 'right_children': [-1], 'split_indices': [0],
+            'split_conditions': [1.0], 'default_left': [0]}]}},
+    }}
+    TreeEnsemble.from_model_json(doc).save(str(tmp_path / 'f.npz'))
+
+    results = run_benchmark({'f': str(tmp_path / 'f.npz')}, np.zeros((8, 2), np.float32),
+                            batch_sizes=[1, 8], threads=[1], optimizations=['all'], min_time=0.0)
+    assert [r['batch_size'] for r in results] == [1, 8]
+    assert all(r['threads'] is None for r in results)
+
+
+def test_missing_baseline_fails_before_benchmarking(tmp_path, capsys):
+    args = argparse.Namespace(baseline=str(tmp_path / 'missing.json'), update_baseline=False,
+                              models=[], features=str(tmp_path / 'missing-features.json'))
+    assert run(args) == 1
+    assert 'Baseline not found' in capsys.readouterr().out
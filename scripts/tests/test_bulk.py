@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+from tss_model.bulk import convert_all, discover_jobs, load_jobs, plan_outputs
+
+
+def test_discover_finds_models_and_their_features(tmp_path):
+    (tmp_path / 'elite.bst').write_bytes(b'binary')
+    (tmp_path / 'elite.features.json').write_text('{"features": ["a"]}')
+    (tmp_path / 'novice.json').write_text('{"learner": {}}')
+    (tmp_path / 'model_features.json').write_text('{"features": ["a"]}')
+    (tmp_path / 'notes.json').write_text('{"comment": "not a model"}')
+
+    jobs = discover_jobs(str(tmp_path))
+
+    assert [job['name'] for job in jobs] == ['elite', 'novice']
+    assert jobs[0]['features'] == str(tmp_path / 'elite.features.json')
+    assert jobs[1]['features'] == str(tmp_path / 'model_features.json')
+
+
+def test_job_file_defaults_and_duplicate_outputs(tmp_path):
+    (tmp_path / 'jobs.json').write_text(json.dumps({
+        'defaults': {'backend': 'compact', 'features': 'features.json'},
+        'models': [{'input': 'models/a.bst'},
+                   {'name': 'b', 'input': 'models/b.bst', 'output': 'v2/b.onnx'}],
+    }))
+
+    jobs = plan_outputs(load_jobs(str(tmp_path / 'jobs.json')), str(tmp_path / 'out'))
+
+    assert jobs[0]['backend'] == 'compact'
+    assert jobs[0]['features'] == str(tmp_path / 'features.json')
+    assert jobs[0]['output'] == str(tmp_path / 'out' / 'a.onnx')
+    assert jobs[1]['output'] == str(tmp_path / 'v2' / 'b.onnx')
+    with pytest.raises(ValueError, match='both write'):
+        plan_outputs([{'name': 'c', 'input': 'c.bst', 'output': str(tmp_path / 'out' / 'a.onnx')},
+                      {'name': 'a', 'input': 'a.bst'}], str(tmp_path / 'out'))
+
+
+
+def test_command_line_features_are_relative_to_the_working_directory(tmp_path, monkeypatch):
+    (tmp_path / 'jobs').mkdir()
+    (tmp_path / 'jobs' / 'jobs.json').write_text(json.dumps(
+        [{'input': 'a.bst'}, {'input': 'b.bst', 'features': 'b.features.json'}]))
+    monkeypatch.chdir(tmp_path)
+
+    jobs = load_jobs(str(tmp_path / 'jobs' / 'jobs.json'), 'shared.json')
+
+    assert jobs[0]['features'] == str(tmp_path / 'shared.json')
+    assert jobs[1]['features'] == str(tmp_path / 'jobs' / 'b.features.json')
+
+def test_convert_all_in_parallel_and_reports_failures(tmp_path):
+    pytest.importorskip('xgboost')
+    pytest.importorskip('onnxruntime')
+    from tss_model.parity import simulate_daily_metrics
+    from tss_model.train import save_model, time_split, training_data, train_model
+
+    models = tmp_path / 'models'
+    models.mkdir()
+    for i, athletes in enumerate((8, 12)):
+        dataset = training_data(**simulate_daily_metrics(athletes=athletes, days=40, seed=i))
+        validation = time_split(dataset['dates'], 7, dataset['athlete_ids'])
+        booster, _ = train_model(dataset['X'], dataset['y'], validation,
+                                 num_boost_round=5, threads=1)
+        save_model(booster, str(models / f'cohort-{i}.json'))
+    (models / 'broken.bst').write_bytes(b'not a model')
+    features = {'features': [f'f{i}' for i in range(15)]}
+    (models / 'model_features.json').write_text(json.dumps(features))
+
+    jobs = plan_outputs(discover_jobs(str(models)), str(tmp_path / 'out'))
+    for job in jobs:
+        job['backend'] = 'compact'
+    manifest = tmp_path / 'out' / 'model-manifest.json'
+    results = convert_all(jobs, str(tmp_path / 'cache'), workers=2, manifest_path=str(manifest))
+
+    assert [r['status'] for r in results] == ['failed', 'ok', 'ok']
+    assert all(r['validated'] and r['size_bytes'] > 0 for r in results[1:])
+    assert 'Converting' in results[1]['log']
+    assert sorted(json.loads(manifest.read_text())['models']) == ['cohort-0.onnx', 'cohort-1.onnx']
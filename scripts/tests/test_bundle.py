@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+onnx = pytest.importorskip('onnx')
+
+from onnx import TensorProto, helper  # noqa: E402
+
+from tss_model.bundle import (embed_metadata, load_manifest, model_hash,  # noqa: E402
+                              read_metadata, update_manifest)
+
+
+@pytest.fixture
+def onnx_path(tmp_path):
+    """y = x + 1."""
+    one = helper.make_tensor('one', TensorProto.FLOAT, [1], [1.0])
+    graph = helper.make_graph(
+        [helper.make_node('Add', ['float_input', 'one'], ['variable'])],
+        'toy',
+        [helper.make_tensor_value_info('float_input', TensorProto.FLOAT, [None, 3])],
+        [helper.make_tensor_value_info('variable', TensorProto.FLOAT, [None, 3])],
+        initializer=[one],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid('', 13)])
+    model.ir_version = 8
+    path = tmp_path / 'toy.onnx'
+    onnx.save(model, str(path))
+    return str(path)
+
+
+METADATA = {'version': 'v1', 'features': ['a', 'b', 'c'], 'opset': 13, 'baseScore': 0.5}
+
+
+def test_metadata_round_trips_through_the_model(onnx_path):
+    embedded = embed_metadata(onnx_path, METADATA)
+
+    assert read_metadata(onnx_path) == embedded
+    assert embedded['features'] == ['a', 'b', 'c']
+    assert embedded['baseScore'] == 0.5
+    props = {prop.key: prop.value for prop in onnx.load(onnx_path).metadata_props}
+    assert json.loads(props['features']) == ['a', 'b', 'c']
+
+
+def test_model_hash_ignores_metadata(onnx_path):
+    before = model_hash(onnx.load(onnx_path))
+    first = embed_metadata(onnx_path, METADATA)
+    second = embed_metadata(onnx_path, {**METADATA, 'version': 'v2'})
+
+    assert first['modelHash'] == second['modelHash'] == before
+    assert read_metadata(onnx_path)['version'] == 'v2'
+
+
+def test_manifest_revision_changes_only_with_content(tmp_path, onnx_path):
+    manifest_path = str(tmp_path / 'model-manifest.json')
+
+    first = update_manifest(manifest_path, onnx_path, embed_metadata(onnx_path, METADATA))
+    again = update_manifest(manifest_path, onnx_path, embed_metadata(onnx_path, METADATA))
+    changed = update_manifest(manifest_path, onnx_path,
+                              embed_metadata(onnx_path, {**METADATA, 'version': 'v2'}))
+
+    assert first['revision'] == again['revision'] == 1
+    assert changed['revision'] == 2
+    assert changed['sha256'] != first['sha256']
+    assert changed['modelHash'] == first['modelHash']
+    entry = load_manifest(manifest_path)['models']['toy.onnx']
+    assert entry == changed
+    assert entry['features'] == ['a', 'b', 'c']
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from tss_model.compact import compact_forest, round_to_float16
+from tss_model.forest import TreeEnsemble
+
+
+def _tree(left, right, split_indices, split_conditions, default_left):
+    return {
+        'left_children': left,
+        'right_children': right,
+        'split_indices': split_indices,
+        'split_conditions': split_conditions,
+        'default_left': default_left,
+    }
+
+
+@pytest.fixture
+def forest():
+    doc = {
+        'learner': {
+            'learner_model_param': {'base_score': '[5E-1]', 'num_feature': '2'},
+            'gradient_booster': {
+                'name': 'gbtree',
+                'model': {
+                    'trees': [
+                        # f0 < 1 ? 10 : (f1 < 2 ? 3 : 3) — the f1 split has no gain
+                        _tree([1, -1, 3, -1, -1], [2, -1, 4, -1, -1], [0, 0, 1, 0, 0],
+                              [1.0, 10.0, 2.0, 3.0, 3.0], [0, 0, 1, 0, 0]),
+                        # single leaf sharing its value with tree 0
+                        _tree([-1], [-1], [0], [10.0], [0]),
+                    ]
+                },
+            },
+        }
+    }
+    return TreeEnsemble.from_model_json(doc)
+
+
+@pytest.fixture
+def X():
+    rng = np.random.default_rng(0)
+    X = (rng.random((500, 2)) * 4).astype(np.float32)
+    X[::7, 0] = np.nan
+    X[::5, 1] = np.nan
+    return X
+
+
+def test_collapses_constant_splits(forest, X):
+    compacted, stats = compact_forest(forest)
+
+    assert stats['nodes_before'] == 6
+    assert stats['nodes_after'] == 4
+    assert stats['collapsed_splits'] == 1
+    assert stats['unreachable_nodes'] == 0
+    assert stats['unique_leaves'] == 2
+    np.testing.assert_array_equal(compacted.predict(X), forest.predict(X))
+
+
+def test_float16_rejects_overflow(forest):
+    forest.value[1] = 1e6
+    with pytest.raises(ValueError):
+        round_to_float16(forest)
+
+
+def test_onnx_matches_forest(tmp_path, forest, X):
+    onnx = pytest.importorskip('onnx')
+    pytest.importorskip('onnxruntime')
+    from tss_model.compact import forest_to_onnx
+    from tss_model.runtime import load_predictor
+
+    compacted, _ = compact_forest(forest)
+    path = str(tmp_path / 'compact.onnx')
+    onnx.save(forest_to_onnx(compacted), path)
+
+    np.testing.assert_array_equal(load_predictor(path)(X), forest.predict(X))
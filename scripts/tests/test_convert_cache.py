@@ -0,0 +1,187 @@
+import json
+import pickle
+
+import pytest
+
+from tss_model import backends
+from tss_model.cache import ConversionCache, cache_key
+from tss_model.convert import convert_model
+
+
+@pytest.fixture
+def fake_backend(monkeypatch):
+    calls = []
+
+    def convert(model, n_features, opset, work_dir):
+        calls.append((model, n_features, opset))
+        return f"onnx:{model['name']}:{n_features}:{opset}".encode()
+
+    monkeypatch.setitem(backends.BACKENDS, 'fake', backends.Backend('fake', convert, 7, 'test'))
+    return calls
+
+
+@pytest.fixture
+def artifacts(tmp_path):
+    model_path = tmp_path / 'model.bst'
+    model_path.write_bytes(pickle.dumps({'name': 'm1'}))
+    features_path = tmp_path / 'features.json'
+    features_path.write_text(json.dumps({'features': ['a', 'b', 'c']}))
+    return model_path, features_path
+
+
+def _convert(tmp_path, model_path, features_path, bundle=False, **kwargs):
+    return convert_model(
+        model_path=str(model_path),
+        features_path=str(features_path),
+        output_path=str(tmp_path / 'out.onnx'),
+        backend='fake',
+        cache_dir=str(tmp_path / 'cache'),
+        validate=False,
+        bundle=bundle,
+        **kwargs,
+    )
+
+
+def test_second_conversion_is_served_from_cache(tmp_path, artifacts, fake_backend):
+    first = _convert(tmp_path, *artifacts)
+    second = _convert(tmp_path, *artifacts)
+
+    assert len(fake_backend) == 1
+    assert not first['cache_hit']
+    assert second['cache_hit']
+    assert (tmp_path / 'out.onnx').read_bytes() == b'onnx:m1:3:7'
+    metadata = json.loads((tmp_path / 'out.json').read_text())
+    assert metadata['features'] == ['a', 'b', 'c']
+    assert metadata['opset'] == 7
+
+
+def test_changed_inputs_invalidate_cache(tmp_path, artifacts, fake_backend):
+    model_path, features_path = artifacts
+    _convert(tmp_path, model_path, features_path)
+
+    _convert(tmp_path, model_path, features_path, opset=9)
+    features_path.write_text(json.dumps({'features': ['a', 'b']}))
+    _convert(tmp_path, model_path, features_path)
+    model_path.write_bytes(pickle.dumps({'name': 'm2'}))
+    result = _convert(tmp_path, model_path, features_path)
+
+    assert len(fake_backend) == 4
+    assert not result['cache_hit']
+    assert (tmp_path / 'out.onnx').read_bytes() == b'onnx:m2:2:7'
+
+
+def test_no_cache_always_converts(tmp_path, artifacts, fake_backend):
+    _convert(tmp_path, *artifacts, use_cache=False)
+    _convert(tmp_path, *artifacts, use_cache=False)
+
+    assert len(fake_backend) == 2
+    assert not (tmp_path / 'cache').exists()
+
+
+def test_cache_key_depends_on_backend(artifacts):
+    model_path, features_path = artifacts
+    assert cache_key(model_path, features_path, 'a', 12) != cache_key(model_path, features_path, 'b', 12)
+
+
+def test_cache_update_marks_entry(tmp_path):
+    cache = ConversionCache(str(tmp_path))
+    cache.put('ab' * 32, b'x', {'validated': False})
+    cache.update('ab' * 32, validated=True)
+    assert cache.get('ab' * 32)['validated'] is True
+
+
+def test_backend_options_are_keyed_and_details_survive_cache_hits(tmp_path, artifacts,
+                                                                   monkeypatch):
+    calls = []
+
+    def convert(model, n_features, opset, work_dir, strategy='a'):
+        calls.append(strategy)
+        return f'onnx:{strategy}'.encode(), {'treeStrategy': strategy}
+
+    monkeypatch.setitem(backends.BACKENDS, 'fake',
+                        backends.Backend('fake', convert, 7, 'test', options=('strategy',)))
+
+    _convert(tmp_path, *artifacts, backend_options={'strategy': 'b'})
+    _convert(tmp_path, *artifacts, backend_options={'strategy': 'b'})
+    _convert(tmp_path, *artifacts, backend_options={'strategy': 'c'})
+
+    assert calls == ['b', 'c']
+    _convert(tmp_path, *artifacts, backend_options={'strategy': 'b'})
+    assert json.loads((tmp_path / 'out.json').read_text())['treeStrategy'] == 'b'
+    with pytest.raises(ValueError, match='no option'):
+        _convert(tmp_path, *artifacts, use_cache=False, backend_options={'depth': 3})
+
+
+
+def test_workload_is_keyed_only_for_auto_tree_strategy(tmp_path, artifacts, monkeypatch):
+    calls = []
+
+    def convert(model, n_features, opset, work_dir, tree_strategy='auto', workload='online'):
+        calls.append((tree_strategy, workload))
+        return f'onnx:{tree_strategy}'.encode()
+
+    monkeypatch.setitem(backends.BACKENDS, 'fake', backends.Backend(
+        'fake', convert, 7, 'test', options=('tree_strategy', 'workload')))
+
+    for workload in ('online', 'bulk'):
+        _convert(tmp_path, *artifacts,
+                 backend_options={'tree_strategy': 'gemm', 'workload': workload})
+    for workload in ('online', 'bulk'):
+        _convert(tmp_path, *artifacts,
+                 backend_options={'tree_strategy': 'auto', 'workload': workload})
+
+    assert calls == [('gemm', 'online'), ('auto', 'online'), ('auto', 'bulk')]
+
+
+@pytest.fixture
+def onnx_backend(monkeypatch):
+    """A 'fake' backend writing a real Identity model."""
+    pytest.importorskip('onnx')
+    from onnx import TensorProto, helper
+
+    def convert(model, n_features, opset, work_dir):
+        graph = helper.make_graph(
+            [helper.make_node('Identity', ['float_input'], ['variable'])], 'toy',
+            [helper.make_tensor_value_info('float_input', TensorProto.FLOAT, [None, n_features])],
+            [helper.make_tensor_value_info('variable', TensorProto.FLOAT, [None, n_features])])
+        model = helper.make_model(graph, opset_imports=[helper.make_opsetid('', 13)])
+        model.ir_version = 8
+        return model.SerializeToString()
+
+    monkeypatch.setitem(backends.BACKENDS, 'fake', backends.Backend('fake', convert, 13, 'test'))
+    monkeypatch.setattr('tss_model.convert.read_base_score', lambda model: 0.5)
+
+
+def test_cached_bundle_is_not_rewritten(tmp_path, artifacts, onnx_backend):
+    import onnx
+
+    from tss_model.bundle import read_metadata
+
+    output, metadata = tmp_path / 'out.onnx', tmp_path / 'out.json'
+
+    _convert(tmp_path, *artifacts, bundle=True)
+    before = (output.stat().st_mtime_ns, metadata.stat().st_mtime_ns, output.read_bytes())
+    second = _convert(tmp_path, *artifacts, bundle=True)
+
+    assert second['cache_hit']
+    assert (output.stat().st_mtime_ns, metadata.stat().st_mtime_ns, output.read_bytes()) == before
+    assert read_metadata(str(output))['baseScore'] == 0.5
+    assert onnx.load(str(output)).graph.node[0].op_type == 'Identity'
+
+
+def test_optimized_artifacts_carry_bundle_metadata(tmp_path, artifacts, onnx_backend):
+    pytest.importorskip('onnxruntime')
+    from tss_model.bundle import load_manifest, read_metadata
+    from tss_model.runtime import create_session
+
+    manifest_path = str(tmp_path / 'model-manifest.json')
+    _convert(tmp_path, *artifacts, bundle=True, optimize='basic', manifest_path=manifest_path)
+
+    metadata = read_metadata(str(tmp_path / 'out.onnx'))
+    assert metadata['optimizedArtifacts'] == {'onnx': 'out.opt.onnx', 'ort': 'out.ort'}
+    assert read_metadata(str(tmp_path / 'out.opt.onnx')) == metadata
+    session = create_session(str(tmp_path / 'out.ort'), optimization='disable')
+    assert json.loads(session.get_modelmeta().custom_metadata_map['baseScore']) == 0.5
+    models = load_manifest(manifest_path)['models']
+    assert sorted(models) == ['out.onnx', 'out.opt.onnx', 'out.ort']
+    assert {models[name]['modelHash'] for name in models} == {metadata['modelHash']}
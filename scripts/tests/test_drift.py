@@ -0,0 +1,72 @@
+import json
+
+import numpy as np
+import pytest
+
+from tss_model.drift import DriftMonitor, build_profile, sample_rows
+
+FEATURES = ['TSS_28d', 'TSS_zero7', 'ramp_7v42']
+
+
+def _rows(n, seed, scale=1.0, zero_share=0.15):
+    rng = np.random.default_rng(seed)
+    zero7 = np.where(rng.random(n) < zero_share, 0, rng.integers(1, 8, n))
+    return np.column_stack([rng.gamma(9, 140, n) * scale, zero7,
+                            rng.normal(0, 0.2, n)]).astype(np.float32)
+
+
+@pytest.fixture(scope='module')
+def profile():
+    return build_profile(_rows(50_000, 0), FEATURES)
+
+
+def _by_feature(monitor):
+    return {s['feature']: s for s in monitor.scores()}
+
+
+def test_same_distribution_is_stable(profile):
+    monitor = DriftMonitor(profile)
+    for seed in range(1, 5):
+        monitor.update(_rows(5_000, seed))
+
+    scores = _by_feature(monitor)
+    assert all(s['status'] == 'ok' for s in scores.values())
+    assert scores['TSS_28d']['psi'] < 0.01 and scores['TSS_28d']['ks'] < 0.03
+    assert scores['TSS_28d']['median'] == pytest.approx(profile['columns']['TSS_28d']['median'],
+                                                        rel=0.02)
+
+
+def test_shift_and_zero_rate_change_are_flagged(profile):
+    monitor = DriftMonitor(profile)
+    monitor.update(_rows(20_000, 1, scale=1.5, zero_share=0.4))
+
+    scores = _by_feature(monitor)
+    assert scores['TSS_28d']['status'] == 'drift' and scores['TSS_28d']['psi'] > 0.25
+    assert scores['TSS_zero7']['status'] == 'drift'
+    assert scores['TSS_zero7']['zero_rate'] == pytest.approx(0.4, abs=0.02)
+    assert scores['ramp_7v42']['status'] == 'ok'
+
+
+def test_sketches_are_fixed_size_and_merge_like_one_pass(profile):
+    whole, first, second = DriftMonitor(profile), DriftMonitor(profile), DriftMonitor(profile)
+    rows = _rows(30_000, 3)
+    rows[::100, 2] = np.nan
+    shape = whole.counts.shape
+    whole.update(rows)
+    first.update(rows[:10_000])
+    second.update(rows[10_000:])
+    first.merge(second)
+
+    restored = DriftMonitor.from_dict(profile, json.loads(json.dumps(first.to_dict())))
+    assert whole.counts.shape == shape
+    assert restored.scores() == whole.scores()
+    assert _by_feature(whole)['ramp_7v42']['missing_rate'] == pytest.approx(0.01)
+    with pytest.raises(ValueError, match='different profile'):
+        DriftMonitor.from_dict(build_profile(rows, FEATURES), first.to_dict())
+
+
+def test_sample_rows_is_bounded():
+    chunks = (np.full((1000, 1), i, dtype=np.float32) for i in range(10))
+    sample = sample_rows(chunks, size=500)
+    assert sample.shape == (500, 1)
+    assert len(np.unique(sample)) == 10
@@ -0,0 +1,62 @@
+import json
+
+import numpy as np
+import pytest
+
+from tss_model.explain import AttributionCache, TreeExplainer, explain_rows, load_explainer
+from tss_model.forest import TreeEnsemble
+
+
+@pytest.fixture(scope='module')
+def booster(tmp_path_factory):
+    xgb = pytest.importorskip('xgboost')
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(2000, 6)).astype(np.float32)
+    y = 2 * X[:, 0] + X[:, 1] ** 2 + X[:, 0] * X[:, 2] + np.sin(X[:, 3] * X[:, 4])
+    X[::5, 2] = np.nan
+    booster = xgb.train({'max_depth': 5, 'eta': 0.3}, xgb.DMatrix(X, y), num_boost_round=20)
+    path = tmp_path_factory.mktemp('model') / 'model.json'
+    booster.save_model(str(path))
+    return booster, str(path), X
+
+
+def test_matches_xgboost_pred_contribs(booster):
+    import xgboost as xgb
+
+    booster, path, X = booster
+    with open(path, 'r') as f:
+        forest = TreeEnsemble.from_model_json(json.load(f))
+    explainer = TreeExplainer.from_forest(forest)
+
+    values = explainer.explain(X[:300], chunk_rows=64)
+    reference = booster.predict(xgb.DMatrix(X[:300]), pred_contribs=True)
+
+    np.testing.assert_allclose(values, reference[:, :-1], atol=1e-5)
+    assert explainer.expected_value == pytest.approx(float(reference[0, -1]), abs=1e-5)
+    np.testing.assert_allclose(values.sum(axis=1) + explainer.expected_value,
+                               forest.predict(X[:300]), atol=1e-4)
+
+
+def test_attributions_are_cached_per_athlete_day_and_model(booster, tmp_path):
+    _, path, X = booster
+    explainer, model_hash, built = load_explainer(path, str(tmp_path))
+    assert built
+    athletes = np.array(['b', 'a', 'b', 'a'])
+    dates = np.array(['2025-03-02', '2025-03-01', '2025-03-01', '2025-03-02'],
+                     dtype='datetime64[D]')
+
+    cache = AttributionCache(str(tmp_path), model_hash, explainer.num_features)
+    first = explain_rows(explainer, cache, athletes[:2], dates[:2], X[:2])
+    assert (first['explained'], first['cached']) == (2, 0)
+
+    explainer, _, built = load_explainer(path, str(tmp_path))
+    cache = AttributionCache(str(tmp_path), model_hash, explainer.num_features)
+    second = explain_rows(explainer, cache, athletes, dates, X[:4])
+    assert (built, second['explained'], second['cached']) == (False, 2, 2)
+
+    reread = AttributionCache(str(tmp_path), model_hash, explainer.num_features)
+    np.testing.assert_allclose(reread.get(['a', 'b'], ['2025-03-02', '2025-03-02']),
+                               explainer.explain(X[[3, 0]]))
+    assert reread.rows(['c', 'a'], ['2025-03-01', '2025-03-05']).tolist() == [-1, -1]
+    with pytest.raises(KeyError):
+        reread.get(['a'], ['2025-03-05'])
@@ -0,0 +1,65 @@
+import json
+
+import numpy as np
+import pytest
+
+from tss_model.features import FEATURE_NAMES, compute_features, load_daily_metrics
+from tss_model.model_io import load_features
+
+
+@pytest.fixture
+def golden(scripts_dir):
+    with open(scripts_dir / 'tests' / 'fixtures' / 'features_golden.json') as f:
+        return json.load(f)['athletes']
+
+
+def _columns(rows):
+    return {
+        'dates': [r['date'] for r in rows],
+        'tss': [r['tss'] for r in rows],
+        'ctl': [r['ctl'] for r in rows],
+        'atl': [r['atl'] for r in rows],
+        'tsb': [r['tsb'] for r in rows],
+    }
+
+
+def _expected(features):
+    return np.array([[f[name] for name in FEATURE_NAMES] for f in features])
+
+
+def test_feature_order_matches_model(scripts_dir):
+    assert FEATURE_NAMES == load_features(str(scripts_dir / 'model_features.json'))
+
+
+def test_matches_typescript_single_athlete(golden):
+    athlete = golden['a1']
+    features = compute_features(**_columns(athlete['history']))
+    np.testing.assert_allclose(features, _expected(athlete['features']), rtol=1e-9, atol=1e-9)
+
+
+def test_matches_typescript_many_athletes(golden):
+    rows, ids, expected = [], [], []
+    for athlete_id, athlete in golden.items():
+        rows += athlete['history']
+        ids += [athlete_id] * len(athlete['history'])
+        expected.append(_expected(athlete['features']))
+
+    features = compute_features(**_columns(rows), athlete_ids=ids)
+    np.testing.assert_allclose(features, np.vstack(expected), rtol=1e-9, atol=1e-9)
+
+
+def test_rejects_unsorted_dates(golden):
+    columns = _columns(golden['a2']['history'][::-1])
+    with pytest.raises(ValueError):
+        compute_features(**columns)
+
+
+def test_load_daily_metrics_sorts_csv(tmp_path, golden):
+    rows = golden['a2']['history']
+    lines = ['athlete_id,date,tss,ctl,atl,tsb']
+    lines += [f"a2,{r['date']},{r['tss']},{r['ctl']},{r['atl']},{r['tsb']}" for r in reversed(rows)]
+    path = tmp_path / 'daily.csv'
+    path.write_text('\n'.join(lines))
+
+    features = compute_features(**load_daily_metrics(str(path)))
+    np.testing.assert_allclose(features, _expected(golden['a2']['features']), rtol=1e-9, atol=1e-9)
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from tss_model.features import compute_features
+from tss_model.forecast import ForecastState, forecast
+
+
+@pytest.fixture
+def history():
+    """Athlete 'a' with 3 days of history, 'b' with 50 (including rest days)."""
+    rng = np.random.default_rng(0)
+    lengths = {'a': 3, 'b': 50}
+    dates, tss, ids = [], [], []
+    for athlete, days in lengths.items():
+        dates.append(np.datetime64('2025-01-30') + np.arange(days))
+        values = rng.uniform(0, 150, days).round(1)
+        values[rng.random(days) < 0.3] = 0
+        tss.append(values)
+        ids += [athlete] * days
+    tss = np.concatenate(tss)
+    return {
+        'dates': np.concatenate(dates),
+        'tss': tss,
+        'ctl': rng.uniform(20, 80, len(tss)),
+        'atl': rng.uniform(20, 80, len(tss)),
+        'tsb': np.zeros(len(tss)),
+        'athlete_ids': np.array(ids),
+    }
+
+
+def test_rolled_features_match_feature_engine(history):
+    seen = []
+
+    def predict(X):
+        seen.append(X.copy())
+        # Deterministic, sometimes zero, depends on the rolled features
+        return np.where(X[:, 11] > 0.5, 0.0, X[:, 2] / 7 + 10 * X[:, 13])
+
+    horizon = 60
+    state = ForecastState.from_daily_metrics(**history)
+    result = forecast(predict, state, horizon)
+
+    for a, athlete in enumerate(result['athlete_ids']):
+        past = history['athlete_ids'] == athlete
+        expected = compute_features(
+            np.concatenate([history['dates'][past], result['dates'][a]]),
+            np.concatenate([history['tss'][past], result['tss'][a]]),
+            np.concatenate([history['ctl'][past], result['ctl'][a]]),
+            np.concatenate([history['atl'][past], result['atl'][a]]),
+            np.concatenate([history['tsb'][past], result['tsb'][a]]),
+        )[past.sum():]
+        actual = np.stack([X[a] for X in seen])
+        np.testing.assert_allclose(actual, expected.astype(np.float32), rtol=1e-5, atol=1e-3)
+
+
+def test_forecast_dates_and_ema(history):
+    state = ForecastState.from_daily_metrics(**history)
+    result = forecast(lambda X: np.full(len(X), 100.0), state, 5)
+
+    assert result['tss'].shape == (2, 5)
+    assert result['dates'][0, 0] == np.datetime64('2025-02-02')
+    assert result['dates'][1, 4] == np.datetime64('2025-03-25')
+
+    last_ctl = history['ctl'][history['athlete_ids'] == 'b'][-1]
+    assert result['ctl'][1, 0] == pytest.approx(last_ctl + 2 / 43 * (100 - last_ctl))
+    np.testing.assert_allclose(result['tsb'], result['ctl'] - result['atl'])
+
+
+def test_negative_predictions_are_clipped(history):
+    state = ForecastState.from_daily_metrics(**history)
+    result = forecast(lambda X: np.full(len(X), -5.0), state, 3)
+    assert np.all(result['tss'] == 0)
@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+from tss_model.forest import TreeEnsemble, load_forest
+
+
+def _tree(left, right, split_indices, split_conditions, default_left):
+    return {
+        'left_children': left,
+        'right_children': right,
+        'split_indices': split_indices,
+        'split_conditions': split_conditions,
+        'default_left': default_left,
+    }
+
+
+@pytest.fixture
+def model_doc():
+    return {
+        'learner': {
+            'learner_model_param': {'base_score': '[5E-1]', 'num_feature': '2'},
+            'gradient_booster': {
+                'name': 'gbtree',
+                'model': {
+                    'trees': [
+                        # f0 < 1 ? 10 : (f1 < 2 ? 1 : 2), missing f0 → right, missing f1 → left
+                        _tree([1, -1, 3, -1, -1], [2, -1, 4, -1, -1], [0, 0, 1, 0, 0],
+                              [1.0, 10.0, 2.0, 1.0, 2.0], [0, 0, 1, 0, 0]),
+                        # single leaf
+                        _tree([-1], [-1], [0], [0.25], [0]),
+                    ]
+                },
+            },
+        }
+    }
+
+
+def test_predict_small_forest(model_doc):
+    forest = TreeEnsemble.from_model_json(model_doc)
+    X = np.array([
+        [0.0, 0.0],
+        [5.0, 1.0],
+        [5.0, 3.0],
+        [1.0, 2.0],  # thresholds are strict: equal values go right
+        [np.nan, np.nan],
+        [0.5, np.nan],
+    ], dtype=np.float32)
+
+    assert forest.num_trees == 2
+    assert forest.max_depth == 2
+    np.testing.assert_allclose(forest.predict(X), [10.75, 1.75, 2.75, 2.75, 1.75, 10.75])
+
+
+def test_predict_is_independent_of_chunk_size(model_doc):
+    forest = TreeEnsemble.from_model_json(model_doc)
+    X = np.random.default_rng(0).random((1000, 2)).astype(np.float32) * 4
+    np.testing.assert_array_equal(forest.predict(X, chunk_size=7), forest.predict(X))
+
+
+def test_rejects_wrong_feature_count(model_doc):
+    forest = TreeEnsemble.from_model_json(model_doc)
+    with pytest.raises(ValueError):
+        forest.predict(np.zeros((3, 5), dtype=np.float32))
+
+
+def test_npz_round_trip(tmp_path, model_doc):
+    forest = TreeEnsemble.from_model_json(model_doc)
+    forest.save(str(tmp_path / 'forest.npz'))
+    loaded = load_forest(str(tmp_path / 'forest.npz'))
+
+    X = np.array([[0.0, 0.0], [5.0, 3.0]], dtype=np.float32)
+    np.testing.assert_array_equal(loaded.predict(X), forest.predict(X))
+    assert loaded.base_score == forest.base_score
+
+
+def test_parity_with_onnx(tmp_path, scripts_dir):
+    pytest.importorskip('xgboost')
+    pytest.importorskip('onnxmltools')
+    pytest.importorskip('onnxruntime')
+    from tss_model.convert import convert_model, validate_onnx_model
+
+    model_path = str(scripts_dir / 'model_tss_predictor.bst')
+    onnx_path = str(tmp_path / 'model.onnx')
+    convert_model(
+        model_path=model_path,
+        features_path=str(scripts_dir / 'model_features.json'),
+        output_path=onnx_path,
+        use_cache=False,
+        validate=False,
+    )
+
+    forest = load_forest(model_path)
+    assert validate_onnx_model(onnx_path, forest.num_features, reference=forest.predict)
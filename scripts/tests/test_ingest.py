@@ -0,0 +1,130 @@
+import argparse
+import json
+
+import numpy as np
+import pytest
+
+from tss_model import backfill
+from tss_model.backfill import load_activities
+from tss_model.ingest import METHODS, compute_tss, ingest, load_table
+
+
+def _calculate_tss(duration_s, np_=None, ap=None, hr=None, ftp=None, lthr=None):
+    """calculateTSS from src/lib/fitnessMetrics.ts, one activity at a time."""
+    hours = duration_s / 3600
+    if np_ and ftp and ftp > 0:
+        return duration_s * np_ * (np_ / ftp) / (ftp * 3600) * 100
+    if ap and ftp and ftp > 0:
+        return duration_s * ap * (ap / ftp) / (ftp * 3600) * 100
+    if hr and lthr and lthr > 0:
+        return hours * (hr / lthr) ** 2 * 100
+    return hours * 100 * 0.75
+
+
+CASES = [
+    # duration, NP, AP, HR, FTP, LTHR, method
+    (3600, 250, 200, 150, 250, 165, 'power'),
+    (5400, None, 180, 150, 250, 165, 'average_power'),
+    (5400, 0, 180, None, 250, None, 'average_power'),
+    (3600, 250, 200, 150, None, 165, 'hrss'),
+    (3600, None, None, 150, 0, 165, 'hrss'),
+    (2700, None, None, 150, 250, None, 'estimate'),
+    (2700, None, None, None, None, None, 'estimate'),
+]
+
+
+def _column(index):
+    return np.array([np.nan if case[index] is None else case[index] for case in CASES], dtype=float)
+
+
+def test_compute_tss_matches_calculate_tss_precedence():
+    tss, method = compute_tss(*(_column(i) for i in range(6)))
+
+    np.testing.assert_allclose(tss, [_calculate_tss(*case[:6]) for case in CASES], rtol=1e-12)
+    assert [METHODS[m] for m in method] == [case[6] for case in CASES]
+
+
+def _activity(id_, athlete, date, moving_time, **fields):
+    return json.dumps({'id': id_, 'athlete': {'id': athlete},
+                       'start_date_local': f'{date}T07:00:00Z', 'moving_time': moving_time,
+                       **fields}) + '\n'
+
+
+def test_rerun_parses_only_appended_lines(tmp_path):
+    export, table_path = tmp_path / 'activities.jsonl', str(tmp_path / 'daily.npz')
+    export.write_text(_activity(1, 7, '2025-03-01', 3600, weighted_average_watts=250)
+                      + _activity(2, 7, '2025-03-01', 1800)
+                      + _activity(3, 8, '2025-03-02', 3600, average_heartrate=150, lthr=150))
+
+    first = ingest(str(export), table_path, profiles={'7': {'ftp': 250}}, chunk_rows=2)
+    assert (first['activities'], first['resumed_from']) == (3, 0)
+    assert first['methods'] == {'power': 1, 'average_power': 0, 'hrss': 1, 'estimate': 1}
+
+    size = export.stat().st_size
+    with open(export, 'a') as f:
+        f.write(_activity(4, 7, '2025-03-01', 3600, average_watts=125)
+                + _activity(2, 7, '2025-03-01', 1800)
+                + '{"id": 5, "athlete": {"id": 7}')         # still being written
+    second = ingest(str(export), table_path, profiles={'7': {'ftp': 250}})
+    assert (second['activities'], second['duplicates'], second['resumed_from']) == (1, 1, size)
+
+    table, checkpoint = load_table(table_path)
+    assert table['athlete_id'].tolist() == ['7', '8']
+    assert table['date'].astype(str).tolist() == ['2025-03-01', '2025-03-02']
+    np.testing.assert_allclose(table['tss'], [100 + 37.5 + 25, 100])
+    assert table['activities'].tolist() == [3, 1]
+    assert sorted(checkpoint['ids'].tolist()) == ['1', '2', '3', '4']
+
+    activities = load_activities(table_path)
+    np.testing.assert_allclose(activities['tss'], table['tss'])
+
+
+def test_rewritten_export_is_reread_without_double_counting(tmp_path):
+    export, table_path = tmp_path / 'activities.jsonl', str(tmp_path / 'daily.npz')
+    export.write_text(_activity(1, 7, '2025-03-01', 3600))
+    ingest(str(export), table_path)
+
+    export.write_text(_activity(9, 7, '2025-03-03', 3600) + _activity(1, 7, '2025-03-01', 3600))
+    summary = ingest(str(export), table_path)
+
+    assert (summary['activities'], summary['duplicates'], summary['resumed_from']) == (1, 1, 0)
+    assert load_table(table_path)[0]['tss'].tolist() == pytest.approx([75, 75])
+
+
+def test_invalid_lines_are_skipped_and_idless_rows_are_not_double_counted(tmp_path):
+    export, table_path = tmp_path / 'activities.jsonl', str(tmp_path / 'daily.npz')
+    good = _activity(1, 7, '2025-03-01', 3600)
+    idless = _activity(None, 7, '2025-03-02', 3600)
+    null_date = json.dumps({'id': 2, 'athlete': {'id': 7}, 'start_date_local': None}) + '\n'
+    export.write_text(good + null_date + idless + '{"id": 3,\n')
+
+    summary = ingest(str(export), table_path)
+    assert (summary['activities'], summary['invalid']) == (2, 2)
+    assert summary['invalid_offsets'] == [len(good), len(good + null_date + idless)]
+
+    # Rewritten export: read again from byte 0, the id-less row is a duplicate
+    export.write_text(idless + good)
+    summary = ingest(str(export), table_path)
+    assert (summary['activities'], summary['duplicates'], summary['resumed_from']) == (0, 2, 0)
+    assert load_table(table_path)[0]['tss'].tolist() == pytest.approx([75, 75])
+
+
+def test_ingest_then_incremental_backfill(tmp_path):
+    export, table_path = tmp_path / 'activities.jsonl', str(tmp_path / 'daily.npz')
+    state, days = str(tmp_path / 'state.json'), str(tmp_path / 'days.csv')
+    args = argparse.Namespace(input=table_path, output=days, state=state, block_days=16)
+
+    export.write_text(_activity(1, 7, '2025-03-01', 3600) + _activity(2, 8, '2025-03-02', 3600))
+    ingest(str(export), table_path)
+    assert backfill.run(args) == 0
+
+    with open(export, 'a') as f:
+        f.write(_activity(3, 7, '2025-03-04', 3600))
+    ingest(str(export), table_path)
+    assert backfill.run(args) == 0
+
+    with open(days) as f:
+        assert [line.split(',')[:3] for line in f.read().splitlines()[1:]] == [
+            ['7', '2025-03-02', '0.0'], ['7', '2025-03-03', '0.0'], ['7', '2025-03-04', '75.0']]
+    full, _ = backfill.backfill(**load_activities(table_path))
+    assert backfill.load_state(state)['7']['ctl'] == pytest.approx(full['ctl'][3])
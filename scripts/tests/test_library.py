@@ -0,0 +1,68 @@
+import json
+
+import pytest
+
+from tss_model.library import (WorkoutLibrary, build, compile_library, normalize_segment,
+                               workout_totals)
+
+
+def _workout(workout_id, minutes, intensity, category='LIT'):
+    return {'id': workout_id, 'name': workout_id, 'category': category,
+            'duration_min': minutes,
+            'structure': [{'type': 'steady', 'duration_s': minutes * 60,
+                           'intensity_ftp': intensity}]}
+
+
+def test_both_key_spellings_normalize_alike():
+    a, _ = normalize_segment({'type': 'intervals', 'repeats': 4, 'work_s': 240, 'rest_s': 240,
+                              'work_intensity': 1.2, 'rest_intensity': 0.5})
+    b, _ = normalize_segment({'type': 'intervals', 'repeats': 4, 'work_s': 240, 'rest_s': 240,
+                              'work_intensity_ftp': 1.2, 'rest_intensity_ftp': 0.5})
+
+    assert a == b
+    _, assumed = normalize_segment({'type': 'sprints', 'repeats': 8, 'work_s': 12, 'rest_s': 180})
+    assert assumed
+
+
+def test_totals_match_planned_tss():
+    segments = [{'type': 'steady', 'duration_s': 3600, 'intensity': 1.0},
+                {'type': 'intervals', 'repeats': 2, 'work_s': 600, 'work_intensity': 1.2,
+                 'rest_s': 300, 'rest_intensity': 0.5}]
+
+    totals = workout_totals(segments)
+
+    assert totals['duration_s'] == 3600 + 2 * 900
+    # 1 h at FTP = 100 TSS; each interval adds (600 * 1.44 + 300 * 0.25) / 36
+    assert totals['tss'] == pytest.approx(100 + 2 * (864 + 75) / 36, abs=0.1)
+    assert totals['zone_s'] == [600, 0, 0, 3600, 1200, 0, 0]     # upper bounds are inclusive
+
+
+def test_find_uses_category_duration_and_tss():
+    raw = [('lit.json', 'LIT', _workout('easy_60', 60, 0.65)),
+           ('lit.json', 'LIT', _workout('easy_90', 90, 0.65)),
+           ('ftp.json', 'FTP', _workout('ftp_60', 60, 0.95, 'FTP')),
+           ('extra.json', 'LIT', _workout('easy_60', 75, 0.65))]
+    artifact, report = compile_library(raw, {'LIT': ('lit.json', 3)})
+    library = WorkoutLibrary(json.loads(json.dumps(artifact)))
+
+    assert len(library) == 3
+    matches = library.find(min_duration=55, max_duration=65)
+    assert [w['id'] for w in matches] == ['easy_60', 'ftp_60']
+    assert [w['id'] for w in library.find('LIT', min_tss=50)] == ['easy_90']
+    assert library.get('ftp_60')['tss'] == pytest.approx(90.2, abs=0.1)
+    assert any('extra.json declares 75 min' in w for w in report['warnings'])
+    assert any('declares 3 workouts, found 2' in w for w in report['warnings'])
+
+
+def test_repo_library_compiles_and_is_reused(tmp_path, scripts_dir):
+    root = scripts_dir.parent
+    output = str(tmp_path / 'library.json')
+
+    report, rebuilt = build(str(root / 'workouts'),
+                            str(root / 'CYCLONA_INTERVALS_LIBRARY.json'), output)
+
+    assert rebuilt and not report['errors']
+    assert report['workouts'] >= 120
+    assert not build(str(root / 'workouts'),
+                     str(root / 'CYCLONA_INTERVALS_LIBRARY.json'), output)[1]
+    assert WorkoutLibrary.load(output).find('FTP', max_duration=90)
@@ -0,0 +1,77 @@
+import argparse
+import json
+
+import numpy as np
+import pytest
+
+onnx = pytest.importorskip('onnx')
+pytest.importorskip('onnxruntime')
+
+from onnx import TensorProto, helper  # noqa: E402
+
+from tss_model.bundle import embed_metadata, load_manifest, read_metadata  # noqa: E402
+from tss_model.optimize import metadata_fields, optimize_model, run  # noqa: E402
+from tss_model.runtime import load_predictor  # noqa: E402
+
+
+@pytest.fixture
+def onnx_path(tmp_path):
+    """y = (x + 1) * 2, with constant-foldable initializers."""
+    one = helper.make_tensor('one', TensorProto.FLOAT, [1], [1.0])
+    two = helper.make_tensor('two', TensorProto.FLOAT, [1], [2.0])
+    graph = helper.make_graph(
+        [helper.make_node('Add', ['float_input', 'one'], ['shifted']),
+         helper.make_node('Mul', ['shifted', 'two'], ['variable'])],
+        'toy',
+        [helper.make_tensor_value_info('float_input', TensorProto.FLOAT, [None, 3])],
+        [helper.make_tensor_value_info('variable', TensorProto.FLOAT, [None, 3])],
+        initializer=[one, two],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid('', 13)])
+    model.ir_version = 8
+    path = tmp_path / 'toy.onnx'
+    onnx.save(model, str(path))
+    return str(path)
+
+
+def test_optimize_writes_loadable_artifacts(onnx_path):
+    report = optimize_model(onnx_path, 'basic', repeats=1)
+
+    X = np.arange(6, dtype=np.float32).reshape(2, 3)
+    expected = ((X + 1) * 2).ravel()
+    for kind in ('onnx', 'ort'):
+        predict = load_predictor(report[kind]['path'], optimization='disable')
+        np.testing.assert_allclose(predict(X), expected)
+        assert report[kind]['session_create_ms'] > 0
+
+    assert report['ort']['path'].endswith('toy.ort')
+    assert metadata_fields(onnx_path, 'basic') == {
+        'graphOptimizationLevel': 'basic',
+        'optimizedArtifacts': {'onnx': 'toy.opt.onnx', 'ort': 'toy.ort'},
+    }
+    json.dumps(report)
+
+
+def test_rejects_unknown_level(onnx_path):
+    with pytest.raises(ValueError):
+        optimize_model(onnx_path, 'disable')
+
+
+def test_standalone_optimize_updates_bundle_and_manifest(tmp_path, onnx_path):
+    manifest_path = str(tmp_path / 'model-manifest.json')
+    metadata = embed_metadata(onnx_path, {'version': 'v1', 'features': ['a', 'b', 'c']})
+    with open(tmp_path / 'toy.json', 'w') as f:
+        json.dump(metadata, f)
+
+    args = argparse.Namespace(input=onnx_path, level='basic', repeats=1, manifest=manifest_path)
+    assert run(args) == 0
+
+    embedded = read_metadata(onnx_path)
+    assert embedded['optimizedArtifacts'] == {'onnx': 'toy.opt.onnx', 'ort': 'toy.ort'}
+    assert embedded['modelHash'] == metadata['modelHash']
+    assert read_metadata(str(tmp_path / 'toy.opt.onnx')) == embedded
+    with open(tmp_path / 'toy.json') as f:
+        assert json.load(f) == embedded
+    models = load_manifest(manifest_path)['models']
+    assert sorted(models) == ['toy.onnx', 'toy.opt.onnx', 'toy.ort']
+    assert models['toy.onnx']['revision'] == 1
@@ -0,0 +1,60 @@
+import numpy as np
+
+from tss_model.features import FEATURE_NAMES
+from tss_model.parity import check_parity, feature_corpus, simulate_daily_metrics
+
+
+def test_corpus_is_seeded_and_realistic():
+    X = feature_corpus(1000, seed=3)
+
+    assert X.shape == (1000, len(FEATURE_NAMES))
+    assert X.dtype == np.float32
+    np.testing.assert_array_equal(X, feature_corpus(1000, seed=3))
+
+    column = dict(zip(FEATURE_NAMES, X.T))
+    assert np.all((column['TSS_zero7'] >= 0) & (column['TSS_zero7'] <= 7))
+    assert np.all(column['TSS_3d'] <= column['TSS_7d'])
+    assert np.all(np.abs(column['dow_sin']) <= 1)
+    np.testing.assert_allclose(column['TSB'], column['CTL_42'] - column['ATL_7'], atol=1e-3)
+
+
+def test_simulated_metrics_follow_ema():
+    data = simulate_daily_metrics(2, days=30, seed=1)
+    ctl = data['ctl'].reshape(2, 30)
+    tss = data['tss'].reshape(2, 30)
+    np.testing.assert_allclose(ctl[:, 1:], ctl[:, :-1] + 2 / 43 * (tss[:, 1:] - ctl[:, :-1]))
+
+
+def test_check_parity_flags_offset_candidates():
+    X = np.arange(40, dtype=np.float32).reshape(20, 2)
+
+    def reference(batch):
+        return batch.sum(axis=1)
+
+    report = check_parity(
+        reference,
+        {'same': reference, 'offset': lambda batch: reference(batch) + 286},
+        X, batch_rows=7, rtol=1e-4, atol=1.0,
+    )
+
+    assert report['rows'] == 20
+    assert report['candidates']['same']['passed']
+    assert report['candidates']['same']['max_abs'] == 0
+    offset = report['candidates']['offset']
+    assert not offset['passed']
+    assert offset['rows_over_tolerance'] == 20
+    assert offset['p50_abs'] == 286
+
+
+def test_concurrent_batches_give_the_same_report():
+    X = feature_corpus(3000, seed=5)
+
+    def reference(batch):
+        return batch[:, 0] * 2 + batch[:, 3]
+
+    candidates = {'shifted': lambda batch: reference(batch) + 0.5}
+    serial = check_parity(reference, candidates, X, batch_rows=256, atol=1.0)
+    threaded = check_parity(reference, candidates, X, batch_rows=256, atol=1.0, workers=4)
+
+    for key in ('max_abs', 'p99_abs', 'max_rel', 'rows_over_tolerance', 'worst_row', 'passed'):
+        assert threaded['candidates']['shifted'][key] == serial['candidates']['shifted'][key]
@@ -0,0 +1,43 @@
+import json
+import time
+
+from tss_model.profiling import Profiler, stage
+
+
+def test_stage_is_a_no_op_without_profiler():
+    with stage('anything') as record:
+        assert record is None
+
+
+def test_nested_stages_and_trace(tmp_path):
+    profiler = Profiler(sample_interval=0.001)
+    with profiler.active():
+        with stage('outer'):
+            with stage('inner'):
+                buffer = b'x' * (32 * 1024 * 1024)
+                time.sleep(0.01)
+                del buffer
+
+    report = profiler.save(str(tmp_path / 'profile.json'))
+
+    outer, inner = report['stages']
+    assert (outer['name'], outer['depth']) == ('outer', 0)
+    assert (inner['name'], inner['depth']) == ('inner', 1)
+    assert outer['wall_ms'] >= inner['wall_ms'] >= 10
+    if inner['rss_start_mb'] is not None:
+        assert inner['peak_rss_mb'] >= inner['rss_start_mb'] + 16
+
+    saved = json.loads((tmp_path / 'profile.json').read_text())
+    spans = [event for event in saved['traceEvents'] if event['ph'] == 'X']
+    assert [event['name'] for event in spans] == ['outer', 'inner']
+
+
+def test_stages_outside_active_profiler_are_not_recorded():
+    profiler = Profiler()
+    with profiler.active():
+        with stage('recorded'):
+            pass
+    with stage('ignored'):
+        pass
+
+    assert [record['name'] for record in profiler.report()['stages']] == ['recorded']
@@ -0,0 +1,148 @@
+import argparse
+import json
+
+import numpy as np
+import pytest
+
+from tss_model.features import FEATURE_NAMES
+from tss_model.forest import TreeEnsemble
+from tss_model import score
+from tss_model.matrix_io import PredictionWriter
+from tss_model.score import score_file
+
+
+@pytest.fixture
+def forest_path(tmp_path):
+    """Single tree: TSS_7d < 300 ? (CTL_42 < 50 ? 40 : 80) : 120, base_score 10."""
+    doc = {
+        'learner': {
+            'learner_model_param': {'base_score': '1E1', 'num_feature': str(len(FEATURE_NAMES))},
+            'gradient_booster': {
+                'name': 'gbtree',
+                'model': {'trees': [{
+                    'left_children': [1, 3, -1, -1, -1],
+                    'right_children': [2, 4, -1, -1, -1],
+                    'split_indices': [2, 7, 0, 0, 0],
+                    'split_conditions': [300.0, 50.0, 120.0, 40.0, 80.0],
+                    'default_left': [1, 1, 0, 0, 0],
+                }]},
+            },
+        }
+    }
+    path = tmp_path / 'forest.npz'
+    TreeEnsemble.from_model_json(doc).save(str(path))
+    return str(path)
+
+
+@pytest.fixture
+def features_path(tmp_path):
+    path = tmp_path / 'features.json'
+    path.write_text(json.dumps({'features': FEATURE_NAMES}))
+    return str(path)
+
+
+@pytest.fixture
+def matrix():
+    rng = np.random.default_rng(1)
+    X = (rng.random((1000, len(FEATURE_NAMES))) * [600 if i in (2, 7) else 1
+                                                   for i in range(len(FEATURE_NAMES))])
+    return X.astype(np.float32)
+
+
+def _expected(matrix):
+    return np.where(matrix[:, 2] < 300, np.where(matrix[:, 7] < 50, 50.0, 90.0), 130.0)
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_score_npy(tmp_path, forest_path, features_path, matrix, workers):
+    np.save(tmp_path / 'X.npy', matrix)
+    stats = score_file(forest_path, str(tmp_path / 'X.npy'), str(tmp_path / 'out.npy'),
+                       features_path=features_path, chunk_rows=64, workers=workers)
+
+    assert stats['rows'] == len(matrix)
+    np.testing.assert_allclose(np.load(tmp_path / 'out.npy'), _expected(matrix))
+
+
+def test_score_csv_with_header(tmp_path, forest_path, features_path, matrix):
+    # Extra leading column and shuffled feature order: columns are matched by name
+    header = ['athlete_id'] + FEATURE_NAMES[::-1]
+    lines = [','.join(header)]
+    lines += [','.join(['a1'] + [repr(float(v)) for v in row[::-1]]) for row in matrix]
+    (tmp_path / 'X.csv').write_text('\n'.join(lines))
+
+    score_file(forest_path, str(tmp_path / 'X.csv'), str(tmp_path / 'out.csv'),
+               features_path=features_path, chunk_rows=100, workers=2)
+
+    predictions = np.loadtxt(tmp_path / 'out.csv', skiprows=1)
+    np.testing.assert_allclose(predictions, _expected(matrix))
+
+
+def test_score_fortran_npy_is_spooled(tmp_path, forest_path, features_path, matrix):
+    np.save(tmp_path / 'X.npy', np.asfortranarray(matrix.astype(np.float64)))
+    score_file(forest_path, str(tmp_path / 'X.npy'), str(tmp_path / 'out.npy'),
+               features_path=features_path, chunk_rows=128, workers=1)
+
+    np.testing.assert_allclose(np.load(tmp_path / 'out.npy'), _expected(matrix))
+
+
+def test_prediction_writer_npy_header(tmp_path):
+    path = str(tmp_path / 'p.npy')
+    with PredictionWriter(path):
+        pass
+    assert np.load(path).shape == (0,)
+
+    with PredictionWriter(path) as writer:
+        writer.write(np.arange(3))
+        writer.write(np.arange(2))
+    np.testing.assert_array_equal(np.load(path), [0, 1, 2, 0, 1])
+
+
+def test_score_updates_drift_monitor(tmp_path, forest_path, features_path, matrix):
+    from tss_model.drift import DriftMonitor, build_profile
+
+    monitor = DriftMonitor(build_profile(matrix, FEATURE_NAMES))
+    np.save(tmp_path / 'X.npy', matrix)
+    score_file(forest_path, str(tmp_path / 'X.npy'), str(tmp_path / 'out.npy'),
+               features_path=features_path, chunk_rows=64, workers=2, monitor=monitor)
+
+    assert monitor.rows == len(matrix)
+    assert all(s['status'] == 'ok' for s in monitor.scores())
+
+
+def _args(tmp_path, forest_path, features_path, input_name='X.npy', **overrides):
+    return argparse.Namespace(**{
+        'model': forest_path, 'input': str(tmp_path / input_name),
+        'output': str(tmp_path / 'out.npy'), 'features': features_path, 'chunk_rows': 64,
+        'workers': 1, 'threads': None, 'drift_profile': None, 'drift_state': None,
+        **overrides})
+
+
+def test_score_rejects_mismatched_drift_profile(tmp_path, forest_path, features_path, matrix,
+                                                capsys):
+    from tss_model.drift import build_profile
+
+    np.save(tmp_path / 'X.npy', matrix)
+    profile = tmp_path / 'profile.json'
+    args = _args(tmp_path, forest_path, features_path, drift_profile=str(profile))
+
+    profile.write_text(json.dumps(build_profile(matrix[:, ::-1], FEATURE_NAMES[::-1])))
+    assert score.run(args) == 1
+    assert 'built for different features' in capsys.readouterr().out
+
+    profile.write_text(json.dumps({'version': 0}))
+    assert score.run(args) == 1
+    assert not (tmp_path / 'out.npy').exists()
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_bad_input_fails_without_leaving_an_output(tmp_path, forest_path, features_path, matrix,
+                                                   workers, capsys):
+    np.save(tmp_path / 'narrow.npy', matrix[:, :14])
+    (tmp_path / 'short.csv').write_text('\n'.join(','.join(['1'] * 15) for _ in range(100))
+                                        + '\n1,2,3\n')
+
+    for name in ('narrow.npy', 'short.csv'):
+        args = _args(tmp_path, forest_path, features_path, name, workers=workers)
+        assert score.run(args) == 1
+        assert '❌' in capsys.readouterr().out
+        assert list(tmp_path.glob('out.npy*')) == []
@@ -0,0 +1,101 @@
+import argparse
+import asyncio
+import json
+
+import numpy as np
+
+from tss_model.serve import Histogram, MicroBatcher, run, start_server
+
+
+def _row_sums(X):
+    return X.sum(axis=1)
+
+
+def test_histogram_buckets():
+    histogram = Histogram((1, 4))
+    for value in (1, 2, 4, 5):
+        histogram.observe(value)
+    assert histogram.snapshot() == {'buckets': {'1': 1, '4': 2, '+Inf': 1}, 'count': 4, 'mean': 3.0}
+
+
+def test_concurrent_requests_are_batched():
+    batches = []
+
+    def predict(X):
+        batches.append(len(X))
+        return _row_sums(X)
+
+    async def scenario():
+        batcher = MicroBatcher(predict, num_features=2, max_batch_size=4, max_wait_ms=50)
+        batcher.start()
+        rows = [np.array([[i, 1.0]]) for i in range(10)]
+        results = await asyncio.gather(*(batcher.submit(r) for r in rows))
+        await batcher.stop()
+        return results, batcher.metrics()
+
+    results, metrics = asyncio.run(scenario())
+
+    assert [float(r[0]) for r in results] == [i + 1.0 for i in range(10)]
+    assert batches == [4, 4, 2]
+    assert metrics['batch_size']['count'] == 3
+    assert metrics['max_queue_depth'] == 10
+    assert metrics['queue_depth'] == 0
+
+
+def test_prediction_errors_reach_callers():
+    def predict(X):
+        raise RuntimeError('model failed')
+
+    async def scenario():
+        batcher = MicroBatcher(predict, num_features=1, max_wait_ms=1)
+        batcher.start()
+        try:
+            await batcher.submit(np.zeros((1, 1)))
+        except RuntimeError as e:
+            return str(e)
+        finally:
+            await batcher.stop()
+
+    assert asyncio.run(scenario()) == 'model failed'
+
+
+def test_http_round_trip():
+    async def request(port, method, path, payload=None):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        body = json.dumps(payload).encode() if payload is not None else b''
+        writer.write(f'{method} {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\n'
+                     f'Connection: close\r\n\r\n'.encode() + body)
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        head, _, content = response.partition(b'\r\n\r\n')
+        return int(head.split()[1]), json.loads(content)
+
+    async def scenario():
+        server, app = await start_server(_row_sums, num_features=3, port=0, max_wait_ms=1)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            single = await request(port, 'POST', '/predict', {'features': [1, 2, 3]})
+            many = await request(port, 'POST', '/predict', {'instances': [[1, 1, 1], [0, 0, 2]]})
+            invalid = await request(port, 'POST', '/predict', {'features': [1, 2]})
+            metrics = await request(port, 'GET', '/metrics')
+        await app.batcher.stop()
+        return single, many, invalid, metrics
+
+    single, many, invalid, metrics = asyncio.run(scenario())
+
+    assert single == (200, {'prediction': 6.0})
+    assert many == (200, {'predictions': [3.0, 2.0]})
+    assert invalid[0] == 400
+    assert metrics[1]['requests'] == 3
+    assert metrics[1]['batch_size']['count'] == 2
+
+
+def test_row_width_comes_from_the_features_file(tmp_path, capsys):
+    model = tmp_path / 'model.onnx'
+    model.write_bytes(b'')
+    args = argparse.Namespace(model=str(model), features=str(tmp_path / 'missing.json'),
+                              num_features=None)
+
+    assert run(args) == 1
+    assert 'Features file not found' in capsys.readouterr().out
@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from tss_model import store as store_module
+
+from tss_model.features import compute_features
+from tss_model.parity import simulate_daily_metrics
+from tss_model.store import FeatureStore
+
+
+def _take(data, rows):
+    return {name: values[rows] for name, values in data.items()}
+
+
+@pytest.fixture
+def data():
+    return simulate_daily_metrics(athletes=3, days=80, seed=4)
+
+
+def test_incremental_appends_match_full_recompute(tmp_path, data):
+    expected = compute_features(**data).astype(np.float32)
+    day = np.tile(np.arange(80), 3)
+
+    store = FeatureStore(str(tmp_path))
+    store.append(**_take(data, day < 50))
+    for d in range(50, 80):
+        FeatureStore(str(tmp_path)).append(**_take(data, day == d))
+
+    store = FeatureStore(str(tmp_path))
+    assert store.num_rows == 240
+    assert len(store.meta['segments']) <= 6
+    assert sorted(p.name for p in (tmp_path / 'segments').iterdir()) == store.meta['segments']
+    np.testing.assert_allclose(store.get(data['athlete_ids'], data['dates']), expected,
+                               rtol=1e-6, atol=1e-4)
+    dates, features = store.history(1)
+    np.testing.assert_array_equal(dates, data['dates'][80:160])
+    np.testing.assert_allclose(features, expected[80:160], rtol=1e-6, atol=1e-4)
+
+
+def test_overlapping_input_is_skipped(tmp_path, data):
+    store = FeatureStore(str(tmp_path))
+    first = store.append(**_take(data, np.arange(240) % 80 < 60))
+    second = store.append(**data)
+
+    assert first == {'added': 180, 'skipped': 0, 'new_athletes': 3}
+    assert second == {'added': 60, 'skipped': 180, 'new_athletes': 0}
+
+
+def test_lookup_of_missing_days(tmp_path, data):
+    store = FeatureStore(str(tmp_path))
+    store.append(**data)
+
+    rows = store.rows(['0', '0', 'nobody'], [data['dates'][5], '1999-01-01', data['dates'][5]])
+    assert rows.tolist() == [5, -1, -1]
+    with pytest.raises(KeyError):
+        store.get(['nobody'], ['2024-01-01'])
+
+
+def test_interrupted_append_is_truncated(tmp_path, data):
+    store = FeatureStore(str(tmp_path))
+    store.append(**_take(data, np.arange(240) < 80))
+    with open(tmp_path / 'columns' / 'TSS_7d.f32', 'ab') as f:
+        f.write(b'\0' * 12)
+
+    store = FeatureStore(str(tmp_path))
+    assert (tmp_path / 'columns' / 'TSS_7d.f32').stat().st_size == 80 * 4
+    store.append(**data)
+    assert store.matrix().shape == (240, 15)
+
+
+def test_append_interrupted_before_meta_is_rolled_back(tmp_path, data, monkeypatch):
+    first = np.arange(240) % 80 < 40
+    FeatureStore(str(tmp_path)).append(**_take(data, first))
+
+    write = store_module._atomic_write
+
+    def crash_on_meta(path, payload):
+        if path.endswith('meta.json'):
+            raise OSError('disk full')
+        write(path, payload)
+
+    monkeypatch.setattr(store_module, '_atomic_write', crash_on_meta)
+    with pytest.raises(OSError):
+        FeatureStore(str(tmp_path)).append(**data)
+    monkeypatch.undo()
+
+    store = FeatureStore(str(tmp_path))
+    assert store.num_rows == 120
+    assert len(list((tmp_path / 'segments').iterdir())) == len(store.meta['segments'])
+    assert store.get(data['athlete_ids'][first], data['dates'][first]).shape == (120, 15)
+    assert store.append(**data)['added'] == 120
@@ -0,0 +1,51 @@
+import numpy as np
+
+from tss_model.backfill import backfill
+from tss_model.synth import BLOCK_ATHLETES, generate, generate_block, iter_blocks
+
+
+def test_seeded_and_independent_of_athlete_count():
+    first = generate_block(0, 50, 120, seed=7)
+    np.testing.assert_array_equal(first['tss'], generate_block(0, 50, 120, seed=7)['tss'])
+    assert not np.array_equal(first['tss'], generate_block(0, 50, 120, seed=8)['tss'])
+
+    blocks = list(iter_blocks(BLOCK_ATHLETES + 5, 30, seed=7))
+    assert [len(np.unique(b['athlete_id'])) for b in blocks] == [BLOCK_ATHLETES, 5]
+    assert blocks[1]['athlete_id'][0] == BLOCK_ATHLETES
+    np.testing.assert_array_equal(blocks[0]['tss'],
+                                  next(iter_blocks(BLOCK_ATHLETES, 30, seed=7))['tss'])
+
+
+def test_ctl_atl_match_backfill():
+    data = generate_block(0, 20, 400, seed=1)
+    daily, _ = backfill(data['date'], data['tss'], data['athlete_id'])
+
+    np.testing.assert_allclose(daily['ctl'], data['ctl'], atol=1e-9)
+    np.testing.assert_allclose(daily['atl'], data['atl'], atol=1e-9)
+    np.testing.assert_allclose(data['tsb'], data['ctl'] - data['atl'])
+
+
+def test_weekly_and_seasonal_structure():
+    data = generate_block(0, 500, 730, seed=3)
+    tss, dates = data['tss'], data['date']
+    weekday = (dates.astype(np.int64) + 4) % 7
+    month = dates.astype('datetime64[M]').astype(np.int64) % 12
+
+    weekend = tss[(weekday == 0) | (weekday == 6)].mean()
+    midweek = tss[(weekday >= 1) & (weekday <= 5)].mean()
+    assert weekend > 1.2 * midweek
+    assert tss[(month >= 5) & (month <= 7)].mean() > 1.15 * tss[(month <= 1) | (month == 11)].mean()
+    assert 0.15 < np.mean(tss == 0) < 0.45
+    assert np.all(np.diff(data['date'].astype(np.int64)[:730]) == 1)
+
+
+def test_generate_writes_npy_columns(tmp_path):
+    stats = generate(str(tmp_path / 'out'), athletes=30, days=50, seed=2, features=True)
+
+    assert stats['rows'] == 30 * 50
+    tss = np.load(tmp_path / 'out' / 'tss.npy')
+    dates = np.load(tmp_path / 'out' / 'date.npy')
+    features = np.load(tmp_path / 'out' / 'features.npy')
+    assert tss.shape == dates.shape == (1500,) and dates.dtype == np.dtype('datetime64[D]')
+    assert features.shape == (1500, 15) and features.dtype == np.float32
+    np.testing.assert_array_equal(tss, generate_block(0, 30, 50, seed=2)['tss'])
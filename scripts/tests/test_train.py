@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from tss_model.parity import simulate_daily_metrics
+from tss_model.train import features_path_for, time_split, training_data
+
+
+def test_training_rows_skip_first_day_of_each_athlete():
+    data = simulate_daily_metrics(athletes=3, days=20, seed=1)
+    dataset = training_data(**data)
+
+    assert dataset['X'].shape == (3 * 19, 15)
+    assert dataset['X'].dtype == np.float32
+    # Target is the day's own TSS; TSS_lag1 is the day before
+    np.testing.assert_array_equal(dataset['y'], data['tss'].reshape(3, 20)[:, 1:].ravel())
+    np.testing.assert_array_equal(dataset['X'][1:19, 0], dataset['y'][:18])
+
+
+def test_time_split_holds_out_the_last_days_of_every_athlete():
+    dates = np.array(['2024-01-01', '2024-01-02', '2024-01-03',
+                      '2024-03-01', '2024-03-05'], dtype='datetime64[D]')
+    athletes = np.array(['a', 'a', 'a', 'b', 'b'])
+
+    mask = time_split(dates, 2, athletes)
+
+    assert mask.tolist() == [False, True, True, False, True]
+
+
+def test_feature_list_defaults_next_to_the_model():
+    assert features_path_for('out/model.json') == 'out/model.features.json'
+    assert features_path_for('model.ubj') == 'model.ubj.features.json'
+
+
+def test_trained_model_loads_for_conversion(tmp_path):
+    pytest.importorskip('xgboost')
+    from tss_model.model_io import load_model, read_base_score
+    from tss_model.train import save_model, train_model
+
+    dataset = training_data(**simulate_daily_metrics(athletes=20, days=60, seed=2))
+    validation = time_split(dataset['dates'], 7, dataset['athlete_ids'])
+    booster, report = train_model(dataset['X'], dataset['y'], validation,
+                                  num_boost_round=30, early_stopping_rounds=5, threads=1)
+
+    path = str(tmp_path / 'model.json')
+    save_model(booster, path)
+    loaded = load_model(path)
+
+    assert report['validation_rows'] == 20 * 7
+    assert loaded.num_boosted_rounds() == report['best_iteration'] + 1
+    assert np.isfinite(read_base_score(loaded))
+    best = (0, report['best_iteration'] + 1)
+    np.testing.assert_allclose(loaded.inplace_predict(dataset['X'][:100]),
+                               booster.inplace_predict(dataset['X'][:100], iteration_range=best),
+                               rtol=1e-6)
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from tss_model.tune import fold_masks, parameter_grid, pareto_front
+
+
+def test_folds_train_only_on_earlier_days():
+    age = np.arange(10)[::-1]          # 9 days before the end ... the last day
+
+    masks = fold_masks(age, folds=2, fold_days=3)
+
+    (train_0, valid_0), (train_1, valid_1) = masks
+    assert age[valid_0].tolist() == [5, 4, 3]
+    assert age[valid_1].tolist() == [2, 1, 0]
+    assert age[train_0].min() == 6
+    assert age[train_1].min() == 3
+
+
+def test_parameter_grid_sample_is_seeded_subset():
+    grid = {'max_depth': [4, 6, 8], 'eta': [0.05, 0.1]}
+    full = parameter_grid(grid)
+
+    assert len(full) == 6
+    sample = parameter_grid(grid, trials=3, seed=1)
+    assert sample == parameter_grid(grid, trials=3, seed=1)
+    assert len(sample) == 3 and all(params in full for params in sample)
+
+
+def test_pareto_front_drops_slower_and_less_accurate():
+    def result(rmse, ms):
+        return {'rmse': rmse, 'inference': {'single_row_p50_ms': ms}}
+
+    results = [result(50, 0.01), result(49, 0.02), result(51, 0.03)]
+
+    assert pareto_front(results) == [0, 1]
+
+
+def test_search_resumes_from_trial_cache(tmp_path):
+    pytest.importorskip('xgboost')
+    pytest.importorskip('onnxmltools')
+    pytest.importorskip('onnxruntime')
+    from tss_model.parity import simulate_daily_metrics
+    from tss_model.tune import materialize, search
+
+    work_dir = str(tmp_path)
+    info = materialize(lambda: simulate_daily_metrics(20, days=90, seed=3), work_dir, 'test')
+    candidates = [{'max_depth': 2, 'eta': 0.3, 'n_estimators': 5, 'subsample': 1.0}]
+
+    first = search(work_dir, info['fingerprint'], candidates, folds=2, fold_days=14, workers=1)
+    second = search(work_dir, info['fingerprint'], candidates, folds=2, fold_days=14, workers=1)
+
+    assert not first[0]['cached'] and second[0]['cached']
+    assert second[0]['rmse'] == first[0]['rmse']
+    assert len(first[0]['fold_rmse']) == 2
+    assert first[0]['inference']['size_bytes'] > 0
+    assert second[0]['inference'] == first[0]['inference']
+    assert [p.name for p in (tmp_path / 'trials').iterdir() if 'model' in p.name] == []
+    assert materialize(None, work_dir, 'test')['reused']
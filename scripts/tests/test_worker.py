@@ -0,0 +1,71 @@
+import io
+import json
+import socket
+import threading
+
+import pytest
+
+from tss_model.worker import Worker, run_job
+
+
+def test_job_output_and_exit_code_are_captured(tmp_path):
+    missing = str(tmp_path / 'missing.onnx')
+
+    response = run_job({'id': 7, 'args': ['bundle', '-i', missing, '--show']})
+
+    assert response['id'] == 7
+    assert response['exit_code'] == 1
+    assert 'Model file not found' in response['output']
+
+
+def test_argument_errors_do_not_stop_the_worker():
+    assert run_job({'args': ['convert', '--bogus']})['exit_code'] == 2
+    assert run_job({'args': ['worker']})['exit_code'] == 2
+    assert run_job({'args': 'convert'})['exit_code'] == 2
+
+
+def test_stream_answers_each_line_until_shutdown():
+    requests = '\n'.join([
+        '{"id": 1, "command": "ping"}',
+        'not json',
+        '{"id": 2, "args": ["features", "--help"]}',
+        '{"command": "shutdown"}',
+        '{"id": 3, "command": "ping"}',
+    ]) + '\n'
+    out = io.StringIO()
+
+    Worker().serve_stream(io.StringIO(requests), out)
+
+    responses = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [r.get('id') for r in responses] == [1, None, 2, None]
+    assert responses[1]['exit_code'] == 2
+    assert responses[2]['exit_code'] == 0 and 'feature matrix' in responses[2]['output']
+    assert responses[3]['status'] == 'stopping'
+
+
+@pytest.mark.skipif(not hasattr(socket, 'AF_UNIX'), reason='needs Unix sockets')
+def test_unix_socket_server(tmp_path):
+    path = str(tmp_path / 'worker.sock')
+    server = Worker().make_server(socket_path=path)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    with socket.socket(socket.AF_UNIX) as client:
+        client.connect(path)
+        client.sendall(b'{"id": "a", "command": "ping"}\n{"command": "shutdown"}\n')
+        reader = client.makefile('r')
+        assert json.loads(reader.readline())['status'] == 'ok'
+        assert json.loads(reader.readline())['status'] == 'stopping'
+
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+    server.server_close()
+
+
+def test_socket_path_that_is_a_regular_file_is_kept(tmp_path):
+    path = tmp_path / 'model.onnx'
+    path.write_bytes(b'model')
+
+    with pytest.raises(ValueError, match='not a socket'):
+        Worker().make_server(socket_path=str(path))
+    assert path.read_bytes() == b'model'
@@ -0,0 +1,54 @@
+import json
+import zipfile
+
+from tss_model.library import WorkoutLibrary, compile_library
+from tss_model.zwo import build_zwo_xml, export_packs, render_workout, zwo_steps
+
+
+def _workouts(work_intensity=1.2):
+    raw = [('vo2max.json', 'VO2MAX', {
+        'id': 'vo2_4x4', 'name': '4x4 <VO2>', 'duration_min': 54,
+        'structure': [
+            {'type': 'warmup', 'duration_s': 720, 'intensity_ftp': 0.6},
+            {'type': 'intervals', 'repeats': 4, 'work_s': 240, 'rest_s': 240,
+             'work_intensity_ftp': work_intensity, 'rest_intensity_ftp': 0.5},
+            {'type': 'cooldown', 'duration_s': 600, 'intensity_ftp': 0.5},
+        ]})]
+    library = WorkoutLibrary(compile_library(raw)[0])
+    return [library.row(row) for row in range(len(library))]
+
+
+def test_xml_matches_the_typescript_builder():
+    xml = build_zwo_xml('A & B', [('SteadyState', {'duration': 600, 'power': 1.0, 'name': 'x',
+                                                   'cadence': None})], tags=['LIT'])
+
+    assert '<name>A &amp; B</name>' in xml
+    # String(1.0) is "1" in JavaScript; missing attributes are left out
+    assert '<SteadyState Duration="600" Power="1" Name="x" />' in xml
+    assert '<tag name="LIT"/>' in xml
+
+
+def test_steps_carry_tier_watts():
+    workout = _workouts()[0]
+
+    steps = zwo_steps(workout['segments'], 250)
+
+    assert [element for element, _ in steps] == ['Warmup', 'IntervalsT', 'SteadyState']
+    assert steps[1][1]['name'] == 'Intervals (300 W)'
+    assert 'FTP 250W' in render_workout(workout, 250)
+
+
+def test_unchanged_tiers_are_skipped(tmp_path):
+    first = export_packs(_workouts(), [200, 300], str(tmp_path), workers=1)
+    second = export_packs(_workouts(), [200, 300], str(tmp_path), workers=1)
+    third = export_packs(_workouts(work_intensity=1.25), [200, 300], str(tmp_path), workers=1)
+
+    assert [r['skipped'] for r in first] == [False, False]
+    assert [r['skipped'] for r in second] == [True, True]
+    assert second[0]['sha256'] == first[0]['sha256']
+    assert [r['changed'] for r in third] == [1, 1]
+    with zipfile.ZipFile(tmp_path / 'zwo-ftp-300.zip') as pack:
+        assert pack.namelist() == ['vo2max/vo2_4x4.zwo']
+        assert 'OnPower="1.25"' in pack.read('vo2max/vo2_4x4.zwo').decode()
+    manifest = json.loads((tmp_path / 'zwo-manifest.json').read_text())
+    assert sorted(manifest['tiers']) == ['200', '300']
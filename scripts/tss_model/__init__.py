@@ -0,0 +1,10 @@
+"""
+TSS model tooling.
+
+Shared Python tooling for the XGBoost TSS predictor: conversion to ONNX and
+everything built around it. Run from the scripts/ directory:
+
+    python -m tss_model --help
+"""
+
+__version__ = '0.1.0'
@@ -0,0 +1,189 @@
+"""
+ONNX conversion backends.
+
+Every backend takes (model, n_features, opset, work_dir) plus the keyword
+options it declares. It returns the serialized ONNX model as bytes, or as
+(bytes, details) when it made choices worth recording in the metadata.
+Heavy libraries are imported inside the backend, so only the selected
+backend is loaded.
+"""
+
+import os
+from typing import Callable, NamedTuple
+
+from .model_io import fix_base_score
+from .profiling import stage
+
+
+class Backend(NamedTuple):
+    name: str
+    convert: Callable
+    default_opset: int
+    description: str
+    # Modules the backend imports when it runs (preloaded by the worker)
+    imports: tuple = ()
+    # Keyword options convert accepts (part of the conversion cache key)
+    options: tuple = ()
+
+    def run(self, model, n_features: int, opset: int, work_dir: str, **options) -> tuple:
+        """Convert and return (onnx_bytes, details), details being {} for most backends."""
+        unknown = set(options) - set(self.options)
+        if unknown:
+            raise ValueError(f"Backend '{self.name}' has no option(s) {', '.join(sorted(unknown))}")
+        result = self.convert(model, n_features, opset, work_dir, **options)
+        return result if isinstance(result, tuple) else (result, {})
+
+
+BACKENDS = {}
+
+DEFAULT_BACKEND = 'onnxmltools-fixed'
+INPUT_NAME = 'float_input'
+
+# Hummingbird tree implementations; 'auto' benchmarks all of them
+TREE_STRATEGIES = ('gemm', 'tree_trav', 'perf_tree_trav')
+# Batch sizes each target workload is benchmarked on
+WORKLOADS = {'online': (1,), 'bulk': (1000, 10000)}
+DEFAULT_WORKLOAD = 'online'
+
+
+def register_backend(name: str, default_opset: int, description: str, imports: tuple = (),
+                     options: tuple = ()):
+    """Decorator registering a conversion function under a backend name."""
+    def decorator(func):
+        BACKENDS[name] = Backend(name, func, default_opset, description, imports, options)
+        return func
+    return decorator
+
+
+def get_backend(name: str) -> Backend:
+    """Look up a registered backend."""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend '{name}' (available: {', '.join(sorted(BACKENDS))})")
+    return BACKENDS[name]
+
+
+def _onnxmltools_convert(model, n_features: int, opset: int) -> bytes:
+    import onnxmltools
+    from onnxmltools.convert.common.data_types import FloatTensorType
+
+    initial_types = [(INPUT_NAME, FloatTensorType([None, n_features]))]
+    with stage('onnxmltools.convert_xgboost'):
+        onnx_model = onnxmltools.convert_xgboost(
+            model,
+            initial_types=initial_types,
+            target_opset=opset
+        )
+    with stage('serialize'):
+        return onnx_model.SerializeToString()
+
+
+@register_backend('onnxmltools', 12, 'onnxmltools.convert_xgboost on the model as loaded',
+                  imports=('xgboost', 'onnxmltools'))
+def convert_onnxmltools(model, n_features: int, opset: int, work_dir: str) -> bytes:
+    """Convert with onnxmltools (works with XGBoost 1.7.x models)."""
+    return _onnxmltools_convert(model, n_features, opset)
+
+
+@register_backend('onnxmltools-fixed', 12,
+                  'onnxmltools after rewriting base_score via JSON round trip',
+                  imports=('xgboost', 'onnxmltools'))
+def convert_onnxmltools_fixed(model, n_features: int, opset: int, work_dir: str) -> bytes:
+    """Convert with onnxmltools after fixing the base_score format."""
+    with stage('base_score_fix'):
+        booster = fix_base_score(model, work_dir)
+    return _onnxmltools_convert(booster, n_features, opset)
+
+
+def _hummingbird_convert(model, n_features: int, opset: int, strategy: str) -> bytes:
+    import numpy as np
+    # Importing Hummingbird loads PyTorch, a large part of its time and memory
+    with stage('hummingbird.import'):
+        from hummingbird.ml import constants, convert
+
+    # Hummingbird traces the model, so it needs a sample input
+    test_input = np.random.randn(1, n_features).astype(np.float32)
+    with stage(f'hummingbird.convert.{strategy}'):
+        container = convert(
+            model,
+            backend='onnx',
+            test_input=test_input,
+            extra_config={'onnx_target_opset': opset, constants.TREE_IMPLEMENTATION: strategy}
+        )
+    with stage('serialize'):
+        return container.model.SerializeToString()
+
+
+def benchmark_strategy(onnx_bytes: bytes, n_features: int, batch_sizes: tuple, work_dir: str,
+                       min_time: float = 0.2) -> dict:
+    """Median latency per batch size and the mean cost per row over all of them."""
+    import numpy as np
+
+    from .bench import measure
+    from .runtime import create_session, session_predictor
+
+    path = os.path.join(work_dir, 'candidate.onnx')
+    with open(path, 'wb') as f:
+        f.write(onnx_bytes)
+    predict = session_predictor(create_session(path))
+
+    rng = np.random.default_rng(0)
+    X = (rng.random((max(batch_sizes), n_features)) * 300).astype(np.float32)
+    p50_ms = {size: float(np.median(measure(predict, X[:size], min_time=min_time))) * 1000
+              for size in batch_sizes}
+    return {
+        'p50_ms': {str(size): ms for size, ms in p50_ms.items()},
+        'ms_per_row': sum(ms / size for size, ms in p50_ms.items()) / len(batch_sizes),
+    }
+
+
+@register_backend('hummingbird', 15, 'Hummingbird (PyTorch tensor graph exported to ONNX)',
+                  imports=('xgboost', 'hummingbird.ml', 'onnxruntime'),
+                  options=('tree_strategy', 'workload'))
+def convert_hummingbird(model, n_features: int, opset: int, work_dir: str,
+                        tree_strategy: str = 'auto', workload: str = DEFAULT_WORKLOAD):
+    """
+    Convert with Hummingbird, which bypasses the base_score bug entirely.
+
+    With tree_strategy='auto' every tree implementation is compiled and timed
+    on the workload's batch sizes. The fastest one is kept. The choice and
+    the timings are returned as details for the metadata.
+    """
+    if tree_strategy != 'auto':
+        if tree_strategy not in TREE_STRATEGIES:
+            raise ValueError(f"Unknown tree strategy '{tree_strategy}'")
+        return (_hummingbird_convert(model, n_features, opset, tree_strategy),
+                {'treeStrategy': tree_strategy})
+    if workload not in WORKLOADS:
+        raise ValueError(f"Unknown workload '{workload}' (available: {', '.join(WORKLOADS)})")
+
+    candidates, timings, errors = {}, {}, {}
+    for strategy in TREE_STRATEGIES:
+        try:
+            candidates[strategy] = _hummingbird_convert(model, n_features, opset, strategy)
+        except Exception as e:          # e.g. perf_tree_trav on very deep trees
+            errors[strategy] = f'{type(e).__name__}: {e}'
+            continue
+        with stage(f'hummingbird.benchmark.{strategy}'):
+            timings[strategy] = benchmark_strategy(candidates[strategy], n_features,
+                                                   WORKLOADS[workload], work_dir)
+    if not candidates:
+        raise RuntimeError(f"No tree strategy converted: {errors}")
+
+    best = min(timings, key=lambda strategy: timings[strategy]['ms_per_row'])
+    details = {'treeStrategy': best, 'workload': workload, 'strategyBenchmark': timings}
+    if errors:
+        details['strategyErrors'] = errors
+    return candidates[best], details
+
+
+@register_backend('compact', 21,
+                  'Pruned forest as one ai.onnx.ml TreeEnsemble node (packed tensors)',
+                  imports=('xgboost', 'onnx', 'numpy'))
+def convert_compact(model, n_features: int, opset: int, work_dir: str) -> bytes:
+    """Emit the compacted forest directly, without a converter library."""
+    from .compact import compact_forest, forest_to_onnx
+    from .forest import TreeEnsemble
+    from .model_io import booster_config
+
+    forest, _ = compact_forest(TreeEnsemble.from_model_json(booster_config(model, work_dir)))
+    return forest_to_onnx(forest, opset).SerializeToString()
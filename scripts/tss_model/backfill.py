@@ -0,0 +1,254 @@
+"""
+Bulk CTL/ATL/TSB backfill mirroring calculateFitnessMetrics in
+src/lib/fitnessMetrics.ts.
+
+Activities are summed to daily TSS on a per-athlete calendar (rest days are
+0, from the first to the last activity date) and the EMA recurrence
+
+    ema[t] = ema[t-1] + alpha * (tss[t] - ema[t-1]),  alpha = 2 / (N + 1)
+
+is evaluated as a linear filter over blocks of days: within a block every
+day is a fixed linear combination of the block's TSS and the carried-in
+value, i.e. one small matrix product for all athletes at once. Years of
+history take a few dozen block steps instead of a Python loop per day.
+Daily matrices are day-major (days, athletes) so every block is contiguous.
+
+A state file (last day, CTL and ATL per athlete) lets later runs start
+after the stored day and only compute new days.
+"""
+
+import csv
+import json
+import os
+
+import numpy as np
+
+CTL_DAYS = 42
+ATL_DAYS = 7
+DEFAULT_BLOCK_DAYS = 64
+
+
+def ema_alpha(days: int) -> float:
+    return 2 / (days + 1)
+
+
+def _block_operator(alpha: float, block: int) -> tuple:
+    """(B, B) lower-triangular weights of the block's TSS and (B,) weight of the carried value."""
+    decay = 1 - alpha
+    lag = np.arange(block)[:, None] - np.arange(block)[None, :]
+    weights = np.where(lag >= 0, alpha * decay ** np.maximum(lag, 0), 0.0)
+    carry = decay ** np.arange(1, block + 1)
+    return weights, carry
+
+
+def ema_filter(values: np.ndarray, alpha: float, initial=0.0,
+               block: int = DEFAULT_BLOCK_DAYS) -> np.ndarray:
+    """
+    EMA down the columns of a (days, series) matrix, starting from `initial`
+    (scalar or one value per series) before the first day.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim == 1:
+        values = values[:, None]
+    out = np.empty_like(values)
+    state = np.broadcast_to(np.asarray(initial, dtype=np.float64), values.shape[1:]).copy()
+
+    weights, carry = _block_operator(alpha, block)
+    for start in range(0, values.shape[0], block):
+        chunk = values[start:start + block]
+        width = chunk.shape[0]
+        np.matmul(weights[:width, :width], chunk, out=out[start:start + width])
+        out[start:start + width] += carry[:width, None] * state
+        state = out[start + width - 1]
+    return out
+
+
+def daily_tss(dates, tss, athlete_ids=None, start_dates=None) -> dict:
+    """
+    Sum activities to a (days, athletes) daily TSS matrix.
+
+    Each athlete's calendar runs from its first activity (or its entry in
+    start_dates, a dict athlete -> first day) to its last activity; shorter
+    calendars are zero-padded at the end. Activities before an athlete's
+    start date must already be dropped (backfill does so on resume).
+    """
+    dates = np.asarray(dates, dtype='datetime64[D]')
+    tss = np.nan_to_num(np.asarray(tss, dtype=np.float64))
+    # Athletes are keyed by string so they round-trip through the state JSON
+    if athlete_ids is None:
+        athlete_ids = np.zeros(len(tss), dtype=np.int64)
+    athletes, athlete_index = np.unique(np.asarray(athlete_ids), return_inverse=True)
+    athletes = athletes.astype(str)
+
+    day_number = dates.astype(np.int64)
+    first = np.full(len(athletes), np.iinfo(np.int64).max)
+    last = np.full(len(athletes), np.iinfo(np.int64).min)
+    np.minimum.at(first, athlete_index, day_number)
+    np.maximum.at(last, athlete_index, day_number)
+    if start_dates:
+        for i, athlete in enumerate(athletes.tolist()):
+            if athlete in start_dates:
+                first[i] = np.datetime64(start_dates[athlete], 'D').astype(np.int64)
+
+    lengths = last - first + 1
+    num_days = int(lengths.max()) if len(athletes) else 0
+    cells = (day_number - first[athlete_index]) * len(athletes) + athlete_index
+    matrix = np.bincount(cells, weights=tss, minlength=num_days * len(athletes))
+
+    return {
+        'athlete_ids': athletes,
+        'start_dates': first.astype('datetime64[D]'),
+        'lengths': lengths,
+        'tss': matrix.reshape(num_days, len(athletes)),
+    }
+
+
+def backfill(dates, tss, athlete_ids=None, state: dict = None,
+             block: int = DEFAULT_BLOCK_DAYS) -> tuple:
+    """
+    Compute daily CTL/ATL/TSB from activities.
+
+    state maps athlete -> {'date', 'ctl', 'atl'} (the last computed day);
+    those athletes resume the day after it, and their activities on or
+    before it are dropped (an ingest table holds the whole history).
+    Returns (daily, new_state), where daily holds flat, athlete-grouped
+    date/tss/ctl/atl/tsb/athlete_id columns.
+    """
+    state = state or {}
+    resume_from = {athlete: np.datetime64(entry['date'], 'D') + np.timedelta64(1, 'D')
+                   for athlete, entry in state.items()}
+    if resume_from:
+        dates, tss, athlete_ids = _after_resume(dates, tss, athlete_ids, resume_from)
+    grid = daily_tss(dates, tss, athlete_ids, start_dates=resume_from)
+    athletes = grid['athlete_ids'].tolist()
+
+    initial_ctl = np.array([state.get(a, {}).get('ctl', 0.0) for a in athletes])
+    initial_atl = np.array([state.get(a, {}).get('atl', 0.0) for a in athletes])
+    ctl = ema_filter(grid['tss'], ema_alpha(CTL_DAYS), initial_ctl, block)
+    atl = ema_filter(grid['tss'], ema_alpha(ATL_DAYS), initial_atl, block)
+
+    # Flatten athlete by athlete, dropping each athlete's padding
+    num_days = grid['tss'].shape[0]
+    valid = np.arange(num_days) < grid['lengths'][:, None]
+    offsets = np.broadcast_to(np.arange(num_days), valid.shape)[valid]
+    columns = np.broadcast_to(np.arange(len(athletes))[:, None], valid.shape)[valid]
+    daily = {
+        'athlete_ids': grid['athlete_ids'][columns],
+        'dates': grid['start_dates'][columns] + offsets.astype('timedelta64[D]'),
+        'tss': grid['tss'][offsets, columns],
+        'ctl': ctl[offsets, columns],
+        'atl': atl[offsets, columns],
+    }
+    daily['tsb'] = daily['ctl'] - daily['atl']
+
+    new_state = dict(state)
+    last = grid['lengths'] - 1
+    for i, athlete in enumerate(athletes):
+        new_state[athlete] = {
+            'date': str(grid['start_dates'][i] + np.timedelta64(int(last[i]), 'D')),
+            'ctl': float(ctl[last[i], i]),
+            'atl': float(atl[last[i], i]),
+        }
+    return daily, new_state
+
+
+def _after_resume(dates, tss, athlete_ids, resume_from: dict) -> tuple:
+    """Activities on or after their athlete's resume day."""
+    dates = np.asarray(dates, dtype='datetime64[D]')
+    tss = np.asarray(tss)
+    if athlete_ids is not None:
+        athlete_ids = np.asarray(athlete_ids)
+    keys = (np.zeros(len(tss), dtype=np.int64) if athlete_ids is None else athlete_ids).astype(str)
+    athletes, athlete_index = np.unique(keys, return_inverse=True)
+    first = np.array([resume_from[a].astype(np.int64) if a in resume_from
+                      else np.iinfo(np.int64).min for a in athletes.tolist()], dtype=np.int64)
+    keep = dates.astype(np.int64) >= first[athlete_index]
+    return dates[keep], tss[keep], None if athlete_ids is None else athlete_ids[keep]
+
+
+def load_activities(path: str) -> dict:
+    """
+    Load activities from CSV with columns date (YYYY-MM-DD, optionally with a
+    time part), tss and optionally athlete_id, or the daily table of ingest (.npz).
+    """
+    if path.endswith('.npz'):
+        from .ingest import load_table
+
+        table = load_table(path)[0]
+        return {'dates': table['date'], 'tss': table['tss'], 'athlete_ids': table['athlete_id']}
+
+    with open(path, 'r', newline='') as f:
+        reader = csv.DictReader(f)
+        rows = list(reader)
+        has_athlete = 'athlete_id' in reader.fieldnames
+
+    return {
+        'dates': np.array([row['date'][:10] for row in rows], dtype='datetime64[D]'),
+        'tss': np.array([float(row['tss']) if row['tss'] else 0.0 for row in rows]),
+        'athlete_ids': np.array([row['athlete_id'] for row in rows]) if has_athlete else None,
+    }
+
+
+def load_state(path: str) -> dict:
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def save_state(path: str, state: dict):
+    with open(path, 'w') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+
+
+def write_daily_metrics(path: str, daily: dict):
+    """Write daily metrics in the CSV layout load_daily_metrics reads."""
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['athlete_id', 'date', 'tss', 'ctl', 'atl', 'tsb'])
+        for row in zip(daily['athlete_ids'], daily['dates'].astype(str),
+                       *(np.round(daily[name], 1) for name in ('tss', 'ctl', 'atl', 'tsb'))):
+            writer.writerow(row)
+
+
+def register(subparsers):
+    parser = subparsers.add_parser(
+        'backfill',
+        help='Compute daily CTL/ATL/TSB from activities',
+        description='Aggregate activities to daily TSS and compute CTL/ATL/TSB for '
+                    'every athlete, optionally resuming from a stored state'
+    )
+    parser.add_argument('-i', '--input', required=True,
+                        help='Activities CSV with date, tss [, athlete_id] '
+                             'or an ingest table (.npz)')
+    parser.add_argument('-o', '--output', required=True,
+                        help='Daily metrics CSV (athlete_id, date, tss, ctl, atl, tsb)')
+    parser.add_argument('--state',
+                        help='State JSON: resume after its stored day and update it afterwards')
+    parser.add_argument('--block-days', type=int, default=DEFAULT_BLOCK_DAYS,
+                        help=f'Days per filter block (default: {DEFAULT_BLOCK_DAYS})')
+    parser.set_defaults(func=run)
+
+
+def run(args) -> int:
+    if not os.path.exists(args.input):
+        print(f"❌ Activities file not found: {args.input}")
+        return 1
+
+    print(f"📂 Loading activities from {args.input}...")
+    activities = load_activities(args.input)
+    state = load_state(args.state) if args.state and os.path.exists(args.state) else {}
+    if state:
+        print(f"♻️  Resuming {len(state)} athlete(s) from {args.state}")
+
+    try:
+        daily, new_state = backfill(**activities, state=state, block=args.block_days)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+
+    write_daily_metrics(args.output, daily)
+    print(f"✅ {len(daily['dates'])} daily rows for {len(set(daily['athlete_ids'].tolist()))} "
+          f"athlete(s) written to {args.output}")
+    if args.state:
+        save_state(args.state, new_state)
+        print(f"📌 State saved to: {args.state}")
+    return 0
@@ -0,0 +1,217 @@
+"""
+Inference benchmarks across batch sizes, thread counts, graph optimization
+levels and conversion backends.
+
+Every configuration is timed for at least --min-time seconds; the report
+holds p50/p95/p99 latency and throughput per configuration. Comparing a
+report against a stored baseline flags throughput regressions.
+"""
+
+import json
+import os
+import platform
+import tempfile
+import time
+
+import numpy as np
+
+from .model_io import DEFAULT_FEATURES, DEFAULT_MODEL, load_features
+from .runtime import OPTIMIZATION_LEVELS, ONNX_EXTENSIONS, create_session, load_predictor, session_predictor
+
+DEFAULT_BATCH_SIZES = [1, 10, 100, 1000, 10000, 100000]
+DEFAULT_TOLERANCE = 0.2
+
+
+def measure(predict, X: np.ndarray, min_time: float = 0.5, min_repeats: int = 5,
+            max_repeats: int = 10000, warmup: int = 2) -> np.ndarray:
+    """Time predict(X) repeatedly; returns per-call latencies in seconds."""
+    for _ in range(warmup):
+        predict(X)
+
+    latencies = []
+    started = time.perf_counter()
+    while len(latencies) < max_repeats:
+        t0 = time.perf_counter()
+        predict(X)
+        latencies.append(time.perf_counter() - t0)
+        if len(latencies) >= min_repeats and time.perf_counter() - started >= min_time:
+            break
+    return np.array(latencies)
+
+
+def summarize(latencies: np.ndarray, batch_size: int) -> dict:
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        'repeats': len(latencies),
+        'p50_ms': p50 * 1000,
+        'p95_ms': p95 * 1000,
+        'p99_ms': p99 * 1000,
+        'rows_per_second': batch_size / p50,
+    }
+
+
+def benchmark_inputs(num_features: int, rows: int, input_path: str = None) -> np.ndarray:
+    """Representative rows from input_path (tiled if short) or seeded random rows."""
+    if input_path:
+        X = np.asarray(np.load(input_path, mmap_mode='r')[:rows], dtype=np.float32)
+        return np.resize(X, (rows, num_features)) if len(X) < rows else X
+    rng = np.random.default_rng(0)
+    return (rng.random((rows, num_features)) * 300).astype(np.float32)
+
+
+def run_benchmark(models: dict, X: np.ndarray, batch_sizes: list, threads: list,
+                  optimizations: list, min_time: float = 0.5) -> list:
+    """Benchmark every model × threads × optimization × batch size."""
+    results = []
+    for label, model_path in models.items():
+        is_onnx = model_path.endswith(ONNX_EXTENSIONS)
+        # Threads and graph optimizations only apply to onnxruntime
+        configs = [(t, o) for t in threads for o in optimizations] if is_onnx else [(None, None)]
+
+        for thread_count, optimization in configs:
+            t0 = time.perf_counter()
+            if is_onnx:
+                predict = session_predictor(create_session(model_path, thread_count, optimization))
+            else:
+                predict = load_predictor(model_path)
+            load_ms = (time.perf_counter() - t0) * 1000
+
+            for batch_size in batch_sizes:
+                latencies = measure(predict, X[:batch_size], min_time=min_time)
+                result = {
+                    'model': label,
+                    'path': model_path,
+                    'threads': thread_count,
+                    'optimization': optimization,
+                    'batch_size': batch_size,
+                    'load_ms': load_ms,
+                    **summarize(latencies, batch_size),
+                }
+                results.append(result)
+                print(f"   {label:<20} threads={thread_count!s:<4} opt={optimization!s:<8} "
+                      f"batch={batch_size:<7} p50={result['p50_ms']:9.3f}ms "
+                      f"p99={result['p99_ms']:9.3f}ms {result['rows_per_second']:>12,.0f} rows/s")
+    return results
+
+
+def _config_key(result: dict) -> tuple:
+    return (result['model'], result['threads'], result['optimization'], result['batch_size'])
+
+
+def compare_to_baseline(results: list, baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> list:
+    """Return the configurations whose throughput dropped more than tolerance."""
+    reference = {_config_key(r): r for r in baseline['results']}
+    regressions = []
+    for result in results:
+        base = reference.get(_config_key(result))
+        if base is None:
+            continue
+        ratio = result['rows_per_second'] / base['rows_per_second']
+        if ratio < 1 - tolerance:
+            regressions.append({**result, 'baseline_rows_per_second': base['rows_per_second'],
+                                'ratio': ratio})
+    return regressions
+
+
+def environment() -> dict:
+    info = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+    }
+    try:
+        import onnxruntime as rt
+        info['onnxruntime'] = rt.__version__
+    except ImportError:
+        pass
+    return info
+
+
+def _convert_backends(backends: list, model_path: str, features_path: str, work_dir: str) -> dict:
+    """Convert the model once per backend (served from the conversion cache if unchanged)."""
+    from .convert import convert_model
+
+    models = {}
+    for backend in backends:
+        output_path = os.path.join(work_dir, f'{backend}.onnx')
+        convert_model(model_path, features_path, output_path, backend=backend, validate=False)
+        models[backend] = output_path
+    return models
+
+
+def register(subparsers):
+    parser = subparsers.add_parser(
+        'bench',
+        help='Benchmark inference across batch sizes, threads and backends',
+        description='Benchmark model inference and compare against a stored baseline'
+    )
+    parser.add_argument('-m', '--models', nargs='*', default=[],
+                        help='Model files to benchmark (.onnx, .ort, .npz, ...)')
+    parser.add_argument('--backends', nargs='*', default=[],
+                        help='Convert the model with these backends and benchmark the results')
+    parser.add_argument('-i', '--input', default=DEFAULT_MODEL,
+                        help='Model to convert for --backends')
+    parser.add_argument('--features', default=DEFAULT_FEATURES,
+                        help='Path to features JSON file')
+    parser.add_argument('--data', help='.npy feature matrix to benchmark on (default: random rows)')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=DEFAULT_BATCH_SIZES)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, os.cpu_count() or 1])
+    parser.add_argument('--optimizations', nargs='+', default=list(OPTIMIZATION_LEVELS),
+                        choices=OPTIMIZATION_LEVELS)
+    parser.add_argument('--min-time', type=float, default=0.5,
+                        help='Seconds to time each configuration (default: 0.5)')
+    parser.add_argument('-o', '--output', default='bench-report.json',
+                        help='JSON report path')
+    parser.add_argument('--baseline', help='Baseline report to compare against')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='Allowed throughput drop vs baseline (default: 0.2)')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='Write this run to --baseline instead of comparing')
+    parser.set_defaults(func=run)
+
+
+def run(args) -> int:
+    if args.baseline and not args.update_baseline and not os.path.exists(args.baseline):
+        print(f"❌ Baseline not found: {args.baseline} (create it with --update-baseline)")
+        return 1
+
+    models = {os.path.basename(path): path for path in args.models}
+    features = load_features(args.features)
+
+    print("⏱️  TSS Model Inference Benchmark")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        models.update(_convert_backends(args.backends, args.input, args.features, work_dir))
+        if not models:
+            print("❌ Nothing to benchmark: pass --models and/or --backends")
+            return 1
+
+        X = benchmark_inputs(len(features), max(args.batch_sizes), args.data)
+        results = run_benchmark(models, X, args.batch_sizes, sorted(set(args.threads)),
+                                args.optimizations, min_time=args.min_time)
+
+    report = {'environment': environment(), 'results': results}
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n📋 Report saved to: {args.output}")
+
+    if args.baseline and args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"📌 Baseline updated: {args.baseline}")
+    elif args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(results, baseline, args.tolerance)
+        if regressions:
+            print(f"❌ {len(regressions)} configuration(s) regressed more than {args.tolerance:.0%}:")
+            for r in regressions:
+                print(f"   {r['model']} threads={r['threads']} opt={r['optimization']} "
+                      f"batch={r['batch_size']}: {r['rows_per_second']:,.0f} rows/s "
+                      f"vs {r['baseline_rows_per_second']:,.0f} ({r['ratio']:.0%})")
+            return 1
+        print(f"✅ No regressions against {args.baseline}")
+
+    return 0
@@ -0,0 +1,297 @@
+"""
+Convert many model variants (per cohort, per version) in parallel.
+
+The models come from a directory or from a JSON job file. Every conversion
+runs in its own worker process and in its own temp directory, and its
+output is captured instead of interleaved on the console. The bundle
+manifest is only written by the parent process, so workers never race on it.
+
+Job file (relative paths are resolved against the file's directory):
+
+    {
+      "defaults": {"backend": "onnxmltools-fixed", "features": "model_features.json"},
+      "models": [
+        {"name": "tss-predictor-elite", "input": "models/elite.bst"},
+        {"name": "tss-predictor-novice", "input": "models/novice.bst", "backend": "compact"}
+      ]
+    }
+"""
+
+import io
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import redirect_stderr, redirect_stdout
+
+from .backends import BACKENDS, DEFAULT_BACKEND
+from .bundle import MANIFEST_NAME
+from .cache import DEFAULT_CACHE_DIR
+from .model_io import DEFAULT_FEATURES, PICKLE_MAGIC
+
+DEFAULT_OUTPUT_DIR = 'onnx-models'
+MODEL_SUFFIXES = ('.bst', '.ubj', '.pkl', '.pickle', '.json')
+FEATURES_SUFFIXES = ('.features.json', '_features.json')
+
+# Job keys passed on to convert_model
+JOB_OPTIONS = ('backend', 'opset', 'optimize', 'parity_rows')
+
+
+def is_model_file(path: str) -> bool:
+    """Model files by suffix; a .json file only if it is a native XGBoost model."""
+    name = os.path.basename(path)
+    if not name.endswith(MODEL_SUFFIXES) or name.endswith(FEATURES_SUFFIXES):
+        return False
+    if not name.endswith('.json'):
+        return True
+    with open(path, 'rb') as f:
+        head = f.read(64)
+    return head.startswith(PICKLE_MAGIC) or head.lstrip().startswith(b'{"learner"')
+
+
+def features_for(model_path: str, default: str) -> str:
+    """<stem>.features.json or <stem>_features.json next to the model, else default."""
+    stem = os.path.splitext(model_path)[0]
+    for suffix in FEATURES_SUFFIXES:
+        if os.path.exists(stem + suffix):
+            return stem + suffix
+    return default
+
+
+def discover_jobs(directory: str, features: str = None) -> list:
+    """One job per model file in directory (not recursive), sorted by name."""
+    default_features = features or os.path.join(directory, DEFAULT_FEATURES)
+    jobs = []
+    for entry in sorted(os.listdir(directory)):
+        path = os.path.join(directory, entry)
+        if os.path.isfile(path) and is_model_file(path):
+            jobs.append({
+                'name': os.path.splitext(entry)[0],
+                'input': path,
+                'features': features_for(path, default_features),
+            })
+    return jobs
+
+
+def load_jobs(path: str, features: str = None) -> list:
+    """
+    Jobs from a JSON job file (a list of jobs or {"defaults", "models"}).
+    Relative paths in the file are resolved against its directory; features
+    (from the command line) against the working directory.
+    """
+    with open(path, 'r') as f:
+        data = json.load(f)
+    base_dir = os.path.dirname(os.path.abspath(path))
+    defaults = {} if isinstance(data, list) else data.get('defaults', {})
+    models = data if isinstance(data, list) else data.get('models', [])
+
+    jobs = []
+    for item in models:
+        job = {**defaults, **item}
+        if 'input' not in job:
+            raise ValueError(f"Job without 'input' in {path}: {item}")
+        job.setdefault('name', os.path.splitext(os.path.basename(job['input']))[0])
+        job.setdefault('features', os.path.abspath(features) if features else DEFAULT_FEATURES)
+        for key in ('input', 'features', 'output'):
+            if key in job and not os.path.isabs(job[key]):
+                job[key] = os.path.join(base_dir, job[key])
+        jobs.append(job)
+    return jobs
+
+
+def plan_outputs(jobs: list, output_dir: str) -> list:
+    """Fill in output paths; two jobs writing the same file is an error."""
+    seen = {}
+    for job in jobs:
+        job.setdefault('output', os.path.join(output_dir, f"{job['name']}.onnx"))
+        job.setdefault('backend', DEFAULT_BACKEND)
+        if job['backend'] not in BACKENDS:
+            raise ValueError(f"Unknown backend '{job['backend']}' for {job['name']}")
+        output = os.path.abspath(job['output'])
+        if output in seen:
+            raise ValueError(f"{seen[output]} and {job['name']} both write {job['output']}")
+        seen[output] = job['name']
+    return jobs
+
+
+def convert_job(job: dict, cache_dir: str, validate: bool, bundle: bool) -> dict:
+    """
+    Run one conversion (in a worker process) and return its summary.
+
+    Temp files of the conversion and its backend go to a private directory
+    that is removed afterwards; printed output is captured into 'log'.
+    """
+    from .convert import convert_model
+
+    log = io.StringIO()
+    result = {'name': job['name'], 'input': job['input'], 'output': job['output'],
+              'backend': job['backend']}
+    t0 = time.perf_counter()
+    previous_tempdir = tempfile.tempdir
+    with tempfile.TemporaryDirectory(prefix=f"convert-{job['name']}-") as job_dir:
+        tempfile.tempdir = job_dir
+        try:
+            with redirect_stdout(log), redirect_stderr(log):
+                summary = convert_model(
+                    model_path=job['input'],
+                    features_path=job['features'],
+                    output_path=job['output'],
+                    cache_dir=cache_dir,
+                    validate=validate,
+                    bundle=bundle,
+                    backend_options={name: job[name] for name in BACKENDS[job['backend']].options
+                                     if name in job},
+                    **{key: job[key] for key in JOB_OPTIONS if key in job},
+                )
+            result.update(status='ok', cache_hit=summary['cache_hit'],
+                          size_bytes=summary['size_bytes'], validated=summary['validated'],
+                          opset=summary['opset'], metadata=summary['metadata'],
+                          parity=summary['parity'])
+        except Exception as e:
+            result.update(status='failed', error=f'{type(e).__name__}: {e}')
+        finally:
+            tempfile.tempdir = previous_tempdir
+    result['seconds'] = time.perf_counter() - t0
+    result['log'] = log.getvalue()
+    return result
+
+
+def convert_all(jobs: list, cache_dir: str = DEFAULT_CACHE_DIR, workers: int = None,
+                validate: bool = True, bundle: bool = True, manifest_path: str = None) -> list:
+    """
+    Convert every job on a process pool; returns one summary per job, in job order.
+    With bundle and manifest_path, successful conversions are recorded in the manifest.
+    """
+    for job in jobs:
+        os.makedirs(os.path.dirname(os.path.abspath(job['output'])), exist_ok=True)
+
+    results = [None] * len(jobs)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(convert_job, job, cache_dir, validate, bundle): i
+                   for i, job in enumerate(jobs)}
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:           # the worker process itself died
+                result = {'name': jobs[i]['name'], 'input': jobs[i]['input'],
+                          'output': jobs[i]['output'], 'backend': jobs[i]['backend'],
+                          'status': 'failed', 'error': f'{type(e).__name__}: {e}', 'log': ''}
+            results[i] = result
+            if result['status'] == 'ok':
+                print(f"   ✓ {result['name']}: {result['size_bytes'] / 1024:.0f} KB "
+                      f"in {result['seconds']:.1f}s{' (cached)' if result['cache_hit'] else ''}")
+            else:
+                print(f"   ✗ {result['name']}: {result['error']}")
+
+    if bundle and manifest_path:
+        from .bundle import read_metadata, update_manifest
+        for result in results:
+            if result['status'] == 'ok':
+                entry = update_manifest(manifest_path, result['output'],
+                                        read_metadata(result['output']))
+                result['revision'] = entry['revision']
+    return results
+
+
+def print_summary(results: list, seconds: float):
+    print(f"\n   {'model':<28} {'backend':<18} {'KB':>7} {'s':>6}  validated  cache")
+    for r in results:
+        if r['status'] != 'ok':
+            print(f"   {r['name']:<28} {r['backend']:<18} {'FAILED':>7}")
+            continue
+        print(f"   {r['name']:<28} {r['backend']:<18} {r['size_bytes'] / 1024:7.0f} "
+              f"{r['seconds']:6.1f}  {'yes' if r['validated'] else 'no':<9}  "
+              f"{'hit' if r['cache_hit'] else 'miss'}")
+    converted = sum(r['status'] == 'ok' for r in results)
+    busy = sum(r['seconds'] for r in results)
+    print(f"\n   {converted}/{len(results)} converted in {seconds:.1f}s "
+          f"({busy:.1f}s of conversion work)")
+
+
+def register(subparsers):
+    parser = subparsers.add_parser(
+        'bulk',
+        help='Convert a directory or job file of models in parallel',
+        description='Convert many model variants on a process pool, each in an isolated '
+                    'temp directory, and summarize sizes, timings and validation'
+    )
+    parser.add_argument('source', help='Directory of models or JSON job file')
+    parser.add_argument('--features', default=None,
+                        help=f'Features JSON for models without their own '
+                             f'(default: {DEFAULT_FEATURES} in the source directory)')
+    parser.add_argument('-o', '--output-dir', default=DEFAULT_OUTPUT_DIR,
+                        help=f'Directory for jobs without an output path '
+                             f'(default: {DEFAULT_OUTPUT_DIR})')
+    parser.add_argument('--backend', default=None, choices=sorted(BACKENDS),
+                        help=f'Backend for jobs that do not name one (default: {DEFAULT_BACKEND})')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Worker processes (default: one per core)')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                        help='Conversion cache directory (shared by all workers)')
+    parser.add_argument('--no-validate', action='store_true',
+                        help='Skip validation step')
+    parser.add_argument('--manifest', default=None,
+                        help='Bundle manifest to update (default: model-manifest.json in the '
+                             'output directory)')
+    parser.add_argument('--no-bundle', action='store_true',
+                        help='Do not embed metadata in the ONNX files or update the manifest')
+    parser.add_argument('-r', '--report', default=None,
+                        help='Write the JSON summary (including each conversion log) here')
+    parser.set_defaults(func=run)
+
+
+def run(args) -> int:
+    if not os.path.exists(args.source):
+        print(f"❌ Source not found: {args.source}")
+        return 1
+
+    print("📚 Bulk conversion")
+    print("=" * 50)
+
+    try:
+        if os.path.isdir(args.source):
+            jobs = discover_jobs(args.source, args.features)
+        else:
+            jobs = load_jobs(args.source, args.features)
+        if args.backend:
+            for job in jobs:
+                job.setdefault('backend', args.backend)
+        plan_outputs(jobs, args.output_dir)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+    if not jobs:
+        print(f"❌ No models found in {args.source}")
+        return 1
+    for job in jobs:
+        for key, label in (('input', 'Model'), ('features', 'Features')):
+            if not os.path.exists(job[key]):
+                print(f"❌ {label} file not found for {job['name']}: {job[key]}")
+                return 1
+
+    manifest_path = args.manifest or os.path.join(args.output_dir, MANIFEST_NAME)
+    workers = args.workers or os.cpu_count()
+    print(f"🚀 Converting {len(jobs)} model(s) with {workers} worker(s)...")
+    t0 = time.perf_counter()
+    results = convert_all(jobs, args.cache_dir, args.workers, validate=not args.no_validate,
+                          bundle=not args.no_bundle, manifest_path=manifest_path)
+    seconds = time.perf_counter() - t0
+    print_summary(results, seconds)
+
+    failed = [r for r in results if r['status'] != 'ok']
+    for r in failed:
+        print(f"\n❌ {r['name']} ({r['input']}): {r['error']}")
+        for line in r['log'].strip().splitlines()[-10:]:
+            print(f"   | {line}")
+
+    if args.report:
+        report = {'seconds': seconds, 'workers': workers,
+                  'manifest': None if args.no_bundle else manifest_path, 'models': results}
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n📋 Report saved to: {args.report}")
+    if not args.no_bundle:
+        print(f"🗂️  Manifest: {manifest_path}")
+    return 1 if failed else 0
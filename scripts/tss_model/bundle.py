@@ -0,0 +1,153 @@
+"""
+Self-describing model bundles and the local bundle manifest.
+
+A bundle is the ONNX file itself with the model metadata (feature order,
+version, opset, base_score, ...) stored in its metadata_props, each value
+JSON-encoded under the same keys as the metadata JSON. modelHash is the
+SHA-256 of the model with metadata_props cleared, so it identifies the
+graph regardless of the metadata around it.
+
+The manifest (model-manifest.json) indexes bundles by file name with their
+file hash, size, revision and metadata. A loader compares one small
+document, or the copy of the hash stored in the storage object's custom
+metadata, against what it has cached, and only downloads changed models.
+"""
+
+import datetime
+import hashlib
+import json
+import os
+
+from .model_io import file_sha256
+
+MANIFEST_NAME = 'model-manifest.json'
+MANIFEST_SCHEMA_VERSION = 1
+# Metadata copied into manifest entries (and storage custom metadata)
+MANIFEST_FIELDS = ('version', 'features', 'opset', 'baseScore', 'conversionTool', 'modelHash')
+
+
+def model_hash(model) -> str:
+    """SHA-256 of an onnx.ModelProto with its metadata_props removed."""
+    stripped = type(model)()
+    stripped.CopyFrom(model)
+    del stripped.metadata_props[:]
+    return hashlib.sha256(stripped.SerializeToString(deterministic=True)).hexdigest()
+
+
+def embed_metadata(onnx_path: str, metadata: dict) -> dict:
+    """
+    Replace the metadata_props of onnx_path with metadata (plus modelHash)
+    and return the embedded metadata. The file is only rewritten if it changes.
+    """
+    import onnx
+
+    model = onnx.load(onnx_path)
+    embedded = {**metadata, 'modelHash': model_hash(model)}
+    props = {key: json.dumps(value) for key, value in embedded.items()}
+
+    current = {prop.key: prop.value for prop in model.metadata_props}
+    if current != props:
+        del model.metadata_props[:]
+        for key, value in props.items():
+            model.metadata_props.add(key=key, value=value)
+        onnx.save(model, onnx_path)
+    return embedded
+
+
+def read_metadata(onnx_path: str) -> dict:
+    """Metadata embedded in a bundle ({} for a plain ONNX model)."""
+    import onnx
+
+    model = onnx.load(onnx_path, load_external_data=False)
+    metadata = {}
+    for prop in model.metadata_props:
+        try:
+            metadata[prop.key] = json.loads(prop.value)
+        except json.JSONDecodeError:
+            metadata[prop.key] = prop.value
+    return metadata
+
+
+def manifest_path_for(bundle_path: str) -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(bundle_path)), MANIFEST_NAME)
+
+
+def load_manifest(path: str) -> dict:
+    if not os.path.exists(path):
+        return {'schemaVersion': MANIFEST_SCHEMA_VERSION, 'models': {}}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def update_manifest(manifest_path: str, bundle_path: str, metadata: dict) -> dict:
+    """
+    Record bundle_path in the manifest. The revision is bumped, and
+    updatedAt set, only when the bundle's content hash changes.
+    """
+    manifest = load_manifest(manifest_path)
+    name = os.path.basename(bundle_path)
+    sha256 = file_sha256(bundle_path)
+    previous = manifest['models'].get(name)
+
+    if previous is not None and previous['sha256'] == sha256:
+        return previous
+
+    entry = {
+        'file': name,
+        'sha256': sha256,
+        'sizeBytes': os.path.getsize(bundle_path),
+        'revision': previous['revision'] + 1 if previous else 1,
+        'updatedAt': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        **{key: metadata[key] for key in MANIFEST_FIELDS if key in metadata},
+    }
+    manifest['models'][name] = entry
+
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return entry
+
+
+def register(subparsers):
+    parser = subparsers.add_parser(
+        'bundle',
+        help='Embed metadata into an ONNX model and record it in the manifest',
+        description='Turn an ONNX model plus its metadata JSON into a self-describing '
+                    'bundle and update the bundle manifest'
+    )
+    parser.add_argument('-i', '--input', default='tss-predictor-v1.onnx',
+                        help='ONNX model (updated in place)')
+    parser.add_argument('--metadata', help='Metadata JSON (default: next to the model)')
+    parser.add_argument('--manifest', help=f'Manifest path (default: {MANIFEST_NAME} next to the model)')
+    parser.add_argument('--show', action='store_true',
+                        help='Print the embedded metadata and exit')
+    parser.set_defaults(func=run)
+
+
+def run(args) -> int:
+    if not os.path.exists(args.input):
+        print(f"❌ Model file not found: {args.input}")
+        return 1
+
+    if args.show:
+        print(json.dumps(read_metadata(args.input), indent=2))
+        return 0
+
+    from .convert import metadata_path_for
+
+    metadata_path = args.metadata or metadata_path_for(args.input)
+    if not os.path.exists(metadata_path):
+        print(f"❌ Metadata file not found: {metadata_path}")
+        return 1
+    with open(metadata_path, 'r') as f:
+        metadata = json.load(f)
+    metadata.pop('modelHash', None)
+
+    embedded = embed_metadata(args.input, metadata)
+    with open(metadata_path, 'w') as f:
+        json.dump(embedded, f, indent=2)
+
+    manifest_path = args.manifest or manifest_path_for(args.input)
+    entry = update_manifest(manifest_path, args.input, embedded)
+    print(f"📦 Bundle {args.input}: model {embedded['modelHash'][:12]}, "
+          f"revision {entry['revision']} in {manifest_path}")
+    return 0
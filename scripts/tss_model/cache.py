@@ -0,0 +1,93 @@
+"""
+Content-addressed conversion cache.
+
+An entry is keyed by the hashes of the model file and the feature list plus
+the backend name, target opset and tooling version. If none of these changed,
+the converted ONNX model is reused instead of running the backend again.
+
+Layout:
+    <cache_dir>/<key[:2]>/<key>/model.onnx
+    <cache_dir>/<key[:2]>/<key>/entry.json
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from typing import Optional
+
+from . import __version__
+from .model_io import file_sha256
+
+DEFAULT_CACHE_DIR = '.conversion-cache'
+
+
+def cache_key(model_path: str, features_path: str, backend: str, opset: int, **extra) -> str:
+    """Compute the cache key for one conversion."""
+    parts = {
+        'model': file_sha256(model_path),
+        'features': file_sha256(features_path),
+        'backend': backend,
+        'opset': opset,
+        'tool': __version__,
+        **extra,
+    }
+    encoded = json.dumps(parts, sort_keys=True).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class ConversionCache:
+    """Directory of converted models addressed by cache key."""
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def entry_dir(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def get(self, key: str) -> Optional[dict]:
+        """Return the entry info (with 'path' to the model) or None on a miss."""
+        entry_dir = self.entry_dir(key)
+        info_path = os.path.join(entry_dir, 'entry.json')
+        model_path = os.path.join(entry_dir, 'model.onnx')
+        if not (os.path.exists(info_path) and os.path.exists(model_path)):
+            return None
+
+        with open(info_path, 'r') as f:
+            info = json.load(f)
+        info['path'] = model_path
+        return info
+
+    def put(self, key: str, onnx_bytes: bytes, info: dict) -> str:
+        """Store a converted model; returns the cached model path."""
+        entry_dir = self.entry_dir(key)
+        os.makedirs(entry_dir, exist_ok=True)
+
+        model_path = os.path.join(entry_dir, 'model.onnx')
+        _atomic_write(model_path, onnx_bytes)
+        # entry.json is written last: its presence marks the entry complete
+        _atomic_write(os.path.join(entry_dir, 'entry.json'),
+                      json.dumps(info, indent=2).encode('utf-8'))
+        return model_path
+
+    def update(self, key: str, **fields):
+        """Update the info of an existing entry."""
+        info = self.get(key)
+        if info is None:
+            return
+        info.pop('path')
+        info.update(fields)
+        _atomic_write(os.path.join(self.entry_dir(key), 'entry.json'),
+                      json.dumps(info, indent=2).encode('utf-8'))
+
+
+def _atomic_write(path: str, data: bytes):
+    """Write via a temp file in the same directory so readers never see partial files."""
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
@@ -0,0 +1,60 @@
+"""
+Command line entry point: python -m tss_model <command> [options]
+"""
+
+import argparse
+import importlib
+import sys
+
+# Subcommand modules; each provides register(subparsers)
+COMMANDS = [
+    'convert',
+    'bulk',
+    'forest',
+    'explain',
+    'features',
+    'score',
+    'drift',
+    'bench',
+    'optimize',
+    'compact',
+    'parity',
+    'forecast',
+    'backfill',
+    'synth',
+    'ingest',
+    'serve',
+    'bundle',
+    'train',
+    'tune',
+    'store',
+    'library',
+    'zwo',
+    'worker',
+]
+
+
+def build_parser(command: str = None) -> argparse.ArgumentParser:
+    """
+    Parser for all subcommands, or only for `command` if it is one: command
+    modules import numpy and friends, so running one command (or its --help)
+    should not load the others.
+    """
+    parser = argparse.ArgumentParser(
+        prog='tss_model',
+        description='Tooling for the XGBoost TSS prediction model'
+    )
+    subparsers = parser.add_subparsers(dest='command', metavar='<command>')
+    subparsers.required = True
+
+    for name in [command] if command in COMMANDS else COMMANDS:
+        module = importlib.import_module(f'.{name}', __package__)
+        module.register(subparsers)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else list(argv)
+    args = build_parser(argv[0] if argv else None).parse_args(argv)
+    return args.func(args)
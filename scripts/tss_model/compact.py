@@ -0,0 +1,297 @@
+"""
+Model compaction.
+
+Rewrites the forest as a single ai.onnx.ml (opset 5) TreeEnsemble node. It
+stores splits, modes and leaves as packed tensors, where TreeEnsembleRegressor
+uses one string per node, and the trees themselves are shrunk:
+
+- nodes not reachable from any tree root are dropped;
+- splits whose two subtrees predict the same value (zero gain) collapse
+  into a single leaf;
+- identical leaf values are stored once and shared between trees.
+
+All three are lossless. --float16 additionally rounds thresholds and leaf
+values to float16 precision, which merges more leaves but moves predictions.
+onnxruntime's TreeEnsemble kernel requires split values of the input type,
+so the tensors stay float32.
+"""
+
+import os
+
+import numpy as np
+
+from .backends import INPUT_NAME
+from .forest import TreeEnsemble, load_forest
+from .model_io import DEFAULT_FEATURES, DEFAULT_MODEL, DEFAULT_OUTPUT, load_features
+
+DEFAULT_COMPACT_OUTPUT = 'tss-predictor-v1.compact.onnx'
+# TreeEnsemble was added in ai.onnx.ml 5, released together with opset 21
+DEFAULT_OPSET = 21
+ML_OPSET = 5
+
+# TreeEnsemble enum values
+_BRANCH_LT = 1
+_AGGREGATE_SUM = 1
+_POST_TRANSFORM_NONE = 0
+
+
+def _leaf_mask(forest: TreeEnsemble) -> np.ndarray:
+    return forest.left == np.arange(forest.num_nodes)
+
+
+def _reachable(roots: np.ndarray, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    reached = np.zeros(len(left), dtype=bool)
+    frontier = np.asarray(roots)
+    while frontier.size:
+        reached[frontier] = True
+        children = np.concatenate([left[frontier], right[frontier]])
+        frontier = np.unique(children[~reached[children]])
+    return reached
+
+
+def round_to_float16(forest: TreeEnsemble) -> TreeEnsemble:
+    """Round thresholds and leaf values to float16 precision (kept as float32)."""
+    is_leaf = _leaf_mask(forest)
+    limit = np.finfo(np.float16).max
+    for name, values in (('leaf value', forest.value[is_leaf]),
+                         ('threshold', forest.threshold[~is_leaf])):
+        if values.size and np.abs(values).max() > limit:
+            raise ValueError(f"A {name} of {np.abs(values).max():.6g} overflows float16 "
+                             f"(max {limit:.0f})")
+
+    def rounded(values):
+        return values.astype(np.float16).astype(np.float32)
+
+    return TreeEnsemble(
+        feature=forest.feature,
+        threshold=np.where(is_leaf, forest.threshold, rounded(forest.threshold)),
+        left=forest.left,
+        right=forest.right,
+        default_left=forest.default_left,
+        value=rounded(forest.value),
+        roots=forest.roots,
+        max_depth=forest.max_depth,
+        base_score=forest.base_score,
+        num_features=forest.num_features,
+    )
+
+
+def compact_forest(forest: TreeEnsemble, float16: bool = False) -> tuple:
+    """
+    Return (compacted forest, stats). Predictions are unchanged unless
+    float16 is set.
+    """
+    if float16:
+        forest = round_to_float16(forest)
+
+    left = forest.left.copy()
+    right = forest.right.copy()
+    value = forest.value.copy()
+    is_leaf = _leaf_mask(forest)
+
+    # Bottom-up: a split over two equal leaves becomes that leaf, which can
+    # make its parent collapsible in the next round
+    collapsed = 0
+    while True:
+        constant = ~is_leaf & is_leaf[left] & is_leaf[right] & (value[left] == value[right])
+        nodes = np.flatnonzero(constant)
+        if not nodes.size:
+            break
+        value[nodes] = value[left[nodes]]
+        left[nodes] = nodes
+        right[nodes] = nodes
+        is_leaf[nodes] = True
+        collapsed += len(nodes)
+
+    reached = _reachable(forest.roots, left, right)
+    keep = np.flatnonzero(reached)
+    new_id = np.full(forest.num_nodes, -1, dtype=np.int32)
+    new_id[keep] = np.arange(len(keep), dtype=np.int32)
+
+    compacted = TreeEnsemble(
+        feature=forest.feature[keep],
+        threshold=forest.threshold[keep],
+        left=new_id[left[keep]],
+        right=new_id[right[keep]],
+        default_left=forest.default_left[keep],
+        value=value[keep],
+        roots=new_id[forest.roots],
+        max_depth=forest.max_depth,
+        base_score=forest.base_score,
+        num_features=forest.num_features,
+    )
+    leaves = compacted.value[_leaf_mask(compacted)]
+    stats = {
+        'nodes_before': forest.num_nodes,
+        'nodes_after': compacted.num_nodes,
+        'collapsed_splits': collapsed,
+        'unreachable_nodes': int(forest.num_nodes - len(keep)) - 2 * collapsed,
+        'leaves': len(leaves),
+        'unique_leaves': len(np.unique(leaves)),
+        'float16': float16,
+    }
+    return compacted, stats
+
+
+def forest_to_onnx(forest: TreeEnsemble, opset: int = DEFAULT_OPSET):
+    """Build an ONNX model with one ai.onnx.ml TreeEnsemble node plus base_score."""
+    from onnx import TensorProto, helper, numpy_helper
+
+    is_leaf = _leaf_mask(forest)
+    leaves = np.flatnonzero(is_leaf)
+    leaf_weights, leaf_slot = np.unique(forest.value[leaves], return_inverse=True)
+    leaf_index = np.full(forest.num_nodes, -1, dtype=np.int64)
+    leaf_index[leaves] = leaf_slot
+
+    # A tree that is a single leaf becomes a placeholder split whose two
+    # branches both point at that leaf
+    stumps = forest.roots[is_leaf[forest.roots]]
+    node_ids = np.concatenate([np.flatnonzero(~is_leaf), stumps])
+    is_stump = np.arange(len(node_ids)) >= len(node_ids) - len(stumps)
+    node_index = np.full(forest.num_nodes, -1, dtype=np.int64)
+    node_index[node_ids] = np.arange(len(node_ids))
+
+    true_child = forest.left[node_ids]
+    false_child = forest.right[node_ids]
+    true_leaf = is_leaf[true_child]
+    false_leaf = is_leaf[false_child]
+
+    tree = helper.make_node(
+        'TreeEnsemble', [INPUT_NAME], ['tree_sum'], domain='ai.onnx.ml',
+        n_targets=1,
+        aggregate_function=_AGGREGATE_SUM,
+        post_transform=_POST_TRANSFORM_NONE,
+        tree_roots=node_index[forest.roots].tolist(),
+        nodes_featureids=np.where(is_stump, 0, forest.feature[node_ids]).tolist(),
+        nodes_splits=numpy_helper.from_array(
+            np.where(is_stump, 0, forest.threshold[node_ids]).astype(np.float32)),
+        nodes_modes=numpy_helper.from_array(np.full(len(node_ids), _BRANCH_LT, dtype=np.uint8)),
+        nodes_truenodeids=np.where(true_leaf, leaf_index[true_child], node_index[true_child]).tolist(),
+        nodes_trueleafs=true_leaf.astype(int).tolist(),
+        nodes_falsenodeids=np.where(false_leaf, leaf_index[false_child], node_index[false_child]).tolist(),
+        nodes_falseleafs=false_leaf.astype(int).tolist(),
+        nodes_missing_value_tracks_true=forest.default_left[node_ids].astype(int).tolist(),
+        leaf_targetids=[0] * len(leaf_weights),
+        leaf_weights=numpy_helper.from_array(leaf_weights.astype(np.float32)),
+    )
+    base_score = numpy_helper.from_array(np.array([forest.base_score], dtype=np.float32), 'base_score')
+    graph = helper.make_graph(
+        [tree, helper.make_node('Add', ['tree_sum', 'base_score'], ['variable'])],
+        'tss_predictor',
+        [helper.make_tensor_value_info(INPUT_NAME, TensorProto.FLOAT, [None, forest.num_features])],
+        [helper.make_tensor_value_info('variable', TensorProto.FLOAT, [None, 1])],
+        initializer=[base_score],
+    )
+    opset_imports = [helper.make_opsetid('', opset), helper.make_opsetid('ai.onnx.ml', ML_OPSET)]
+    model = helper.make_model(graph, opset_imports=opset_imports, producer_name='tss_model')
+    model.ir_version = helper.find_min_ir_version_for(opset_imports)
+    return model
+
+
+def compaction_report(reference: TreeEnsemble, compact_path: str, X: np.ndarray,
+                      source_onnx: str = None, repeats: int = 5) -> dict:
+    """
+    Size, session-creation time and prediction drift of the compact model
+    against the uncompacted forest (and the size/load time of source_onnx).
+    """
+    from .optimize import session_create_ms
+    from .runtime import load_predictor
+
+    expected = reference.predict(X)
+    deviation = np.abs(load_predictor(compact_path)(X) - expected)
+    relative = deviation / np.maximum(1.0, np.abs(expected))
+    report = {
+        'compact': {
+            'path': compact_path,
+            'size_bytes': os.path.getsize(compact_path),
+            'session_create_ms': session_create_ms(compact_path, 'all', repeats),
+        },
+        'drift': {
+            'rows': len(X),
+            'max_abs': float(deviation.max()) if len(X) else 0.0,
+            'mean_abs': float(deviation.mean()) if len(X) else 0.0,
+            'max_rel': float(relative.max()) if len(X) else 0.0,
+        },
+    }
+    if source_onnx:
+        report['source'] = {
+            'path': source_onnx,
+            'size_bytes': os.path.getsize(source_onnx),
+            'session_create_ms': session_create_ms(source_onnx, 'all', repeats),
+        }
+        report['size_ratio'] = report['compact']['size_bytes'] / report['source']['size_bytes']
+    return report
+
+
+def register(subparsers):
+    parser = subparsers.add_parser(
+        'compact',
+        help='Write a compacted ONNX model and report size, load time and drift',
+        description='Prune and deduplicate the forest and emit it as an ai.onnx.ml '
+                    'TreeEnsemble model'
+    )
+    parser.add_argument('-i', '--input', default=DEFAULT_MODEL,
+                        help='Pickled/native XGBoost model, XGBoost JSON or compiled .npz forest')
+    parser.add_argument('--features', default=DEFAULT_FEATURES,
+                        help='Path to features JSON file')
+    parser.add_argument('-o', '--output', default=DEFAULT_COMPACT_OUTPUT,
+                        help='Output path for the compact ONNX model')
+    parser.add_argument('--source-onnx', default=DEFAULT_OUTPUT,
+                        help='Existing ONNX model to compare size and load time against')
+    parser.add_argument('--opset', type=int, default=DEFAULT_OPSET,
+                        help=f'Default-domain opset (default: {DEFAULT_OPSET})')
+    parser.add_argument('--float16', action='store_true',
+                        help='Round thresholds and leaves to float16 precision (lossy)')
+    parser.add_argument('--data', help='.npy feature matrix to measure drift on (default: random rows)')
+    parser.add_argument('--rows', type=int, default=100000,
+                        help='Rows to measure drift on (default: 100000)')
+    parser.set_defaults(func=run)
+
+
+def run(args) -> int:
+    for path, label in ((args.input, 'Model'), (args.features, 'Features')):
+        if not os.path.exists(path):
+            print(f"❌ {label} file not found: {path}")
+            return 1
+
+    import onnx
+
+    from .bench import benchmark_inputs
+    from .convert import PARITY_RTOL, save_metadata
+
+    print(f"🗜️  Compacting {args.input}...")
+    forest = load_forest(args.input)
+    try:
+        compacted, stats = compact_forest(forest, float16=args.float16)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+
+    onnx.save(forest_to_onnx(compacted, args.opset), args.output)
+    print(f"   - Nodes: {stats['nodes_before']} → {stats['nodes_after']} "
+          f"({stats['collapsed_splits']} constant splits, {stats['unreachable_nodes']} unreachable)")
+    print(f"   - Leaves: {stats['leaves']} ({stats['unique_leaves']} unique values stored)")
+
+    X = benchmark_inputs(forest.num_features, args.rows, args.data)
+    source = args.source_onnx if args.source_onnx and os.path.exists(args.source_onnx) else None
+    report = compaction_report(forest, args.output, X, source)
+
+    compact = report['compact']
+    print(f"   - Size: {compact['size_bytes'] / 1024:.0f} KB, "
+          f"session create {compact['session_create_ms']:.1f} ms")
+    if source:
+        print(f"   - Source {source}: {report['source']['size_bytes'] / 1024:.0f} KB, "
+              f"session create {report['source']['session_create_ms']:.1f} ms "
+              f"({1 - report['size_ratio']:.0%} smaller)")
+    print(f"   - Drift on {report['drift']['rows']} rows: max |Δ| = {report['drift']['max_abs']:.6f}, "
+          f"mean |Δ| = {report['drift']['mean_abs']:.6f} TSS")
+
+    save_metadata(args.output, load_features(args.features), 'compact', args.opset, bundle=True,
+                  baseScore=forest.base_score, compaction={**stats, 'drift': report['drift']})
+
+    if not args.float16 and report['drift']['max_rel'] > PARITY_RTOL:
+        print(f"❌ Lossless compaction changed predictions")
+        return 1
+
+    print(f"✅ Compact model saved to: {args.output}")
+    return 0
@@ -0,0 +1,417 @@
+"""
+Convert the XGBoost TSS model to ONNX with a pluggable backend.
+
+Conversions are cached by content: re-running with the same model, feature
+list, backend and opset reuses the previous result.
+"""
+
+import json
+import os
+import tempfile
+
+from .backends import (BACKENDS, DEFAULT_BACKEND, DEFAULT_WORKLOAD, TREE_STRATEGIES, WORKLOADS,
+                       get_backend)
+from .cache import DEFAULT_CACHE_DIR, ConversionCache, cache_key
+from .model_io import (DEFAULT_FEATURES, DEFAULT_MODEL, DEFAULT_OUTPUT,
+                       file_sha256, load_features, load_model, read_base_score)
+from .profiling import stage
+
+
+# Relative tolerance for parity checks (float32 accumulation order differs)
+PARITY_RTOL = 1e-4
+
+
+def metadata_path_for(output_path: str) -> str:
+    return output_path.replace('.onnx', '.json')
+
+
+def save_metadata(output_path: str, features: list, backend: str, opset: int,
+                  bundle: bool = False, **extra) -> str:
+    """
+    Save model metadata next to the ONNX file (extra keys are appended).
+
+    With bundle=True the metadata is also embedded in the ONNX file (see
+    bundle.py) and the JSON gets the same content, including modelHash.
+    """
+    metadata = {
+        "version": "v1",
+        "modelType": "xgboost-regressor",
+        "task": "tss-prediction",
+        "features": features,
+        "inputShape": [None, len(features)],
+        "outputShape": [None, 1],
+        "framework": "xgboost",
+        "conversionTool": backend,
+        "opset": opset,
+        **extra
+    }
+    if bundle:
+        from .bundle import embed_metadata
+        metadata = embed_metadata(output_path, metadata)
+
+    metadata_path = metadata_path_for(output_path)
+    content = json.dumps(metadata, indent=2)
+    current = None
+    if os.path.exists(metadata_path):
+        with open(metadata_path, 'r') as f:
+            current = f.read()
+    if current != content:
+        with open(metadata_path, 'w') as f:
+            f.write(content)
+
+    print(f"📋 Metadata saved to: {metadata_path}")
+    return metadata_path
+
+
+def validate_onnx_model(onnx_path: str, num_features: int, reference=None,
+                        num_samples: int = 1000) -> bool:
+    """
+    Validate ONNX model can be loaded and run.
+
+    If reference (a callable mapping a feature matrix to predictions) is given,
+    its output on num_samples random rows must match the ONNX output.
+    """
+    print(f"\n🧪 Validating ONNX model...")
+
+    try:
+        import numpy as np
+        import onnxruntime as rt
+
+        session = rt.InferenceSession(onnx_path)
+
+        input_name = session.get_inputs()[0].name
+        output_name = session.get_outputs()[0].name
+
+        print(f"   - Input: {input_name} {session.get_inputs()[0].shape}")
+        print(f"   - Output: {output_name} {session.get_outputs()[0].shape}")
+
+        dummy_input = np.random.randn(1, num_features).astype(np.float32)
+        result = session.run([output_name], {input_name: dummy_input})
+
+        print(f"✅ Validation successful!")
+        print(f"   - Test prediction shape: {result[0].shape}")
+        print(f"   - Sample output: {result[0][0]}")
+
+        if reference is not None:
+            rng = np.random.default_rng(0)
+            samples = (rng.random((num_samples, num_features)) * 300).astype(np.float32)
+            expected = session.run([output_name], {input_name: samples})[0].ravel()
+            actual = np.asarray(reference(samples)).ravel()
+            deviation = np.abs(actual - expected)
+            tolerance = PARITY_RTOL * np.maximum(1.0, np.abs(expected))
+            print(f"   - Parity on {num_samples} rows: max |Δ| = {deviation.max():.6f} TSS")
+            if np.any(deviation > tolerance):
+                print(f"❌ Reference predictions deviate from ONNX output")
+                return False
+
+        return True
+
+    except Exception as e:
+        print(f"❌ Validation failed: {e}")
+        return False
+
+
+def _same_graph(output_path: str, source_path: str) -> bool:
+    """Whether two ONNX files hold the same model apart from metadata_props."""
+    import onnx
+
+    from .bundle import model_hash
+
+    try:
+        return model_hash(onnx.load(output_path)) == model_hash(onnx.load(source_path))
+    except Exception:
+        # Not a loadable model (e.g. a partial write): rewrite it
+        return False
+
+
+def _write_if_changed(output_path: str, source_path: str, bundle: bool = False) -> bool:
+    """
+    Copy source to output unless output already has identical content. With
+    bundle, the output carries embedded metadata the cached model lacks, so
+    it is left alone if its graph matches (save_metadata re-embeds only if
+    the metadata changed).
+    """
+    if os.path.exists(output_path):
+        if file_sha256(output_path) == file_sha256(source_path):
+            return False
+        if bundle and _same_graph(output_path, source_path):
+            return False
+    with open(source_path, 'rb') as src, open(output_path, 'wb') as dst:
+        dst.write(src.read())
+    return True
+
+
+def _check_parity(model_path: str, output_path: str, rows: int) -> dict:
+    from .parity import check_parity, default_workers, feature_corpus, xgboost_predictor
+    from .runtime import load_predictor
+
+    workers = default_workers()
+    threads = 1 if workers > 1 else 0
+    print(f"\n⚖️  Checking parity with XGBoost on {rows:,} simulated rows...")
+    report = check_parity(xgboost_predictor(model_path, threads),
+                          {'onnx': load_predictor(output_path, threads)},
+                          feature_corpus(rows), workers=workers)
+    print(f"   - {report['rows_per_second']:,.0f} rows/s on {workers} worker(s)")
+    summary = report['candidates']['onnx']
+    print(f"   - max |Δ| = {summary['max_abs']:.4f} TSS, p99 = {summary['p99_abs']:.4f}, "
+          f"max relative = {summary['max_rel']:.2e}")
+    if not summary['passed']:
+        raise RuntimeError(f"{summary['rows_over_tolerance']} rows deviate from XGBoost "
+                           f"beyond tolerance (atol={report['atol']}, rtol={report['rtol']})")
+    return {key: summary[key] for key in ('max_abs', 'p99_abs', 'max_rel')} | {'rows': rows}
+
+
+def convert_model(
+    model_path: str = DEFAULT_MODEL,
+    features_path: str = DEFAULT_FEATURES,
+    output_path: str = DEFAULT_OUTPUT,
+    backend: str = DEFAULT_BACKEND,
+    opset: int = None,
+    cache_dir: str = DEFAULT_CACHE_DIR,
+    use_cache: bool = True,
+    validate: bool = True,
+    optimize: str = None,
+    parity_rows: int = None,
+    bundle: bool = True,
+    manifest_path: str = None,
+    backend_options: dict = None,
+) -> dict:
+    """
+    Convert one model and write the ONNX file plus metadata JSON.
+
+    If optimize names a graph optimization level, optimized .opt.onnx and
+    .ort artifacts are written as well (see optimize.py), after the metadata
+    so that they carry it, and recorded in the manifest. If parity_rows is
+    set, the result is checked against XGBoost on that many simulated rows
+    (see parity.py) and a failed check raises RuntimeError. With bundle the
+    metadata, including base_score, is embedded in the ONNX file; if
+    manifest_path is given as well, the bundle is recorded in that manifest.
+    backend_options are passed to the backend (e.g. Hummingbird's
+    tree_strategy and workload). Any choices the backend reports are added
+    to the metadata.
+
+    Returns a summary dict with the output paths, cache key, whether the
+    conversion was served from the cache and whether it was validated.
+    """
+    spec = get_backend(backend)
+    opset = opset or spec.default_opset
+    backend_options = dict(backend_options or {})
+    # The workload only steers tree_strategy 'auto'; it must not split the cache otherwise
+    if backend_options.get('tree_strategy', 'auto') != 'auto':
+        backend_options.pop('workload', None)
+    features = load_features(features_path)
+
+    cache = ConversionCache(cache_dir)
+    with stage('cache_lookup'):
+        key = cache_key(model_path, features_path, spec.name, opset, **backend_options)
+        entry = cache.get(key) if use_cache else None
+
+    base_score = None
+    if entry is not None:
+        print(f"♻️  Cache hit ({key[:12]}), skipping conversion")
+        base_score = entry.get('baseScore')
+        details = entry.get('details', {})
+        with stage('save'):
+            written = _write_if_changed(output_path, entry['path'], bundle=bundle)
+        print(f"✅ ONNX model {'saved to' if written else 'already up to date'}: {output_path}")
+        valid = entry.get('validated', False)
+        if validate and not valid:
+            with stage('validation'):
+                valid = validate_onnx_model(output_path, len(features))
+            if valid:
+                cache.update(key, validated=True)
+    else:
+        print(f"🔄 Converting with backend '{spec.name}' (opset {opset})...")
+        with stage('load_model'):
+            model = load_model(model_path)
+            if bundle:
+                base_score = read_base_score(model)
+        with stage('convert'), tempfile.TemporaryDirectory() as work_dir:
+            onnx_bytes, details = spec.run(model, len(features), opset, work_dir,
+                                           **backend_options)
+        for strategy, timing in details.get('strategyBenchmark', {}).items():
+            print(f"   - {strategy}: {timing['ms_per_row']:.4f} ms/row")
+        if 'treeStrategy' in details:
+            print(f"🌲 Tree strategy: {details['treeStrategy']}")
+
+        with stage('save'):
+            with open(output_path, 'wb') as f:
+                f.write(onnx_bytes)
+        print(f"✅ ONNX model saved to: {output_path}")
+
+        with stage('validation'):
+            valid = validate_onnx_model(output_path, len(features)) if validate else False
+        if validate and not valid:
+            raise RuntimeError(f"Converted model failed validation: {output_path}")
+
+        if use_cache:
+            with stage('cache_store'):
+                cache.put(key, onnx_bytes, {
+                    'backend': spec.name,
+                    'opset': opset,
+                    'model': os.path.basename(model_path),
+                    'features': features,
+                    'validated': valid,
+                    'baseScore': base_score,
+                    'details': details,
+                })
+
+    file_size = os.path.getsize(output_path) / (1024 * 1024)
+    print(f"📦 Model size: {file_size:.2f} MB")
+
+    extra = dict(details)
+    if parity_rows:
+        with stage('parity'):
+            extra['parity'] = _check_parity(model_path, output_path, parity_rows)
+
+    if optimize:
+        from .optimize import metadata_fields
+        extra.update(metadata_fields(output_path, optimize))
+
+    manifest_entry = None
+    if bundle:
+        if base_score is None:
+            with stage('load_model'):
+                base_score = read_base_score(load_model(model_path))
+        extra['baseScore'] = base_score
+
+    with stage('metadata'):
+        metadata_path = save_metadata(output_path, features, spec.name, opset, bundle=bundle,
+                                      **extra)
+
+    # After the metadata stage, so that the artifacts carry the bundle metadata
+    optimization = None
+    if optimize:
+        from .optimize import optimize_model
+        with stage('optimize'):
+            optimization = optimize_model(output_path, optimize)
+
+    if bundle and manifest_path:
+        from .bundle import read_metadata, update_manifest
+        from .optimize import record_in_manifest
+        with stage('manifest'):
+            if optimize:
+                manifest_entry = record_in_manifest(manifest_path, output_path,
+                                                    read_metadata(output_path))
+            else:
+                manifest_entry = update_manifest(manifest_path, output_path,
+                                                 read_metadata(output_path))
+                print(f"🗂️  Manifest {manifest_path}: revision {manifest_entry['revision']}")
+
+    return {
+        'output': output_path,
+        'metadata': metadata_path,
+        'backend': spec.name,
+        'opset': opset,
+        'cache_key': key,
+        'cache_hit': entry is not None,
+        'size_bytes': os.path.getsize(output_path),
+        'validated': valid,
+        'parity': extra.get('parity'),
+        'optimization': optimization,
+        'manifest': manifest_entry,
+    }
+
+
+def register(subparsers):
+    parser = subparsers.add_parser(
+        'convert',
+        help='Convert the XGBoost model to ONNX',
+        description='Convert the XGBoost model to ONNX (cached by content hash)'
+    )
+    parser.add_argument('-i', '--input', default=DEFAULT_MODEL,
+                        help='Pickled XGBRegressor or native XGBoost model')
+    parser.add_argument('--features', default=DEFAULT_FEATURES,
+                        help='Path to features JSON file')
+    parser.add_argument('-o', '--output', default=DEFAULT_OUTPUT,
+                        help='Output path for ONNX model')
+    parser.add_argument('--backend', default=DEFAULT_BACKEND, choices=sorted(BACKENDS),
+                        help=f'Conversion backend (default: {DEFAULT_BACKEND})')
+    parser.add_argument('--opset', type=int, default=None,
+                        help='Target opset (default: per backend)')
+    parser.add_argument('--tree-strategy', default='auto', choices=('auto', *TREE_STRATEGIES),
+                        help='Hummingbird tree implementation; auto benchmarks all of them '
+                             '(default: auto)')
+    parser.add_argument('--workload', default=DEFAULT_WORKLOAD, choices=sorted(WORKLOADS),
+                        help='Workload auto picks the fastest strategy for: online = single '
+                             f'rows, bulk = large batches (default: {DEFAULT_WORKLOAD})')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                        help='Conversion cache directory')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Always convert and do not store the result')
+    parser.add_argument('--no-validate', action='store_true',
+                        help='Skip validation step')
+    parser.add_argument('--parity', nargs='?', type=int, const=1_000_000, default=None,
+                        metavar='ROWS',
+                        help='Check parity with XGBoost on simulated rows (default: 1,000,000)')
+    parser.add_argument('--optimize', nargs='?', const='extended', default=None,
+                        choices=('basic', 'extended', 'all'),
+                        help='Also save graph-optimized .opt.onnx and .ort artifacts '
+                             '(level, default: extended)')
+    parser.add_argument('--manifest', default=None,
+                        help='Bundle manifest to update (default: model-manifest.json next to '
+                             'the output)')
+    parser.add_argument('--no-bundle', action='store_true',
+                        help='Do not embed metadata in the ONNX file or update the manifest')
+    parser.add_argument('--profile', nargs='?', const='convert-profile.json', default=None,
+                        metavar='PATH',
+                        help='Record wall time and peak RSS per stage as JSON / Chrome trace '
+                             '(default: convert-profile.json)')
+    parser.set_defaults(func=run)
+
+
+def run(args) -> int:
+    from contextlib import nullcontext
+
+    from .bundle import manifest_path_for
+    from .profiling import Profiler, print_summary
+
+    for path, label in ((args.input, 'Model'), (args.features, 'Features')):
+        if not os.path.exists(path):
+            print(f"❌ {label} file not found: {path}")
+            return 1
+
+    print("🤖 XGBoost to ONNX Converter")
+    print("=" * 50)
+
+    profiler = Profiler() if args.profile else None
+    try:
+        with profiler.active() if profiler else nullcontext():
+            result = convert_model(
+                model_path=args.input,
+                features_path=args.features,
+                output_path=args.output,
+                backend=args.backend,
+                opset=args.opset,
+                cache_dir=args.cache_dir,
+                use_cache=not args.no_cache,
+                validate=not args.no_validate,
+                optimize=args.optimize,
+                parity_rows=args.parity,
+                bundle=not args.no_bundle,
+                manifest_path=args.manifest or manifest_path_for(args.output),
+                backend_options={name: getattr(args, name)
+                                 for name in get_backend(args.backend).options},
+            )
+    except Exception as e:
+        print(f"❌ Conversion failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+    finally:
+        # Also written when the conversion fails, to see where it stopped
+        if profiler:
+            print_summary(profiler.save(args.profile))
+            print(f"📋 Profile saved to: {args.profile}")
+
+    print("\n" + "=" * 50)
+    print("✅ Conversion completed successfully!")
+    print(f"\n📤 Upload these files to Firebase Storage (ml-models/):")
+    print(f"   - {args.output}")
+    print(f"   - {metadata_path_for(args.output)} (for clients without the manifest)")
+    if result['manifest']:
+        print(f"   - {args.manifest or manifest_path_for(args.output)}")
+    if result['optimization']:
+        for kind in ('onnx', 'ort'):
+            print(f"   - {result['optimization'][kind]['path']}")
+    return 0
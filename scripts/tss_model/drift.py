@@ -0,0 +1,369 @@
+"""
+Streaming drift monitor for the model's input features.
+
+The reference profile is built once from the training features and stored
+next to the model metadata (tss-predictor-v1.reference.json). Per feature
+it holds:
+- the percentile edges of the training distribution;
+- the training CDF at those edges and the share of rows per decile;
+- the training zero and missing rates.
+
+The monitor keeps a fixed-size sketch per feature:
+- row counts between consecutive reference edges (at most 100 bins);
+- zero and missing counts;
+- count, sum and sum of squares, min and max.
+An update is a searchsorted and a bincount per chunk, so memory stays the
+same however many rows stream through. Sketches of separate runs or score
+workers merge by adding them.
+
+Scores per feature:
+- PSI over the reference deciles: sum (cur - ref) * ln(cur / ref);
+- KS: max |F_cur - F_ref| over the percentile edges;
+- the change in zero rate (TSS_zero7, TSS_lag1 on rest days) and missing rate;
+- current quantiles interpolated within the bins.
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from .matrix_io import iter_feature_chunks
+from .model_io import DEFAULT_FEATURES, load_features
+
+DEFAULT_PROFILE = 'tss-predictor-v1.reference.json'
+DEFAULT_CHUNK_ROWS = 65536
+DEFAULT_SAMPLE_ROWS = 200_000
+PROFILE_VERSION = 1
+
+PERCENTILES = np.arange(1, 100) / 100
+DECILE_INDEX = np.arange(9, 99, 10)              # positions of 0.1 .. 0.9 in PERCENTILES
+# Floor for empty bins in PSI (avoids ln(0))
+PSI_EPSILON = 1e-4
+
+PSI_WATCH, PSI_DRIFT = 0.1, 0.25
+KS_WATCH, KS_DRIFT = 0.1, 0.2
+RATE_WATCH, RATE_DRIFT = 0.05, 0.15
+
+
+def sample_rows(chunks, size: int = DEFAULT_SAMPLE_ROWS, seed: int = 0) -> np.ndarray:
+    """Uniform sample of up to size rows from a stream of chunks (random-key reservoir)."""
+    rng = np.random.default_rng(seed)
+    sample, keys = None, np.zeros(0)
+    for chunk in chunks:
+        chunk_keys = rng.random(len(chunk))
+        sample = chunk if sample is None else np.concatenate([sample, chunk])
+        keys = np.concatenate([keys, chunk_keys])
+        if len(keys) > size:
+            keep = np.argpartition(keys, size)[:size]
+            sample, keys = sample[keep], keys[keep]
+    if sample is None:
+        raise ValueError("No rows to build a profile from")
+    return sample
+
+
+def build_profile(X: np.ndarray, features: list, rows: int = None) -> dict:
+    """Reference profile of a (N, len(features)) training sample."""
+    columns = {}
+    for i, name in enumerate(features):
+        values = np.asarray(X[:, i], dtype=np.float64)
+        finite = np.sort(values[np.isfinite(values)])
+        if not len(finite):
+            raise ValueError(f"Feature {name} has no finite values in the reference")
+        percentiles = np.quantile(finite, PERCENTILES)
+        edges = np.unique(percentiles)
+        deciles = np.unique(percentiles[DECILE_INDEX])
+        decile_counts = np.diff(np.concatenate(
+            [[0], np.searchsorted(finite, deciles, side='left'), [len(finite)]]))
+        columns[name] = {
+            'edges': edges.tolist(),
+            'cdf': (np.searchsorted(finite, edges, side='left') / len(finite)).tolist(),
+            'deciles': deciles.tolist(),
+            'decile_share': (decile_counts / len(finite)).tolist(),
+            'median': float(percentiles[49]),
+            'mean': float(finite.mean()),
+            'std': float(finite.std()),
+            'zero_rate': float(np.mean(finite == 0)),
+            'missing_rate': float(1 - len(finite) / len(values)),
+        }
+    return {'version': PROFILE_VERSION, 'features': list(features),
+            'rows': int(rows if rows is not None else len(X)), 'sample_rows': int(len(X)),
+            'columns': columns}
+
+
+def load_profile(path: str) -> dict:
+    with open(path, 'r') as f:
+        profile = json.load(f)
+    if profile.get('version') != PROFILE_VERSION:
+        raise ValueError(f"{path} is not a version {PROFILE_VERSION} reference profile")
+    return profile
+
+
+def profile_hash(profile: dict) -> str:
+    return hashlib.sha256(json.dumps(profile, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class DriftMonitor:
+    """Fixed-size per-feature sketches of a stream of feature rows."""
+
+    def __init__(self, profile: dict):
+        self.profile = profile
+        self.features = profile['features']
+        self._edges = [np.array(profile['columns'][name]['edges']) for name in self.features]
+        bins = max(len(edges) for edges in self._edges) + 1
+        num = len(self.features)
+        self.counts = np.zeros((num, bins), dtype=np.int64)
+        self.zeros = np.zeros(num, dtype=np.int64)
+        self.missing = np.zeros(num, dtype=np.int64)
+        self.rows = 0
+        self.total = np.zeros(num)
+        self.total_sq = np.zeros(num)
+        self.low = np.full(num, np.inf)
+        self.high = np.full(num, -np.inf)
+
+    def update(self, X: np.ndarray):
+        """Add a (rows, features) chunk to the sketches."""
+        X = np.asarray(X)
+        if X.ndim != 2 or X.shape[1] != len(self.features):
+            raise ValueError(f"Expected shape (N, {len(self.features)}), got {X.shape}")
+        self.rows += len(X)
+        for i, edges in enumerate(self._edges):
+            values = np.asarray(X[:, i], dtype=np.float64)
+            finite = values[np.isfinite(values)]
+            self.missing[i] += len(values) - len(finite)
+            if not len(finite):
+                continue
+            # Bin j holds edges[j-1] <= x < edges[j]
+            bins = np.searchsorted(edges, finite, side='right')
+            self.counts[i] += np.bincount(bins, minlength=self.counts.shape[1])
+            self.zeros[i] += int(np.count_nonzero(finite == 0))
+            self.total[i] += finite.sum()
+            self.total_sq[i] += np.square(finite).sum()
+            self.low[i] = min(self.low[i], finite.min())
+            self.high[i] = max(self.high[i], finite.max())
+
+    def merge(self, other: 'DriftMonitor'):
+        """Add another monitor's sketches (same profile) to this one."""
+        if other.features != self.features or other.counts.shape != self.counts.shape:
+            raise ValueError("Cannot merge monitors of different profiles")
+        self.counts += other.counts
+        self.zeros += other.zeros
+        self.missing += other.missing
+        self.rows += other.rows
+        self.total += other.total
+        self.total_sq += other.total_sq
+        self.low = np.minimum(self.low, other.low)
+        self.high = np.maximum(self.high, other.high)
+
+    def quantile(self, i: int, q: float) -> float:
+        """Quantile q of feature i, interpolated linearly within its bin."""
+        counts = self.counts[i, :len(self._edges[i]) + 1]
+        seen = counts.sum()
+        if not seen:
+            return float('nan')
+        bounds = np.concatenate([[self.low[i]], self._edges[i], [self.high[i]]])
+        cumulative = np.cumsum(counts)
+        j = int(np.searchsorted(cumulative, q * seen, side='left'))
+        before = cumulative[j - 1] if j else 0
+        share = (q * seen - before) / counts[j] if counts[j] else 0.0
+        lo, hi = max(bounds[j], self.low[i]), min(bounds[j + 1], self.high[i])
+        return float(lo + share * (hi - lo))
+
+    def scores(self) -> list:
+        """Per-feature drift scores against the reference profile."""
+        results = []
+        for i, name in enumerate(self.features):
+            reference = self.profile['columns'][name]
+            edges = self._edges[i]
+            counts = self.counts[i, :len(edges) + 1]
+            seen = int(counts.sum())
+            result = {'feature': name, 'rows': seen,
+                      'missing_rate': self.missing[i] / self.rows if self.rows else 0.0}
+            if not seen:
+                results.append({**result, 'psi': None, 'ks': None, 'status': 'no data'})
+                continue
+
+            cdf = np.cumsum(counts)[:-1] / seen                 # share below each edge
+            ks = float(np.max(np.abs(cdf - np.array(reference['cdf']))))
+
+            # Deciles are a subset of the edges: sum the fine bins per decile
+            decile_bins = np.searchsorted(reference['deciles'], np.concatenate([[-np.inf], edges]),
+                                          side='right')
+            current = np.bincount(decile_bins, weights=counts,
+                                  minlength=len(reference['deciles']) + 1) / seen
+            expected = np.maximum(np.array(reference['decile_share']), PSI_EPSILON)
+            current = np.maximum(current, PSI_EPSILON)
+            psi = float(np.sum((current - expected) * np.log(current / expected)))
+
+            zero_rate = self.zeros[i] / seen
+            mean = self.total[i] / seen
+            rate_change = max(abs(zero_rate - reference['zero_rate']),
+                              abs(result['missing_rate'] - reference['missing_rate']))
+            if psi >= PSI_DRIFT or ks >= KS_DRIFT or rate_change >= RATE_DRIFT:
+                status = 'drift'
+            elif psi >= PSI_WATCH or ks >= KS_WATCH or rate_change >= RATE_WATCH:
+                status = 'watch'
+            else:
+                status = 'ok'
+            results.append({
+                **result,
+                'psi': psi,
+                'ks': ks,
+                'zero_rate': zero_rate,
+                'reference_zero_rate': reference['zero_rate'],
+                'mean': mean,
+                'reference_mean': reference['mean'],
+                'std': float(np.sqrt(max(self.total_sq[i] / seen - mean ** 2, 0.0))),
+                'median': self.quantile(i, 0.5),
+                'reference_median': reference['median'],
+                'status': status,
+            })
+        return results
+
+    def to_dict(self) -> dict:
+        return {
+            'profile': profile_hash(self.profile),
+            'rows': self.rows,
+            'counts': self.counts.tolist(),
+            'zeros': self.zeros.tolist(),
+            'missing': self.missing.tolist(),
+            'total': self.total.tolist(),
+            'total_sq': self.total_sq.tolist(),
+            'low': [None if np.isinf(v) else v for v in self.low.tolist()],
+            'high': [None if np.isinf(v) else v for v in self.high.tolist()],
+        }
+
+    @classmethod
+    def from_dict(cls, profile: dict, state: dict) -> 'DriftMonitor':
+        if state['profile'] != profile_hash(profile):
+            raise ValueError("The drift state was collected against a different profile")
+        monitor = cls(profile)
+        monitor.rows = state['rows']
+        monitor.counts = np.array(state['counts'], dtype=np.int64)
+        monitor.zeros = np.array(state['zeros'], dtype=np.int64)
+        monitor.missing = np.array(state['missing'], dtype=np.int64)
+        monitor.total = np.array(state['total'])
+        monitor.total_sq = np.array(state['total_sq'])
+        monitor.low = np.array([np.inf if v is None else v for v in state['low']])
+        monitor.high = np.array([-np.inf if v is None else v for v in state['high']])
+        return monitor
+
+
+def open_monitor(profile_path: str, state_path: str = None, features: list = None) -> DriftMonitor:
+    """
+    Monitor for a profile, continuing from state_path if it exists. With
+    features, the profile must have been built for exactly that column order.
+    """
+    profile = load_profile(profile_path)
+    if features is not None and profile['features'] != list(features):
+        raise ValueError(f"{profile_path} was built for different features")
+    if state_path and os.path.exists(state_path):
+        with open(state_path, 'r') as f:
+            return DriftMonitor.from_dict(profile, json.load(f))
+    return DriftMonitor(profile)
+
+
+def save_state(path: str, monitor: DriftMonitor):
+    from .cache import _atomic_write
+
+    _atomic_write(path, json.dumps(monitor.to_dict()).encode('utf-8'))
+
+
+def print_scores(scores: list):
+    marks = {'ok': '✓', 'watch': '⚠️ ', 'drift': '❌', 'no data': '·'}
+    print(f"\n   {'feature':<12} {'PSI':>6} {'KS':>6} {'zero%':>13} {'median':>19}  status")
+    for s in scores:
+        if s['psi'] is None:
+            print(f"   {s['feature']:<12} {'-':>6} {'-':>6} {'':>13} {'':>19}  {s['status']}")
+            continue
+        print(f"   {s['feature']:<12} {s['psi']:6.3f} {s['ks']:6.3f} "
+              f"{100 * s['reference_zero_rate']:5.1f}→{100 * s['zero_rate']:5.1f} "
+              f"{s['reference_median']:8.2f}→{s['median']:8.2f}  "
+              f"{marks[s['status']]} {s['status']}")
+
+
+def register(subparsers):
+    parser = subparsers.add_parser(
+        'drift',
+        help='Compare streamed feature rows against the training distribution',
+        description='Build a reference profile from training features, or stream a feature '
+                    'matrix through fixed-size sketches and report PSI/KS drift per feature'
+    )
+    parser.add_argument('-i', '--input', required=True,
+                        help='Feature matrix (.npy, .csv or .parquet)')
+    parser.add_argument('--profile', default=DEFAULT_PROFILE,
+                        help=f'Reference profile (default: {DEFAULT_PROFILE})')
+    parser.add_argument('--build', action='store_true',
+                        help='Build the reference profile from the input instead of checking it')
+    parser.add_argument('--sample-rows', type=int, default=DEFAULT_SAMPLE_ROWS,
+                        help=f'Rows sampled for the profile (default: {DEFAULT_SAMPLE_ROWS:,})')
+    parser.add_argument('--features', default=DEFAULT_FEATURES,
+                        help='Path to features JSON file (column order)')
+    parser.add_argument('--state',
+                        help='Sketch state JSON: continue from it and update it afterwards')
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS,
+                        help=f'Rows per chunk (default: {DEFAULT_CHUNK_ROWS})')
+    parser.add_argument('-r', '--report', help='Write the scores as JSON here')
+    parser.add_argument('--fail-on-drift', action='store_true',
+                        help='Exit with status 1 if any feature drifted')
+    parser.set_defaults(func=run)
+
+
+def run(args) -> int:
+    for path, label in ((args.input, 'Input'), (args.features, 'Features')):
+        if not os.path.exists(path):
+            print(f"❌ {label} file not found: {path}")
+            return 1
+    features = load_features(args.features)
+
+    if args.build:
+        print(f"📐 Building reference profile from {args.input}...")
+        rows = [0]
+
+        def counted(chunks):
+            for chunk in chunks:
+                rows[0] += len(chunk)
+                yield chunk
+
+        try:
+            sample = sample_rows(counted(iter_feature_chunks(args.input, features,
+                                                             args.chunk_rows)),
+                                 args.sample_rows)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return 1
+        profile = build_profile(sample, features, rows=rows[0])
+        with open(args.profile, 'w') as f:
+            json.dump(profile, f, indent=2)
+        print(f"✅ Profile of {len(features)} features from {len(sample):,} of {rows[0]:,} "
+              f"rows saved to {args.profile}")
+        return 0
+
+    if not os.path.exists(args.profile):
+        print(f"❌ Reference profile not found: {args.profile} (create it with --build)")
+        return 1
+    try:
+        monitor = open_monitor(args.profile, args.state, features)
+        print(f"📈 Checking {args.input} against {args.profile}...")
+        for chunk in iter_feature_chunks(args.input, features, args.chunk_rows):
+            monitor.update(chunk)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+
+    scores = monitor.scores()
+    print(f"   {monitor.rows:,} rows monitored")
+    print_scores(scores)
+    if args.state:
+        save_state(args.state, monitor)
+        print(f"\n💾 State saved to: {args.state}")
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump({'rows': monitor.rows, 'features': scores}, f, indent=2)
+        print(f"📋 Report saved to: {args.report}")
+
+    drifted = [s['feature'] for s in scores if s['status'] == 'drift']
+    if drifted:
+        print(f"\n❌ Drift in {', '.join(drifted)}")
+    return 1 if drifted and args.fail_on_drift else 0
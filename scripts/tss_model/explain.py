@@ -0,0 +1,402 @@
+"""
+Exact per-feature attributions (TreeSHAP) of the TSS forest, batched.
+
+Every root-to-leaf path of the forest contributes to the SHAP values of
+the features split on along it. For a row, that contribution depends only
+on which of the path's splits the row would follow: one bit per depth.
+With depth D there are at most 2^D such masks per path, so the path-
+dependent TreeSHAP result (the values of XGBoost's pred_contribs) is
+precomputed for every (path, mask) once per model. Explaining a batch then
+takes three vectorized steps:
+- one pass over the tree levels to get each row's mask at every leaf;
+- a gather from the path table;
+- a matrix product that adds the path contributions up per feature.
+
+The path table is cached per model hash, and so are the results, per
+(athlete, date). A nightly run only explains the feature-store rows it has
+not seen yet; dashboards read the cached values.
+
+Layout:
+    <cache_dir>/<model_sha256>/forest.npz        compiled forest with node covers
+    <cache_dir>/<model_sha256>/paths.npz         path table
+    <cache_dir>/<model_sha256>/attributions.npz  athlete_id, day, values (N, 15)
+"""
+
+import os
+import tempfile
+import time
+from math import factorial
+
+import numpy as np
+
+from .forest import load_forest
+from .model_io import DEFAULT_FEATURES, DEFAULT_MODEL, file_sha256, load_features
+
+DEFAULT_CACHE_DIR = '.attribution-cache'
+DEFAULT_CHUNK_ROWS = 64
+# The path table has 2^depth entries per leaf
+MAX_DEPTH = 12
+# Paths per block while building the table (bounds its working memory)
+BUILD_BLOCK = 2048
+
+
+def _tree_structure(forest) -> tuple:
+    """(parent, depth) per node and, per depth d, (children, parents, is_right) one level down."""
+    nodes = np.arange(forest.num_nodes)
+    internal = forest.left != nodes
+    parent = np.full(forest.num_nodes, -1, dtype=np.int64)
+    parent[forest.left[internal]] = nodes[internal]
+    parent[forest.right[internal]] = nodes[internal]
+
+    depth = np.zeros(forest.num_nodes, dtype=np.int64)
+    levels = []
+    frontier = np.asarray(forest.roots, dtype=np.int64)
+    while True:
+        splits = frontier[internal[frontier]]
+        if not len(splits):
+            break
+        children = np.concatenate([forest.left[splits], forest.right[splits]]).astype(np.int64)
+        depth[children] = len(levels) + 1
+        levels.append((children, np.concatenate([splits, splits]),
+                       np.repeat([False, True], len(splits))))
+        frontier = children
+    return parent, depth, levels
+
+
+def _shapley_weights(players: int) -> np.ndarray:
+    """|S|! (n - |S| - 1)! / n! for coalition sizes 0..n-1."""
+    return np.array([factorial(k) * factorial(players - k - 1) / factorial(players)
+                     for k in range(players)])
+
+
+def path_contributions(value, fraction, slot_of, length, depth) -> np.ndarray:
+    """
+    SHAP contributions of a block of paths for every split mask.
+
+    value (P,) leaf values; fraction (P, D) share of the parent's cover that
+    follows the path at each depth; slot_of (P, D) the first depth on the path
+    with the same feature (repeated features act as one player). Returns
+    (P, 2^D, D): the contribution of each slot, given which splits the row follows.
+    """
+    masks = 1 << depth
+    follows = ((np.arange(masks)[:, None] >> np.arange(depth)) & 1).astype(bool)   # (M, D)
+
+    # Per slot: zero fraction z (product over its depths) and one fraction o
+    # (row follows all of them); unused slots are null players with z = o = 1
+    z = np.ones((len(value), depth))
+    o = np.ones((len(value), masks, depth), dtype=bool)
+    rows = np.arange(len(value))
+    for k in range(depth):
+        on_path = k < length
+        z[rows[on_path], slot_of[on_path, k]] *= fraction[on_path, k]
+        for slot in range(k + 1):
+            applies = on_path & (slot_of[:, k] == slot)
+            o[applies, :, slot] &= follows[:, k]
+
+    # phi_i = v (o_i - z_i) sum_k w_k [t^k] prod_{j != i} (z_j + o_j t)
+    o = o.astype(np.float64)
+    z = np.broadcast_to(z[:, None, :], o.shape)
+    weights = _shapley_weights(depth)
+    out = np.empty(o.shape)
+    for i in range(depth):
+        poly = np.zeros(o.shape[:2] + (depth,))
+        poly[..., 0] = 1
+        for j in range(depth):
+            if j != i:
+                shifted = poly[..., :-1] * o[..., j:j + 1]
+                poly *= z[..., j:j + 1]
+                poly[..., 1:] += shifted
+        out[..., i] = poly @ weights * (o[..., i] - z[..., i])
+    return out * np.asarray(value, dtype=np.float64)[:, None, None]
+
+
+class TreeExplainer:
+    """Path table of a forest plus the level arrays that give every row's leaf masks."""
+
+    def __init__(self, forest, table: np.ndarray, slot_feature: np.ndarray,
+                 leaves: np.ndarray, expected_value: float):
+        self.forest = forest
+        self.table = table                      # (paths, 2^D, D) float32
+        self.slot_feature = slot_feature        # (paths, D)
+        self.leaves = leaves                    # (paths,) leaf node of each path
+        self.expected_value = float(expected_value)
+        _, _, self._levels = _tree_structure(forest)
+        self._mask_dtype = np.uint8 if table.shape[2] <= 8 else np.uint16
+        self._thresholds = [forest.threshold[parents][:, None] for _, parents, _ in self._levels]
+        self._missing_right = [~forest.default_left[parents][:, None]
+                               for _, parents, _ in self._levels]
+        self._is_right = [is_right[:, None] for _, _, is_right in self._levels]
+        self._table_rows = np.arange(len(leaves), dtype=np.int64) * table.shape[1]
+        # Adds the slot contributions of every path up per feature
+        onehot = np.zeros((slot_feature.size, forest.num_features))
+        onehot[np.arange(slot_feature.size), slot_feature.ravel()] = 1
+        self._onehot = onehot
+
+    @property
+    def num_features(self) -> int:
+        return self.forest.num_features
+
+    @classmethod
+    def from_forest(cls, forest) -> 'TreeExplainer':
+        """Build the path table (the expensive step, done once per model)."""
+        if forest.cover is None:
+            raise ValueError("The forest has no node covers; compile it from the model again")
+        parent, node_depth, _ = _tree_structure(forest)
+        depth = max(forest.max_depth, 1)
+        if depth > MAX_DEPTH:
+            raise ValueError(f"Trees of depth {depth} need a 2^{depth} path table; "
+                             f"at most depth {MAX_DEPTH} is supported")
+        leaves = np.flatnonzero(forest.left == np.arange(forest.num_nodes))
+        paths = len(leaves)
+
+        # Split node and covered fraction per depth of every path
+        nodes = np.zeros((paths, depth), dtype=np.int64)
+        fraction = np.ones((paths, depth))
+        current = leaves.astype(np.int64)
+        active = np.arange(paths)
+        while len(active):
+            up = parent[current[active]]
+            active, up = active[up >= 0], up[up >= 0]
+            k = node_depth[up]
+            nodes[active, k] = up
+            fraction[active, k] = forest.cover[current[active]] / forest.cover[up]
+            current[active] = up
+        length = node_depth[leaves]
+
+        # Slot of each depth: the first depth on the path splitting on the same feature
+        feature = forest.feature[nodes]
+        slot_of = np.tile(np.arange(depth), (paths, 1))
+        for k in range(depth):
+            for j in range(k - 1, -1, -1):
+                slot_of[:, k] = np.where(feature[:, j] == feature[:, k], j, slot_of[:, k])
+        slot_feature = np.where(slot_of == np.arange(depth), feature, 0)
+
+        value = forest.value[leaves].astype(np.float64)
+        table = np.empty((paths, 1 << depth, depth), dtype=np.float32)
+        for start in range(0, paths, BUILD_BLOCK):
+            block = slice(start, start + BUILD_BLOCK)
+            table[block] = path_contributions(value[block], fraction[block], slot_of[block],
+                                              length[block], depth)
+
+        # E[f] = base_score + sum over paths of value * prod of covered fractions
+        expected_value = forest.base_score + float(np.sum(value * fraction.prod(axis=1)))
+        return cls(forest, table, slot_feature, leaves, expected_value)
+
+    def leaf_masks(self, X: np.ndarray) -> np.ndarray:
+        """(paths, rows) bit k set where the row follows the path's split at depth k."""
+        forest = self.forest
+        # Feature-major, so each level gathers whole rows of X^T
+        columns = np.ascontiguousarray(X.T)
+        masks = np.zeros((forest.num_nodes, X.shape[0]), dtype=self._mask_dtype)
+        has_missing = np.isnan(columns).any()
+        for level, (children, parents, is_right) in enumerate(self._levels):
+            x = columns[forest.feature[parents]]
+            go_right = x >= self._thresholds[level]
+            if has_missing:
+                go_right = np.where(np.isnan(x), self._missing_right[level], go_right)
+            follows = (go_right == self._is_right[level]).astype(self._mask_dtype)
+            masks[children] = masks[parents] | (follows << level)
+        return masks[self.leaves]
+
+    def explain(self, X: np.ndarray, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> np.ndarray:
+        """
+        (N, num_features) float64 SHAP values; each row sums with
+        expected_value to the forest's prediction.
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.num_features:
+            raise ValueError(f"Expected shape (N, {self.num_features}), got {X.shape}")
+
+        # One void item per (path, mask): a gather copies all D slot values at once
+        depth = self.table.shape[2]
+        entries = self.table.reshape(-1, depth).view(np.dtype((np.void, 4 * depth))).ravel()
+        out = np.empty((X.shape[0], self.num_features))
+        for start in range(0, X.shape[0], chunk_rows):
+            block = X[start:start + chunk_rows]
+            index = np.ascontiguousarray((self._table_rows[:, None] + self.leaf_masks(block)).T)
+            contributions = entries[index].view(np.float32).reshape(len(block), -1)
+            # Accumulated in float64: path terms of leaves with large values
+            # cancel, and a float32 sum of them is off by whole TSS points
+            out[start:start + len(block)] = contributions.astype(np.float64) @ self._onehot
+        return out
+
+    def save(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        self.forest.save(os.path.join(directory, 'forest.npz'))
+        np.savez(os.path.join(directory, 'paths.npz'), table=self.table,
+                 slot_feature=self.slot_feature, leaves=self.leaves,
+                 expected_value=np.array(self.expected_value))
+
+    @classmethod
+    def load(cls, directory: str) -> 'TreeExplainer':
+        forest = load_forest(os.path.join(directory, 'forest.npz'))
+        with np.load(os.path.join(directory, 'paths.npz')) as data:
+            return cls(forest, data['table'], data['slot_feature'], data['leaves'],
+                       float(data['expected_value']))
+
+
+def load_explainer(model_path: str, cache_dir: str = DEFAULT_CACHE_DIR) -> tuple:
+    """(explainer, model hash, built) with the path table cached under the model hash."""
+    model_hash = file_sha256(model_path)
+    directory = os.path.join(cache_dir, model_hash)
+    if os.path.exists(os.path.join(directory, 'paths.npz')):
+        return TreeExplainer.load(directory), model_hash, False
+    explainer = TreeExplainer.from_forest(load_forest(model_path))
+    explainer.save(directory)
+    return explainer, model_hash, True
+
+
+class AttributionCache:
+    """Attributions per (athlete, date) for one model hash, sorted by athlete, then date."""
+
+    def __init__(self, cache_dir: str, model_hash: str, num_features: int):
+        self.path = os.path.join(cache_dir, model_hash, 'attributions.npz')
+        if os.path.exists(self.path):
+            with np.load(self.path) as data:
+                self.athlete_ids, self.days, self.values = (
+                    data['athlete_id'], data['day'], data['values'])
+        else:
+            self.athlete_ids = np.array([], dtype=str)
+            self.days = np.zeros(0, dtype=np.int64)
+            self.values = np.zeros((0, num_features))
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+    def _keys(self, athlete_ids, days) -> tuple:
+        """(athlete, day) keys sorting like the cache rows; known=False for new athletes."""
+        athletes = np.unique(self.athlete_ids)
+        index = np.minimum(np.searchsorted(athletes, athlete_ids), max(len(athletes) - 1, 0))
+        known = athletes[index] == athlete_ids if len(athletes) else np.zeros(len(days), bool)
+        return (index.astype(np.int64) << 32) + (days + 2 ** 31), known
+
+    def rows(self, athlete_ids, dates) -> np.ndarray:
+        """Cache row of each (athlete, date), -1 where it has not been explained."""
+        athlete_ids = np.asarray(athlete_ids).astype(str)
+        days = np.asarray(dates, dtype='datetime64[D]').astype(np.int64)
+        result = np.full(len(days), -1, dtype=np.int64)
+        if not len(self):
+            return result
+        cached, _ = self._keys(self.athlete_ids, self.days)
+        keys, known = self._keys(athlete_ids, days)
+        position = np.minimum(np.searchsorted(cached, keys), len(cached) - 1)
+        hit = known & (cached[position] == keys)
+        result[hit] = position[hit]
+        return result
+
+    def get(self, athlete_ids, dates) -> np.ndarray:
+        """(k, num_features) attributions; KeyError if any pair is not cached."""
+        rows = self.rows(athlete_ids, dates)
+        if np.any(rows < 0):
+            raise KeyError(f"{int(np.sum(rows < 0))} of {len(rows)} (athlete, date) pairs "
+                           f"not explained yet")
+        return self.values[rows]
+
+    def add(self, athlete_ids, dates, values):
+        """Merge new rows (replacing cached ones for the same key) and save atomically."""
+        athlete_ids = np.concatenate([self.athlete_ids, np.asarray(athlete_ids).astype(str)])
+        days = np.concatenate([self.days,
+                               np.asarray(dates, dtype='datetime64[D]').astype(np.int64)])
+        values = np.concatenate([self.values, np.asarray(values, dtype=np.float64)])
+        # Last occurrence of every key wins
+        order = np.lexsort((-np.arange(len(days)), days, athlete_ids))
+        athlete_ids, days, values = athlete_ids[order], days[order], values[order]
+        first = np.ones(len(days), dtype=bool)
+        first[1:] = (athlete_ids[1:] != athlete_ids[:-1]) | (days[1:] != days[:-1])
+        self.athlete_ids, self.days, self.values = athlete_ids[first], days[first], values[first]
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix='.tmp.npz')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, athlete_id=self.athlete_ids, day=self.days, values=self.values)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+
+def explain_rows(explainer: TreeExplainer, cache: AttributionCache, athlete_ids, dates, X,
+                 chunk_rows: int = DEFAULT_CHUNK_ROWS) -> dict:
+    """Explain the rows not in the cache yet and add them; returns counts and timing."""
+    missing = np.flatnonzero(cache.rows(athlete_ids, dates) < 0)
+    started = time.perf_counter()
+    if len(missing):
+        values = explainer.explain(np.asarray(X)[missing], chunk_rows)
+        cache.add(np.asarray(athlete_ids)[missing], np.asarray(dates)[missing], values)
+    seconds = time.perf_counter() - started
+    return {'explained': len(missing), 'cached': len(athlete_ids) - len(missing),
+            'seconds': seconds}
+
+
+def register(subparsers):
+    parser = subparsers.add_parser(
+        'explain',
+        help='Compute per-feature TSS attributions (TreeSHAP)',
+        description='Explain feature-store rows with exact TreeSHAP values, cached per '
+                    '(athlete, date, model hash)'
+    )
+    parser.add_argument('-m', '--model', default=DEFAULT_MODEL,
+                        help='XGBoost model or compiled forest (.npz with node covers)')
+    parser.add_argument('--features', default=DEFAULT_FEATURES,
+                        help='Feature names JSON')
+    parser.add_argument('--store', help='Feature store whose rows are explained')
+    parser.add_argument('--since', help='Only explain store rows on or after this date')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                        help=f'Path tables and attributions (default: {DEFAULT_CACHE_DIR})')
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS,
+                        help=f'Rows explained at once (default: {DEFAULT_CHUNK_ROWS})')
+    parser.add_argument('--show', nargs=2, metavar=('ATHLETE', 'DATE'),
+                        help='Print the cached attributions of one athlete-day')
+    parser.set_defaults(func=run)
+
+
+def run(args) -> int:
+    for path, label in ((args.model, 'Model'), (args.features, 'Features'),
+                        (args.store, 'Feature store')):
+        if path and not os.path.exists(path):
+            print(f"❌ {label} file not found: {path}")
+            return 1
+
+    print("🔍 TSS attributions")
+    print("=" * 50)
+    started = time.perf_counter()
+    try:
+        explainer, model_hash, built = load_explainer(args.model, args.cache_dir)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    print(f"🌲 Path table {'built' if built else 'loaded'} for model {model_hash[:12]}: "
+          f"{len(explainer.leaves):,} paths in {time.perf_counter() - started:.1f}s")
+    cache = AttributionCache(args.cache_dir, model_hash, explainer.num_features)
+
+    if args.store:
+        from .store import FeatureStore
+
+        store = FeatureStore(args.store)
+        rows = np.arange(store.num_rows)
+        days = store.column('date')
+        if args.since:
+            rows = rows[days >= np.datetime64(args.since, 'D').astype(np.int64)]
+        athlete_ids = store.athlete_ids[store.column('athlete')[rows]]
+        dates = days[rows].astype('datetime64[D]')
+        summary = explain_rows(explainer, cache, athlete_ids, dates,
+                               store.matrix(rows), args.chunk_rows)
+        rate = summary['explained'] / summary['seconds'] if summary['seconds'] > 0 else 0.0
+        print(f"✅ Explained {summary['explained']:,} rows in {summary['seconds']:.1f}s "
+              f"({rate:,.0f} rows/s), {summary['cached']:,} already cached")
+        print(f"🗂️  {len(cache):,} athlete-days cached in {os.path.dirname(cache.path)}")
+
+    if args.show:
+        athlete, date = args.show
+        try:
+            values = cache.get([athlete], [date])[0]
+        except KeyError:
+            print(f"❌ No attributions for athlete {athlete} on {date}")
+            return 1
+        names = load_features(args.features)
+        print(f"\n   {athlete} {date}: expected {explainer.expected_value:.1f}, "
+              f"predicted {explainer.expected_value + float(values.sum()):.1f}")
+        for i in np.argsort(-np.abs(values)).tolist():
+            print(f"   {names[i]:<28} {values[i]:+8.2f}")
+    return 0
@@ -0,0 +1,184 @@
+"""
+Vectorized feature engine mirroring extractFeatures in src/lib/mlPredictor.ts.
+
+Computes the 15 model features for every day of one or many athletes'
+daily metrics in a single O(n) pass using cumulative sums. Row i holds the
+features for predicting day i from the rows before it, i.e. the same values
+extractFeatures returns for targetDate = dates[i] when given the earlier
+entries as metrics.
+
+Like extractFeatures, the windows count entries rather than calendar days,
+so with one row per day TSS_7d is the sum over the previous 7 days.
+"""
+
+import csv
+
+import numpy as np
+
+FEATURE_NAMES = [
+    'TSS_lag1', 'TSS_3d', 'TSS_7d', 'TSS_14d', 'TSS_28d',
+    'TSS_std7', 'TSS_zero7', 'CTL_42', 'ATL_7', 'TSB',
+    'ramp_7v42', 'dow_sin', 'dow_cos', 'mon_sin', 'mon_cos',
+]
+
+# 1970-01-01 (day 0 of datetime64[D]) was a Thursday; JS getDay() counts from Sunday
+_EPOCH_WEEKDAY = 4
+
+
+def segment_starts(athlete_ids, n: int) -> np.ndarray:
+    """Index of the first row of each row's athlete (rows grouped by athlete)."""
+    if athlete_ids is None:
+        return np.zeros(n, dtype=np.int64)
+
+    athlete_ids = np.asarray(athlete_ids)
+    is_start = np.ones(n, dtype=bool)
+    is_start[1:] = athlete_ids[1:] != athlete_ids[:-1]
+    return np.maximum.accumulate(np.where(is_start, np.arange(n), 0))
+
+
+# Only 7 weekdays and 12 months exist, so the cyclical encodings are lookups
+_DOW = np.arange(7)
+_DOW_TABLE = np.stack([np.sin(2 * np.pi * _DOW / 7), np.cos(2 * np.pi * _DOW / 7)], axis=1)
+_MONTH = np.arange(1, 13)
+_MONTH_TABLE = np.stack([np.sin(2 * np.pi * _MONTH / 12), np.cos(2 * np.pi * _MONTH / 12)], axis=1)
+
+
+def cyclical_date_features(dates: np.ndarray) -> np.ndarray:
+    """dow_sin, dow_cos, mon_sin, mon_cos for datetime64[D] dates."""
+    days = dates.astype('datetime64[D]').astype(np.int64)
+    dow = (days + _EPOCH_WEEKDAY) % 7
+    month_index = dates.astype('datetime64[M]').astype(np.int64) % 12
+    return np.hstack([_DOW_TABLE[dow], _MONTH_TABLE[month_index]])
+
+
+def _shift(values: np.ndarray, j: int) -> np.ndarray:
+    """values shifted down by j rows (the first j rows are 0)."""
+    out = np.zeros_like(values)
+    out[j:] = values[:-j] if j else values
+    return out
+
+
+def compute_features(dates, tss, ctl, atl, tsb, athlete_ids=None) -> np.ndarray:
+    """
+    Compute the (N, 15) feature matrix, columns ordered as FEATURE_NAMES.
+
+    Rows must be grouped by athlete and sorted by date within each athlete.
+    Missing values (NaN) count as 0, like `m.tss || 0` in TypeScript.
+    """
+    dates = np.asarray(dates, dtype='datetime64[D]')
+    tss = np.nan_to_num(np.asarray(tss, dtype=np.float64))
+    ctl = np.nan_to_num(np.asarray(ctl, dtype=np.float64))
+    atl = np.nan_to_num(np.asarray(atl, dtype=np.float64))
+    tsb = np.nan_to_num(np.asarray(tsb, dtype=np.float64))
+    n = len(tss)
+
+    starts = segment_starts(athlete_ids, n)
+    rows = np.arange(n)
+    if n > 1 and np.any((np.diff(dates) <= np.timedelta64(0, 'D')) & (starts[1:] == starts[:-1])):
+        raise ValueError("Dates must be strictly increasing within each athlete")
+
+    history = rows - starts                 # number of earlier rows per athlete
+    has_history = history > 0
+
+    # Prefix sums with a leading zero: sum of rows [a, b) = cs[b] - cs[a]
+    cs = np.concatenate([[0.0], np.cumsum(tss)])
+    cs_zero = np.concatenate([[0], np.cumsum(tss == 0)])
+
+    def window(prefix, k):
+        return prefix[:n] - prefix[np.maximum(starts, rows - k)]
+
+    tss_3d = window(cs, 3)
+    tss_7d = window(cs, 7)
+    tss_14d = window(cs, 14)
+    tss_28d = window(cs, 28)
+    tss_42d = window(cs, 42)
+
+    # Population std over the (up to) 7 most recent entries. Two-pass over
+    # the 7 lags: prefix sums of squares lose precision on long histories.
+    count_7 = np.minimum(history, 7)
+    mean_7 = tss_7d / np.maximum(count_7, 1)
+    squares = np.zeros(n)
+    for j in range(1, 8):
+        deviation = _shift(tss, j) - mean_7
+        squares += np.where(history >= j, deviation * deviation, 0.0)
+    tss_std7 = np.sqrt(squares / np.maximum(count_7, 1))
+
+    tss_zero7 = window(cs_zero, 7)
+
+    avg_7d = tss_7d / 7
+    avg_42d = tss_42d / 42
+    ramp_7v42 = np.divide(avg_7d - avg_42d, avg_42d, out=np.zeros(n), where=avg_42d > 0)
+
+    def lag(values):
+        return np.where(has_history, _shift(values, 1), 0.0)
+
+    # Filled column by column, so build it column-major
+    features = np.empty((len(FEATURE_NAMES), n), dtype=np.float64).T
+    features[:, 0] = lag(tss)
+    features[:, 1] = tss_3d
+    features[:, 2] = tss_7d
+    features[:, 3] = tss_14d
+    features[:, 4] = tss_28d
+    features[:, 5] = tss_std7
+    features[:, 6] = tss_zero7
+    features[:, 7] = lag(ctl)
+    features[:, 8] = lag(atl)
+    features[:, 9] = lag(tsb)
+    features[:, 10] = ramp_7v42
+    features[:, 11:15] = cyclical_date_features(dates)
+    return np.ascontiguousarray(features)
+
+
+def load_daily_metrics(path: str) -> dict:
+    """
+    Load exported daily metrics from CSV.
+
+    Expected columns: date, tss, ctl, atl, tsb and optionally athlete_id.
+    Rows are sorted by (athlete_id, date).
+    """
+    with open(path, 'r', newline='') as f:
+        reader = csv.DictReader(f)
+        columns = {name: [] for name in reader.fieldnames}
+        for row in reader:
+            for name, value in row.items():
+                columns[name].append(value)
+
+    data = {
+        'dates': np.array(columns['date'], dtype='datetime64[D]'),
+        'tss': _to_float(columns['tss']),
+        'ctl': _to_float(columns['ctl']),
+        'atl': _to_float(columns['atl']),
+        'tsb': _to_float(columns['tsb']),
+        'athlete_ids': np.array(columns['athlete_id']) if 'athlete_id' in columns else None,
+    }
+
+    order = np.lexsort((data['dates'],) if data['athlete_ids'] is None
+                       else (data['dates'], data['athlete_ids']))
+    return {name: (values[order] if values is not None else None) for name, values in data.items()}
+
+
+def _to_float(values: list) -> np.ndarray:
+    return np.array([float(v) if v not in ('', None) else np.nan for v in values], dtype=np.float64)
+
+
+def register(subparsers):
+    parser = subparsers.add_parser(
+        'features',
+        help='Build the 15-feature matrix from daily metrics',
+        description='Build the model feature matrix for every day of exported daily metrics'
+    )
+    parser.add_argument('-i', '--input', required=True,
+                        help='CSV with date, tss, ctl, atl, tsb [, athlete_id]')
+    parser.add_argument('-o', '--output', required=True,
+                        help='Output .npy feature matrix (float32, N x 15)')
+    parser.set_defaults(func=run)
+
+
+def run(args) -> int:
+    print(f"📂 Loading daily metrics from {args.input}...")
+    data = load_daily_metrics(args.input)
+
+    features = compute_features(**data)
+    np.save(args.output, features.astype(np.float32))
+    print(f"✅ Feature matrix {features.shape} saved to: {args.output}")
+    return 0
@@ -0,0 +1,231 @@
+"""
+Multi-horizon autoregressive TSS forecasting.
+
+Predicts day t for every athlete at once, appends the predictions to the
+history and predicts t+1, so the rolling features move forward with the
+forecast instead of repeating the last known day.
+
+The state per athlete is the last 42 TSS entries in a ring buffer shared
+by all athletes, running window sums, the zero-day count and CTL/ATL. One
+step updates all of them in O(1) per athlete. The features it produces are
+the same as compute_features would give for the history plus the forecast
+days.
+"""
+
+import csv
+import os
+import time
+
+import numpy as np
+
+from .features import FEATURE_NAMES, cyclical_date_features, load_daily_metrics
+from .model_io import DEFAULT_OUTPUT
+from .runtime import load_predictor
+
+# Longest feature window (tss_42d for ramp_7v42)
+HISTORY_DAYS = 42
+WINDOWS = (3, 7, 14, 28, 42)
+CTL_DAYS = 42
+ATL_DAYS = 7
+DEFAULT_HORIZON = 28
+
+
+class ForecastState:
+    """Rolling feature state for many athletes, advanced one day at a time."""
+
+    def __init__(self, athlete_ids, last_dates, recent_tss, history, ctl, atl, tsb=None):
+        """
+        recent_tss is (athletes, 42): the most recent entries in date order,
+        right-aligned and zero-padded; history is the number of real entries.
+        """
+        self.athlete_ids = np.asarray(athlete_ids)
+        self.next_dates = np.asarray(last_dates, dtype='datetime64[D]') + np.timedelta64(1, 'D')
+        self.history = np.asarray(history, dtype=np.int64).copy()
+        self.ctl = np.asarray(ctl, dtype=np.float64).copy()
+        self.atl = np.asarray(atl, dtype=np.float64).copy()
+        self.tsb = self.ctl - self.atl if tsb is None else np.asarray(tsb, dtype=np.float64).copy()
+
+        # Ring buffer: column self._pos holds the oldest entry, i.e. the next
+        # one to be overwritten; entry k days back is at (pos - k) % 42
+        self._buffer = np.array(recent_tss, dtype=np.float64)
+        self._pos = 0
+        self._sums = {k: self._buffer[:, -k:].sum(axis=1) for k in WINDOWS}
+        self._zero7 = np.sum((self._buffer[:, -7:] == 0) & self._real(7), axis=1)
+
+    @property
+    def num_athletes(self) -> int:
+        return len(self.athlete_ids)
+
+    def _real(self, k: int) -> np.ndarray:
+        """(athletes, k) mask of the last k buffer slots that hold real entries (oldest first)."""
+        return np.arange(k, 0, -1) <= self.history[:, None]
+
+    def _recent(self, k: int) -> np.ndarray:
+        """The last k entries (oldest first) as (athletes, k)."""
+        return self._buffer[:, (self._pos - np.arange(k, 0, -1)) % HISTORY_DAYS]
+
+    @classmethod
+    def from_daily_metrics(cls, dates, tss, ctl, atl, tsb=None, athlete_ids=None) -> 'ForecastState':
+        """State after the last day of each athlete's history (rows grouped by athlete, sorted by date)."""
+        tss = np.nan_to_num(np.asarray(tss, dtype=np.float64))
+        n = len(tss)
+        if athlete_ids is None:
+            athlete_ids = np.zeros(n, dtype=np.int64)
+        athlete_ids = np.asarray(athlete_ids)
+
+        is_last = np.ones(n, dtype=bool)
+        is_last[:-1] = athlete_ids[1:] != athlete_ids[:-1]
+        last = np.flatnonzero(is_last)
+        first = np.concatenate([[0], last[:-1] + 1])
+
+        # Right-aligned window of the last 42 rows of every athlete
+        offsets = np.arange(-HISTORY_DAYS + 1, 1)
+        rows = last[:, None] + offsets
+        valid = rows >= first[:, None]
+        recent = np.where(valid, tss[np.clip(rows, 0, None)], 0.0)
+
+        return cls(
+            athlete_ids=athlete_ids[last],
+            last_dates=np.asarray(dates, dtype='datetime64[D]')[last],
+            recent_tss=recent,
+            history=last - first + 1,
+            ctl=np.nan_to_num(np.asarray(ctl, dtype=np.float64))[last],
+            atl=np.nan_to_num(np.asarray(atl, dtype=np.float64))[last],
+            tsb=None if tsb is None else np.nan_to_num(np.asarray(tsb, dtype=np.float64))[last],
+        )
+
+    def features(self) -> np.ndarray:
+        """(athletes, 15) features for predicting self.next_dates."""
+        has_history = self.history > 0
+        count_7 = np.minimum(self.history, 7)
+        mean_7 = self._sums[7] / np.maximum(count_7, 1)
+        deviation = np.where(self._real(7), self._recent(7) - mean_7[:, None], 0.0)
+        std_7 = np.sqrt(np.sum(deviation * deviation, axis=1) / np.maximum(count_7, 1))
+
+        avg_7d = self._sums[7] / 7
+        avg_42d = self._sums[42] / 42
+        ramp = np.divide(avg_7d - avg_42d, avg_42d, out=np.zeros(self.num_athletes),
+                         where=avg_42d > 0)
+
+        features = np.empty((len(FEATURE_NAMES), self.num_athletes)).T
+        features[:, 0] = np.where(has_history, self._buffer[:, (self._pos - 1) % HISTORY_DAYS], 0.0)
+        features[:, 1] = self._sums[3]
+        features[:, 2] = self._sums[7]
+        features[:, 3] = self._sums[14]
+        features[:, 4] = self._sums[28]
+        features[:, 5] = std_7
+        features[:, 6] = self._zero7
+        features[:, 7] = np.where(has_history, self.ctl, 0.0)
+        features[:, 8] = np.where(has_history, self.atl, 0.0)
+        features[:, 9] = np.where(has_history, self.tsb, 0.0)
+        features[:, 10] = ramp
+        features[:, 11:15] = cyclical_date_features(self.next_dates)
+        return np.ascontiguousarray(features)
+
+    def append(self, tss: np.ndarray):
+        """Record tss for self.next_dates and move to the following day."""
+        tss = np.asarray(tss, dtype=np.float64)
+        for k in WINDOWS:
+            # The entry k days back leaves the window (padding slots hold 0)
+            self._sums[k] += tss - self._buffer[:, (self._pos - k) % HISTORY_DAYS]
+        leaving = self._buffer[:, (self._pos - 7) % HISTORY_DAYS]
+        self._zero7 += (tss == 0).astype(np.int64) - ((leaving == 0) & (self.history >= 7))
+
+        self._buffer[:, self._pos] = tss
+        self._pos = (self._pos + 1) % HISTORY_DAYS
+        self.history += 1
+
+        self.ctl += 2 / (CTL_DAYS + 1) * (tss - self.ctl)
+        self.atl += 2 / (ATL_DAYS + 1) * (tss - self.atl)
+        self.tsb = self.ctl - self.atl
+        self.next_dates = self.next_dates + np.timedelta64(1, 'D')
+
+
+def forecast(predict, state: ForecastState, horizon: int) -> dict:
+    """
+    Roll the state forward `horizon` days, feeding each day's prediction
+    back as that day's TSS. Negative predictions are clipped to 0 like in
+    the app. Returns (athletes, horizon) arrays.
+    """
+    shape = (state.num_athletes, horizon)
+    result = {
+        'athlete_ids': state.athlete_ids,
+        'dates': np.empty(shape, dtype='datetime64[D]'),
+        'tss': np.empty(shape),
+        'ctl': np.empty(shape),
+        'atl': np.empty(shape),
+    }
+    for day in range(horizon):
+        result['dates'][:, day] = state.next_dates
+        tss = np.maximum(0.0, predict(state.features().astype(np.float32)).astype(np.float64))
+        state.append(tss)
+        result['tss'][:, day] = tss
+        result['ctl'][:, day] = state.ctl
+        result['atl'][:, day] = state.atl
+    result['tsb'] = result['ctl'] - result['atl']
+    return result
+
+
+def write_forecast(path: str, result: dict):
+    """Write the forecast as one row per (athlete, day) to .csv or .parquet."""
+    n, horizon = result['tss'].shape
+    columns = {
+        'athlete_id': np.repeat(result['athlete_ids'], horizon),
+        'date': result['dates'].ravel(),
+        'predicted_tss': result['tss'].ravel(),
+        'ctl': result['ctl'].ravel(),
+        'atl': result['atl'].ravel(),
+        'tsb': result['tsb'].ravel(),
+    }
+
+    if path.endswith('.parquet'):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        pq.write_table(pa.table(columns), path)
+        return
+
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(list(columns))
+        for row in zip(columns['athlete_id'], columns['date'].astype(str),
+                       *(np.round(columns[name], 1) for name in ('predicted_tss', 'ctl', 'atl', 'tsb'))):
+            writer.writerow(row)
+
+
+def register(subparsers):
+    parser = subparsers.add_parser(
+        'forecast',
+        help='Forecast daily TSS, CTL, ATL and TSB for many athletes',
+        description='Autoregressive multi-day forecast: each predicted day is appended '
+                    'to the history before predicting the next'
+    )
+    parser.add_argument('-i', '--input', required=True,
+                        help='CSV with date, tss, ctl, atl, tsb [, athlete_id]')
+    parser.add_argument('-o', '--output', required=True,
+                        help='Forecast output (.csv or .parquet)')
+    parser.add_argument('-m', '--model', default=DEFAULT_OUTPUT,
+                        help='ONNX model, or .bst/.json/.npz for the NumPy forest')
+    parser.add_argument('--horizon', type=int, default=DEFAULT_HORIZON,
+                        help=f'Days to forecast after each athlete\'s last entry '
+                             f'(default: {DEFAULT_HORIZON})')
+    parser.set_defaults(func=run)
+
+
+def run(args) -> int:
+    for path, label in ((args.model, 'Model'), (args.input, 'Input')):
+        if not os.path.exists(path):
+            print(f"❌ {label} file not found: {path}")
+            return 1
+
+    print(f"📂 Loading daily metrics from {args.input}...")
+    state = ForecastState.from_daily_metrics(**load_daily_metrics(args.input))
+
+    print(f"🔮 Forecasting {args.horizon} days for {state.num_athletes} athlete(s)...")
+    started = time.perf_counter()
+    result = forecast(load_predictor(args.model), state, args.horizon)
+    elapsed = time.perf_counter() - started
+
+    write_forecast(args.output, result)
+    print(f"✅ {result['tss'].size} forecast days written to {args.output} in {elapsed:.2f}s")
+    return 0
@@ -0,0 +1,228 @@
+"""
+Pure-NumPy evaluator for the XGBoost TSS forest.
+
+The trees of an XGBoost JSON model are flattened into contiguous arrays
+(feature index, threshold, left/right child, default direction, leaf value)
+and a whole feature matrix is evaluated level by level: at each depth every
+(row, tree) pair advances one node with vectorized gathers. Leaves point to
+themselves so rows that reach a leaf early simply stay there.
+
+Only NumPy is needed at prediction time. Loading the pickled .bst requires
+xgboost once; the compiled arrays can be saved to .npz and reloaded without it.
+"""
+
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from .model_io import booster_config, load_model, parse_base_score
+
+# Rows evaluated at once; small chunks keep the (rows, trees) index
+# matrices cache resident, which is faster than fewer, larger chunks
+DEFAULT_CHUNK_SIZE = 256
+
+
+class TreeEnsemble:
+    """Flattened gradient-boosted regression forest."""
+
+    def __init__(self, feature, threshold, left, right, default_left, value,
+                 roots, max_depth, base_score, num_features, cover=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.default_left = default_left
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.base_score = float(base_score)
+        self.num_features = int(num_features)
+        # Training hessian sum per node; only needed for attributions (explain.py)
+        self.cover = cover
+        # Interleaved [left, right] table: child = children[2 * node + go_right]
+        self._children = np.stack([left, right], axis=1).ravel()
+
+    @property
+    def num_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.feature)
+
+    @classmethod
+    def from_model_json(cls, doc: dict) -> 'TreeEnsemble':
+        """Compile an XGBoost JSON model document (Booster.save_model output)."""
+        learner = doc['learner']
+        booster = learner['gradient_booster']
+        if booster['name'] != 'gbtree':
+            raise ValueError(f"Unsupported booster type: {booster['name']}")
+
+        trees = booster['model']['trees']
+        sizes = [len(tree['left_children']) for tree in trees]
+        offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int32)
+
+        left = np.concatenate([tree['left_children'] for tree in trees]).astype(np.int32)
+        right = np.concatenate([tree['right_children'] for tree in trees]).astype(np.int32)
+        feature = np.concatenate([tree['split_indices'] for tree in trees]).astype(np.int32)
+        threshold = np.concatenate([tree['split_conditions'] for tree in trees]).astype(np.float32)
+        default_left = np.concatenate([tree['default_left'] for tree in trees]).astype(bool)
+        cover = None
+        if all('sum_hessian' in tree for tree in trees):
+            cover = np.concatenate([tree['sum_hessian'] for tree in trees]).astype(np.float64)
+
+        # Child ids are local to each tree; shift them to global node ids
+        node_offsets = np.repeat(offsets, sizes)
+        is_leaf = left == -1
+        self_ids = np.arange(len(left), dtype=np.int32)
+        left = np.where(is_leaf, self_ids, left + node_offsets)
+        right = np.where(is_leaf, self_ids, right + node_offsets)
+
+        # Leaves store their value in split_conditions
+        value = np.where(is_leaf, threshold, 0.0).astype(np.float32)
+        feature = np.where(is_leaf, 0, feature)
+
+        max_depth = max(_tree_depth(tree['left_children'], tree['right_children']) for tree in trees)
+
+        params = learner['learner_model_param']
+        return cls(
+            feature=feature,
+            threshold=threshold,
+            left=left,
+            right=right,
+            default_left=default_left,
+            value=value,
+            roots=offsets,
+            max_depth=max_depth,
+            base_score=parse_base_score(params['base_score']),
+            num_features=int(params['num_feature']),
+            cover=cover,
+        )
+
+    def leaf_indices(self, X: np.ndarray) -> np.ndarray:
+        """Return the global leaf node reached by every (row, tree) pair."""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_rows = X.shape[0]
+        nodes = np.broadcast_to(self.roots, (n_rows, self.num_trees)).copy()
+        # Offsets into the flattened matrix: X.ravel()[row_base + feature]
+        row_base = (np.arange(n_rows, dtype=np.int32) * X.shape[1])[:, None]
+        flat = X.ravel()
+        has_missing = np.isnan(flat).any()
+
+        for _ in range(self.max_depth):
+            x = flat[row_base + self.feature[nodes]]
+            go_right = x >= self.threshold[nodes]
+            if has_missing:
+                go_right = np.where(np.isnan(x), ~self.default_left[nodes], go_right)
+            nodes = self._children[2 * nodes + go_right]
+
+        return nodes
+
+    def predict(self, X: np.ndarray, chunk_size: int = DEFAULT_CHUNK_SIZE) -> np.ndarray:
+        """Predict TSS for a (N, num_features) matrix, returns float32 (N,)."""
+        X = np.asarray(X)
+        if X.ndim != 2 or X.shape[1] != self.num_features:
+            raise ValueError(f"Expected shape (N, {self.num_features}), got {X.shape}")
+
+        out = np.empty(X.shape[0], dtype=np.float32)
+        for start in range(0, X.shape[0], chunk_size):
+            stop = start + chunk_size
+            leaves = self.leaf_indices(X[start:stop])
+            # Sequential float32 accumulation in tree order, then base_score:
+            # reproduces onnxruntime's TreeEnsembleRegressor bit for bit
+            tree_sum = np.cumsum(self.value[leaves], axis=1, dtype=np.float32)[:, -1]
+            out[start:stop] = tree_sum + np.float32(self.base_score)
+        return out
+
+    def save(self, path: str):
+        """Save the compiled arrays as .npz."""
+        extra = {} if self.cover is None else {'cover': self.cover}
+        np.savez(
+            path,
+            feature=self.feature,
+            threshold=self.threshold,
+            left=self.left,
+            right=self.right,
+            default_left=self.default_left,
+            value=self.value,
+            roots=self.roots,
+            scalars=np.array([self.max_depth, self.base_score, self.num_features], dtype=np.float64),
+            **extra,
+        )
+
+
+def _tree_depth(left_children: list, right_children: list) -> int:
+    """Number of splits on the longest root-to-leaf path."""
+    depth = 0
+    level = [0]
+    while True:
+        level = [child for node in level
+                 for child in (left_children[node], right_children[node]) if child != -1]
+        if not level:
+            return depth
+        depth += 1
+
+
+def load_forest(path: str) -> TreeEnsemble:
+    """
+    Load a forest from a compiled .npz, an XGBoost JSON model or a
+    pickled/native XGBoost model (the latter requires xgboost).
+    """
+    if path.endswith('.npz'):
+        with np.load(path) as data:
+            max_depth, base_score, num_features = data['scalars']
+            return TreeEnsemble(
+                feature=data['feature'],
+                threshold=data['threshold'],
+                left=data['left'],
+                right=data['right'],
+                default_left=data['default_left'],
+                value=data['value'],
+                roots=data['roots'],
+                max_depth=max_depth,
+                base_score=base_score,
+                num_features=num_features,
+                cover=data['cover'] if 'cover' in data.files else None,
+            )
+
+    if path.endswith('.json'):
+        with open(path, 'r') as f:
+            return TreeEnsemble.from_model_json(json.load(f))
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        return TreeEnsemble.from_model_json(booster_config(load_model(path), work_dir))
+
+
+def register(subparsers):
+    parser = subparsers.add_parser(
+        'forest',
+        help='Compile the model into a NumPy tree evaluator',
+        description='Compile the XGBoost model into flat arrays (.npz) for NumPy-only inference'
+    )
+    parser.add_argument('-i', '--input', default='model_tss_predictor.bst',
+                        help='Pickled/native XGBoost model or XGBoost JSON model')
+    parser.add_argument('-o', '--output', default='tss-predictor-v1.npz',
+                        help='Output path for the compiled forest')
+    parser.add_argument('--check-onnx', metavar='ONNX',
+                        help='Compare predictions against this ONNX model')
+    parser.set_defaults(func=run)
+
+
+def run(args) -> int:
+    if not os.path.exists(args.input):
+        print(f"❌ Model file not found: {args.input}")
+        return 1
+
+    print(f"🌲 Compiling forest from {args.input}...")
+    forest = load_forest(args.input)
+    forest.save(args.output)
+    print(f"✅ Compiled {forest.num_trees} trees, {forest.num_nodes} nodes, "
+          f"depth {forest.max_depth} → {args.output}")
+
+    if args.check_onnx:
+        from .convert import validate_onnx_model
+        if not validate_onnx_model(args.check_onnx, forest.num_features, reference=forest.predict):
+            return 1
+    return 0
@@ -0,0 +1,373 @@
+"""
+Bulk TSS ingest of raw activity exports (Strava / Firestore, JSONL).
+
+The export is read in chunks of lines. For each chunk, TSS is computed for
+whole columns, following calculateTSS in src/lib/fitnessMetrics.ts. Each
+activity uses the first method whose inputs are present:
+
+    power          weighted_average_watts (NP) and FTP   hours * (NP / FTP)^2 * 100
+    average_power  average_watts and FTP                 hours * (AP / FTP)^2 * 100
+    hrss           average_heartrate and LTHR            hours * (HR / LTHR)^2 * 100
+    estimate       anything else                         hours * 100 * 0.75
+
+The methods are chosen with masks, not per-row branches. FTP and LTHR come
+from the activity itself, else from a per-athlete profile, else from the
+defaults.
+
+Activities are summed into a daily table (athlete_id, date, tss,
+activities, moving_time_s and a count per method), saved atomically as one
+.npz together with the checkpoint:
+- the byte offset read so far;
+- a hash of the export up to that offset;
+- the ids of the ingested activities (a hash of the line for activities
+  without one).
+Lines that are not valid activities are skipped and counted.
+If the export has only grown since the last run, the run reads from the
+stored offset. Otherwise it re-reads the whole file and skips activities
+it already has.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+DEFAULT_TABLE = 'daily-tss.npz'
+DEFAULT_CHUNK_ROWS = 50_000
+METHODS = ('power', 'average_power', 'hrss', 'estimate')
+ESTIMATED_IF = 0.75
+MAX_REPORTED_OFFSETS = 5
+
+# Accepted spellings per field (Strava API names first)
+FIELDS = {
+    'id': ('id', 'activity_id', 'activityId'),
+    'athlete_id': ('athlete_id', 'athleteId', 'userId', 'athlete'),
+    'date': ('start_date_local', 'start_date', 'date'),
+    'moving_time_s': ('moving_time', 'movingTimeSeconds', 'duration_s'),
+    'normalized_power': ('weighted_average_watts', 'normalized_power', 'normalizedPower'),
+    'average_power': ('average_watts', 'averagePower'),
+    'average_hr': ('average_heartrate', 'averageHeartRate', 'avgHeartRate'),
+    'ftp': ('ftp',),
+    'lthr': ('lthr',),
+}
+NUMERIC_FIELDS = ('moving_time_s', 'normalized_power', 'average_power', 'average_hr', 'ftp', 'lthr')
+
+
+def _field(activity: dict, names: tuple):
+    for name in names:
+        value = activity.get(name)
+        if value is not None:
+            # Strava nests the athlete as {"id": ...}
+            return value.get('id') if isinstance(value, dict) else value
+    return None
+
+
+def _fallback_id(line: bytes) -> str:
+    # Same line, same id: an export re-read from byte 0 does not count it twice
+    return 'sha256:' + hashlib.sha256(line.strip()).hexdigest()[:32]
+
+
+def parse_lines(lines: list) -> tuple:
+    """
+    Columns of one chunk of JSONL lines (missing numbers are NaN) and the
+    indexes of the lines left out because they are not a JSON object with a
+    valid date and numeric values. Lines without an id get one from a hash
+    of the line.
+    """
+    rows, invalid = [], []
+    for index, line in enumerate(lines):
+        try:
+            record = json.loads(line)
+            row = {name: _field(record, names) for name, names in FIELDS.items()}
+            for name in NUMERIC_FIELDS:
+                row[name] = np.nan if row[name] is None else float(row[name])
+            row['date'] = np.datetime64(str(row['date'])[:10], 'D')
+            if np.isnat(row['date']):
+                raise ValueError('no date')
+        except (ValueError, TypeError, AttributeError):
+            invalid.append(index)
+            continue
+        row['id'] = _fallback_id(line) if row['id'] is None else str(row['id'])
+        row['athlete_id'] = '' if row['athlete_id'] is None else str(row['athlete_id'])
+        rows.append(row)
+
+    parsed = {name: np.array([row[name] for row in rows], dtype=np.float64)
+              for name in NUMERIC_FIELDS}
+    for name in ('id', 'athlete_id'):
+        parsed[name] = np.array([row[name] for row in rows], dtype=str)
+    parsed['date'] = np.array([row['date'] for row in rows], dtype='datetime64[D]')
+    return parsed, invalid
+
+
+def compute_tss(moving_time_s, normalized_power, average_power, average_hr, ftp, lthr) -> tuple:
+    """Vectorized calculateTSS; returns (tss, method index into METHODS)."""
+    def present(values):
+        # JavaScript truthiness: missing, NaN and 0 all fall through
+        values = np.asarray(values, dtype=np.float64)
+        return ~np.isnan(values) & (values != 0)
+
+    ftp = np.asarray(ftp, dtype=np.float64)
+    lthr = np.asarray(lthr, dtype=np.float64)
+    has_ftp = present(ftp) & (np.nan_to_num(ftp) > 0)
+    has_lthr = present(lthr) & (np.nan_to_num(lthr) > 0)
+    masks = [present(normalized_power) & has_ftp, present(average_power) & has_ftp,
+             present(average_hr) & has_lthr]
+    method = np.select(masks, [0, 1, 2], default=3)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.select(masks, [np.asarray(normalized_power) / ftp,
+                                  np.asarray(average_power) / ftp,
+                                  np.asarray(average_hr) / lthr], default=0.0)
+    hours = np.nan_to_num(np.asarray(moving_time_s, dtype=np.float64)) / 3600
+    tss = np.where(method == 3, hours * 100 * ESTIMATED_IF, hours * ratio ** 2 * 100)
+    return tss, method
+
+
+def fill_thresholds(chunk: dict, profiles: dict = None, default_ftp: float = None,
+                    default_lthr: float = None):
+    """Fill missing ftp/lthr from the athlete profile, then from the defaults (in place)."""
+    profiles = profiles or {}
+    athletes, index = np.unique(chunk['athlete_id'], return_inverse=True)
+    for name, default in (('ftp', default_ftp), ('lthr', default_lthr)):
+        per_athlete = np.array([profiles.get(athlete, {}).get(name) or default or np.nan
+                                for athlete in athletes.tolist()], dtype=np.float64)
+        values = chunk[name]
+        missing = np.isnan(values)
+        values[missing] = per_athlete[index][missing]
+
+
+def resume_offset(path: str, checkpoint: dict) -> int:
+    """
+    Byte offset to continue from: the checkpoint's if it was taken on this
+    file and the file still starts with the bytes it hashed, else 0.
+    """
+    offset = checkpoint.get('offset', 0)
+    if checkpoint.get('source') != path or offset > os.path.getsize(path):
+        return 0
+    return offset if prefix_sha256(path, offset) == checkpoint.get('prefix_sha256') else 0
+
+
+def iter_lines(path: str, offset: int = 0, chunk_rows: int = DEFAULT_CHUNK_ROWS):
+    """
+    Yield (lines, their start offsets, end_offset) chunks from offset on. A
+    last line without a newline (export still being written) is left for the
+    next run.
+    """
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        lines, starts = [], []
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            if line.strip():
+                lines.append(line)
+                starts.append(offset)
+            offset += len(line)
+            if len(lines) == chunk_rows:
+                yield lines, starts, offset
+                lines, starts = [], []
+        yield lines, starts, offset
+
+
+def prefix_sha256(path: str, length: int) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        remaining = length
+        while remaining > 0:
+            block = f.read(min(remaining, 1 << 20))
+            if not block:
+                break
+            digest.update(block)
+            remaining -= len(block)
+    return digest.hexdigest()
+
+
+def aggregate_daily(athlete_ids, dates, tss, moving_time_s, method_counts, activities) -> dict:
+    """Sum rows with the same (athlete, date); sorted by athlete, then date."""
+    athletes, athlete_index = np.unique(athlete_ids, return_inverse=True)
+    days = np.asarray(dates, dtype='datetime64[D]').astype(np.int64)
+    keys = athlete_index.astype(np.int64) * (1 << 32) + (days - days.min() if len(days) else days)
+    unique_keys, first, group = np.unique(keys, return_index=True, return_inverse=True)
+
+    def sums(values):
+        return np.bincount(group, weights=values, minlength=len(unique_keys))
+
+    return {
+        'athlete_id': athletes[athlete_index[first]],
+        'date': np.asarray(dates, dtype='datetime64[D]')[first],
+        'tss': sums(tss),
+        'moving_time_s': sums(moving_time_s),
+        'activities': sums(activities).astype(np.int32),
+        'methods': np.stack([sums(method_counts[:, i]) for i in range(len(METHODS))],
+                            axis=1).astype(np.int32),
+    }
+
+
+def load_table(path: str) -> tuple:
+    """(daily table, checkpoint); empty ones if path does not exist."""
+    if not os.path.exists(path):
+        empty = {'athlete_id': np.array([], dtype=str), 'date': np.array([], 'datetime64[D]'),
+                 'tss': np.zeros(0), 'moving_time_s': np.zeros(0),
+                 'activities': np.zeros(0, np.int32),
+                 'methods': np.zeros((0, len(METHODS)), np.int32)}
+        return empty, {'ids': np.array([], dtype=str)}
+    with np.load(path) as data:
+        table = {name: data[name] for name in ('athlete_id', 'tss', 'moving_time_s',
+                                                 'activities', 'methods')}
+        table['date'] = data['date'].astype('datetime64[D]')
+        checkpoint = json.loads(str(data['checkpoint']))
+        checkpoint['ids'] = data['ids']
+    return table, checkpoint
+
+
+def save_table(path: str, table: dict, checkpoint: dict):
+    """Table and checkpoint in one .npz, replaced atomically."""
+    meta = {key: value for key, value in checkpoint.items() if key != 'ids'}
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                                     suffix='.tmp.npz')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, ids=checkpoint['ids'], checkpoint=np.array(json.dumps(meta)),
+                     methods_names=np.array(METHODS), **table)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def ingest(path: str, table_path: str = DEFAULT_TABLE, profiles: dict = None,
+           default_ftp: float = None, default_lthr: float = None,
+           chunk_rows: int = DEFAULT_CHUNK_ROWS) -> dict:
+    """
+    Add the activities of the export at path that are not in the table yet.
+    Returns a summary (new activities, skipped duplicates, invalid lines with
+    the byte offsets of the first few, days, methods).
+    """
+    table, checkpoint = load_table(table_path)
+    # Set lookups keep the duplicate check per chunk independent of the history size
+    seen = set(checkpoint['ids'].tolist())
+    new_ids = []
+    resumed_from = resume_offset(path, checkpoint)
+
+    new_rows, duplicates, invalid, offset = [], 0, [], resumed_from
+    for lines, starts, offset in iter_lines(path, resumed_from, chunk_rows):
+        if not lines:
+            continue
+        chunk, bad = parse_lines(lines)
+        invalid.extend(starts[index] for index in bad)
+        ids = chunk['id']
+        # First occurrence of every id not ingested before
+        keep = np.zeros(len(ids), dtype=bool)
+        keep[np.unique(ids, return_index=True)[1]] = True
+        keep &= np.fromiter((i not in seen for i in ids.tolist()), dtype=bool, count=len(ids))
+        duplicates += int((~keep).sum())
+        chunk = {name: values[keep] for name, values in chunk.items()}
+        if not len(chunk['id']):
+            continue
+        new_ids.append(chunk['id'])
+        seen.update(new_ids[-1].tolist())
+
+        fill_thresholds(chunk, profiles, default_ftp, default_lthr)
+        tss, method = compute_tss(chunk['moving_time_s'], chunk['normalized_power'],
+                                  chunk['average_power'], chunk['average_hr'],
+                                  chunk['ftp'], chunk['lthr'])
+        new_rows.append((chunk['athlete_id'], chunk['date'], tss,
+                         np.nan_to_num(chunk['moving_time_s']), method))
+
+    if new_rows:
+        athletes, dates, tss, moving, method = (np.concatenate(parts) for parts in zip(*new_rows))
+        count = len(tss)
+        method_counts = np.zeros((count, len(METHODS)))
+        method_counts[np.arange(count), method] = 1
+        table = aggregate_daily(
+            np.concatenate([table['athlete_id'], athletes]),
+            np.concatenate([table['date'], dates]),
+            np.concatenate([table['tss'], tss]),
+            np.concatenate([table['moving_time_s'], moving]),
+            np.concatenate([table['methods'], method_counts]),
+            np.concatenate([table['activities'], np.ones(count)]),
+        )
+        methods = dict(zip(METHODS, np.bincount(method, minlength=len(METHODS)).tolist()))
+    else:
+        count, methods = 0, dict.fromkeys(METHODS, 0)
+
+    save_table(table_path, table, {
+        'ids': np.concatenate([checkpoint['ids'], *new_ids]),
+        'source': path,
+        'offset': offset,
+        'prefix_sha256': prefix_sha256(path, offset),
+    })
+    return {'activities': count, 'duplicates': duplicates, 'resumed_from': resumed_from,
+            'invalid': len(invalid), 'invalid_offsets': invalid[:MAX_REPORTED_OFFSETS],
+            'days': len(table['tss']), 'athletes': len(np.unique(table['athlete_id'])),
+            'methods': methods}
+
+
+def write_csv(path: str, table: dict):
+    """Daily TSS in the activities CSV layout backfill reads (athlete_id, date, tss)."""
+    import csv
+
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['athlete_id', 'date', 'tss'])
+        writer.writerows(zip(table['athlete_id'].tolist(), table['date'].astype(str).tolist(),
+                             np.round(table['tss'], 1).tolist()))
+
+
+def register(subparsers):
+    parser = subparsers.add_parser(
+        'ingest',
+        help='Compute TSS for an activity export into a daily table',
+        description='Stream a JSONL activity export in chunks, compute TSS with vectorized '
+                    'method masks and add new activities to a daily TSS table'
+    )
+    parser.add_argument('-i', '--input', required=True, help='Activities JSONL')
+    parser.add_argument('-o', '--output', default=DEFAULT_TABLE,
+                        help=f'Daily TSS table with checkpoint (default: {DEFAULT_TABLE})')
+    parser.add_argument('--profiles',
+                        help='JSON {athlete_id: {"ftp": W, "lthr": bpm}} for activities without '
+                             'their own values')
+    parser.add_argument('--ftp', type=float, help='FTP when neither activity nor profile has one')
+    parser.add_argument('--lthr', type=float,
+                        help='LTHR when neither activity nor profile has one')
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS,
+                        help=f'Lines per chunk (default: {DEFAULT_CHUNK_ROWS:,})')
+    parser.add_argument('--csv', help='Also write the table as CSV (athlete_id, date, tss)')
+    parser.set_defaults(func=run)
+
+
+def run(args) -> int:
+    for path, label in ((args.input, 'Activities'), (args.profiles, 'Profiles')):
+        if path and not os.path.exists(path):
+            print(f"❌ {label} file not found: {path}")
+            return 1
+
+    profiles = None
+    if args.profiles:
+        with open(args.profiles, 'r') as f:
+            profiles = {str(athlete): values for athlete, values in json.load(f).items()}
+
+    print(f"📂 Ingesting {args.input}...")
+    try:
+        summary = ingest(args.input, args.output, profiles, args.ftp, args.lthr, args.chunk_rows)
+    except (ValueError, json.JSONDecodeError) as e:
+        print(f"❌ {e}")
+        return 1
+
+    if summary['resumed_from']:
+        print(f"♻️  Resumed at byte {summary['resumed_from']:,}")
+    methods = ', '.join(f'{name} {count}' for name, count in summary['methods'].items())
+    print(f"✅ {summary['activities']} new activities ({methods}), "
+          f"{summary['duplicates']} already ingested")
+    if summary['invalid']:
+        offsets = ', '.join(f'{offset:,}' for offset in summary['invalid_offsets'])
+        more = ', ...' if summary['invalid'] > len(summary['invalid_offsets']) else ''
+        print(f"⚠️  Skipped {summary['invalid']} invalid line(s) at byte {offsets}{more}")
+    print(f"📅 {summary['days']:,} athlete-days for {summary['athletes']} athlete(s) "
+          f"in {args.output}")
+    if args.csv:
+        write_csv(args.csv, load_table(args.output)[0])
+        print(f"📋 CSV saved to: {args.csv}")
+    return 0
@@ -0,0 +1,403 @@
+"""
+Compile the workout library into one indexed artifact.
+
+The library is spread over workouts/index.json, the per-category files it
+lists, and CYCLONA_INTERVALS_LIBRARY.json. These use two spellings of the
+segment keys (intensity vs intensity_ftp, ...). The compiler normalizes
+every workout once and precomputes its duration, TSS, IF and time per
+power zone. It then writes one JSON artifact with lookup indexes:
+
+    columns     id, name, category, duration_s, tss, if, zone_s, ... (one entry per row)
+    segments    normalized structure per row
+    indexes     category -> rows, durationBucket -> rows, all -> rows;
+                every index is sorted by TSS, so a TSS range is two bisections
+
+TSS follows calculatePlannedTSS in src/lib/tssCalculator.ts:
+sum(duration_h * intensity^2) * 100, without rounding each segment.
+Sprints without an intensity ("max effort") count as SPRINT_INTENSITY.
+Every assumed value appears in the validation report.
+"""
+
+import bisect
+import hashlib
+import json
+import math
+import os
+
+from .cache import _atomic_write
+
+SCHEMA_VERSION = 1
+DEFAULT_WORKOUTS_DIR = os.path.join('..', 'workouts')
+DEFAULT_INTERVALS_LIBRARY = os.path.join('..', 'CYCLONA_INTERVALS_LIBRARY.json')
+DEFAULT_OUTPUT = 'workout-library.json'
+
+# Upper bounds of power zones Z1..Z6 as fractions of FTP (Z7 is everything above)
+ZONE_BOUNDS = (0.55, 0.75, 0.90, 1.05, 1.20, 1.50)
+ZONES = tuple(f'Z{i}' for i in range(1, len(ZONE_BOUNDS) + 2))
+DURATION_BUCKET_MIN = 15
+SPRINT_INTENSITY = 2.0
+DEFAULT_REST_INTENSITY = 0.5
+
+# Deviations from the declared values reported as warnings
+DURATION_TOLERANCE_S = 120
+TSS_TOLERANCE = 0.2
+
+STEADY_TYPES = ('warmup', 'steady', 'cooldown', 'rest')
+REPEAT_TYPES = ('intervals', 'interval', 'sprints')
+
+
+def _first(segment: dict, *keys):
+    for key in keys:
+        if segment.get(key) is not None:
+            return segment[key]
+    return None
+
+
+def normalize_segment(segment: dict) -> tuple:
+    """One source segment in the compiled form; returns (segment, assumptions)."""
+    kind = segment.get('type')
+    text = _first(segment, 'description', 'name', 'notes')
+    cadence = _first(segment, 'cadence_rpm', 'cadence')
+    assumed = []
+
+    if kind in STEADY_TYPES:
+        duration = segment.get('duration_s')
+        intensity = _first(segment, 'intensity_ftp', 'intensity')
+        if not duration or duration <= 0 or intensity is None:
+            raise ValueError(f"'{kind}' segment needs duration_s > 0 and an intensity")
+        normalized = {'type': kind, 'duration_s': duration, 'intensity': intensity}
+    elif kind in REPEAT_TYPES:
+        work_s, rest_s = segment.get('work_s'), segment.get('rest_s', 0)
+        if not work_s or work_s <= 0 or rest_s < 0:
+            raise ValueError(f"'{kind}' segment needs work_s > 0")
+        work = _first(segment, 'work_intensity_ftp', 'work_intensity', 'intensity_ftp')
+        rest = _first(segment, 'rest_intensity_ftp', 'rest_intensity')
+        if work is None:
+            if kind != 'sprints':
+                raise ValueError(f"'{kind}' segment has no work intensity")
+            work = SPRINT_INTENSITY
+            assumed.append(f'sprint intensity {SPRINT_INTENSITY}')
+        if rest is None and rest_s:
+            rest = DEFAULT_REST_INTENSITY
+            assumed.append(f'rest intensity {DEFAULT_REST_INTENSITY}')
+        normalized = {'type': kind, 'repeats': segment.get('repeats', 1), 'work_s': work_s,
+                      'work_intensity': work, 'rest_s': rest_s,
+                      'rest_intensity': rest if rest_s else None}
+    else:
+        raise ValueError(f"unknown segment type '{kind}'")
+
+    if text:
+        normalized['text'] = text
+    if cadence:
+        normalized['cadence'] = cadence
+    return normalized, assumed
+
+
+def expand(segments: list) -> list:
+    """(duration_s, intensity) steps, intervals unrolled."""
+    steps = []
+    for segment in segments:
+        if 'duration_s' in segment:
+            steps.append((segment['duration_s'], segment['intensity']))
+            continue
+        for _ in range(segment['repeats']):
+            steps.append((segment['work_s'], segment['work_intensity']))
+            if segment['rest_s']:
+                steps.append((segment['rest_s'], segment['rest_intensity']))
+    return steps
+
+
+def zone_of(intensity: float) -> int:
+    return bisect.bisect_left(ZONE_BOUNDS, intensity)
+
+
+def workout_totals(segments: list) -> dict:
+    """Duration, TSS, IF and seconds per zone of normalized segments."""
+    steps = expand(segments)
+    duration = sum(seconds for seconds, _ in steps)
+    load = sum(seconds * intensity ** 2 for seconds, intensity in steps)
+    zone_s = [0] * len(ZONES)
+    for seconds, intensity in steps:
+        zone_s[zone_of(intensity)] += seconds
+    return {
+        'duration_s': duration,
+        'tss': round(load / 36, 1),
+        'if': round(math.sqrt(load / duration), 3),
+        'zone_s': zone_s,
+    }
+
+
+def read_sources(workouts_dir: str, intervals_library: str = None) -> tuple:
+    """
+    Raw workouts as (source, category, workout) plus {category: (file, declared count)}.
+    Category files come first; the intervals library adds workouts they lack.
+    """
+    with open(os.path.join(workouts_dir, 'index.json'), 'r') as f:
+        index = json.load(f)
+
+    raw, declared = [], {}
+    for category, meta in index['categories'].items():
+        declared[category] = (meta['file'], meta.get('count'))
+        with open(os.path.join(workouts_dir, meta['file']), 'r') as f:
+            data = json.load(f)
+        raw += [(meta['file'], category, workout) for workout in data['workouts']]
+
+    if intervals_library and os.path.exists(intervals_library):
+        with open(intervals_library, 'r') as f:
+            data = json.load(f)
+        name = os.path.basename(intervals_library)
+        raw += [(name, workout.get('category'), workout)
+                for workout in data['workouts'].values()]
+    return raw, declared
+
+
+def source_hash(paths: list) -> str:
+    digest = hashlib.sha256(f'schema:{SCHEMA_VERSION}'.encode('utf-8'))
+    for path in sorted(paths):
+        with open(path, 'rb') as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()
+
+
+def compile_library(raw: list, declared_counts: dict = None) -> tuple:
+    """Compile raw workouts; returns (artifact without sourceHash, validation report)."""
+    columns = {key: [] for key in ('id', 'name', 'category', 'source', 'duration_s', 'tss', 'if',
+                                   'zone_s', 'declared_duration_s', 'declared_tss')}
+    segments, errors, warnings = [], [], []
+    seen = {}
+
+    for source, category, workout in raw:
+        workout_id = workout.get('id')
+        if workout_id in seen:
+            first = columns['declared_duration_s'][seen[workout_id]]
+            duration = workout.get('duration_min', 0) * 60
+            if duration and first and duration != first:
+                warnings.append(f"{workout_id}: {source} declares {duration // 60} min, "
+                                f"{columns['source'][seen[workout_id]]} {first // 60} min "
+                                f"(kept the latter)")
+            continue
+        try:
+            if not workout_id or not category:
+                raise ValueError('missing id or category')
+            normalized, assumed = [], []
+            for segment in workout.get('structure') or []:
+                item, notes = normalize_segment(segment)
+                normalized.append(item)
+                assumed += notes
+            if not normalized:
+                raise ValueError('empty structure')
+        except ValueError as e:
+            errors.append(f'{workout_id or "?"} ({source}): {e}')
+            continue
+        if assumed:
+            warnings.append(f"{workout_id}: assumed {', '.join(dict.fromkeys(assumed))}")
+
+        totals = workout_totals(normalized)
+        declared_duration = workout.get('duration_min', 0) * 60 or None
+        declared_tss = workout.get('tss_estimate')
+        off_by = abs(totals['duration_s'] - (declared_duration or totals['duration_s']))
+        if off_by > DURATION_TOLERANCE_S:
+            warnings.append(f"{workout_id}: segments last {totals['duration_s'] / 60:.0f} min, "
+                            f"declared {declared_duration // 60} min")
+        if declared_tss and abs(totals['tss'] - declared_tss) > TSS_TOLERANCE * declared_tss:
+            warnings.append(f"{workout_id}: computed TSS {totals['tss']:.0f}, "
+                            f"declared {declared_tss}")
+
+        seen[workout_id] = len(columns['id'])
+        for key, value in (('id', workout_id), ('name', workout.get('name', workout_id)),
+                           ('category', category), ('source', source),
+                           ('declared_duration_s', declared_duration),
+                           ('declared_tss', declared_tss), *totals.items()):
+            columns[key].append(value)
+        segments.append(normalized)
+
+    counts = {}
+    for category in columns['category']:
+        counts[category] = counts.get(category, 0) + 1
+    for category, (source, expected) in (declared_counts or {}).items():
+        compiled = columns['source'].count(source)
+        if expected is not None and compiled != expected:
+            warnings.append(f'{category}: index.json declares {expected} workouts, '
+                            f'found {compiled}')
+
+    artifact = {
+        'schemaVersion': SCHEMA_VERSION,
+        'zones': {'names': list(ZONES), 'upperBounds': list(ZONE_BOUNDS)},
+        'durationBucketMin': DURATION_BUCKET_MIN,
+        'columns': columns,
+        'segments': segments,
+        'indexes': build_indexes(columns),
+    }
+    report = {'workouts': len(columns['id']), 'categories': counts,
+              'errors': errors, 'warnings': warnings}
+    return artifact, report
+
+
+def duration_bucket(duration_s: float) -> int:
+    """Start (in minutes) of the duration bucket, e.g. 60 for 60-74 min."""
+    return int(duration_s // 60 // DURATION_BUCKET_MIN * DURATION_BUCKET_MIN)
+
+
+def build_indexes(columns: dict) -> dict:
+    """Row lists per category and duration bucket, each sorted by TSS."""
+    by_tss = sorted(range(len(columns['id'])), key=lambda row: (columns['tss'][row], row))
+    category, bucket = {}, {}
+    for row in by_tss:
+        category.setdefault(columns['category'][row], []).append(row)
+        bucket.setdefault(str(duration_bucket(columns['duration_s'][row])), []).append(row)
+    return {'all': by_tss, 'category': category, 'durationBucket': bucket}
+
+
+def build(workouts_dir: str = DEFAULT_WORKOUTS_DIR,
+          intervals_library: str = DEFAULT_INTERVALS_LIBRARY,
+          output_path: str = DEFAULT_OUTPUT, force: bool = False) -> tuple:
+    """
+    Compile the sources into output_path unless it already holds the same sources.
+    Returns (report, rebuilt).
+    """
+    raw, declared = read_sources(workouts_dir, intervals_library)
+    paths = [os.path.join(workouts_dir, 'index.json'),
+             *{os.path.join(workouts_dir, source) for source, _, _ in raw
+               if source != os.path.basename(intervals_library or '')}]
+    if intervals_library and os.path.exists(intervals_library):
+        paths.append(intervals_library)
+    digest = source_hash(paths)
+
+    if not force and os.path.exists(output_path):
+        with open(output_path, 'r') as f:
+            existing = json.load(f)
+        if existing.get('sourceHash') == digest:
+            return existing['report'], False
+
+    artifact, report = compile_library(raw, declared)
+    artifact['sourceHash'] = digest
+    artifact['report'] = report
+    _atomic_write(output_path, json.dumps(artifact, separators=(',', ':')).encode('utf-8'))
+    return report, True
+
+
+class WorkoutLibrary:
+    """Indexed lookups on a compiled library artifact."""
+
+    def __init__(self, artifact: dict):
+        self.columns = artifact['columns']
+        self.segments = artifact['segments']
+        self.indexes = artifact['indexes']
+        self.bucket_min = artifact['durationBucketMin']
+        self._rows = {workout_id: row for row, workout_id in enumerate(self.columns['id'])}
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_OUTPUT) -> 'WorkoutLibrary':
+        with open(path, 'r') as f:
+            return cls(json.load(f))
+
+    def __len__(self) -> int:
+        return len(self.columns['id'])
+
+    def row(self, row: int) -> dict:
+        workout = {key: values[row] for key, values in self.columns.items()}
+        workout['segments'] = self.segments[row]
+        return workout
+
+    def get(self, workout_id: str) -> dict:
+        row = self._rows.get(workout_id)
+        return None if row is None else self.row(row)
+
+    def _tss_range(self, rows: list, min_tss: float, max_tss: float) -> list:
+        tss = self.columns['tss']
+        lo = 0 if min_tss is None else bisect.bisect_left(rows, min_tss, key=tss.__getitem__)
+        hi = len(rows) if max_tss is None else bisect.bisect_right(rows, max_tss,
+                                                                    key=tss.__getitem__)
+        return rows[lo:hi]
+
+    def find(self, category: str = None, min_duration: float = None, max_duration: float = None,
+             min_tss: float = None, max_tss: float = None) -> list:
+        """Workouts matching all given constraints (durations in minutes), by ascending TSS."""
+        if category is not None:
+            rows = self.indexes['category'].get(category, [])
+        else:
+            rows = self.indexes['all']
+        rows = self._tss_range(rows, min_tss, max_tss)
+
+        if min_duration is not None or max_duration is not None:
+            lo = min_duration or 0
+            hi = max_duration if max_duration is not None else math.inf
+            # Only buckets overlapping [lo, hi] can hold matches
+            buckets = {int(bucket) for bucket in self.indexes['durationBucket']
+                       if int(bucket) <= hi and int(bucket) + self.bucket_min > lo}
+            duration = self.columns['duration_s']
+            rows = [row for row in rows
+                    if duration_bucket(duration[row]) in buckets
+                    and lo <= duration[row] / 60 <= hi]
+        return [self.row(row) for row in rows]
+
+
+def print_report(report: dict, limit: int = 10):
+    print(f"📚 {report['workouts']} workouts: "
+          + ', '.join(f'{category} {count}' for category, count in report['categories'].items()))
+    for error in report['errors']:
+        print(f"   ❌ {error}")
+    if report['warnings']:
+        print(f"⚠️  {len(report['warnings'])} warning(s)"
+              + (f", first {limit} (see --report for all):" if len(report['warnings']) > limit
+                 else ':'))
+        for warning in report['warnings'][:limit]:
+            print(f"   - {warning}")
+
+
+def register(subparsers):
+    parser = subparsers.add_parser(
+        'library',
+        help='Compile the workout library into an indexed artifact',
+        description='Precompute TSS, IF, duration and zone times per workout and write one '
+                    'artifact with category, duration and TSS indexes'
+    )
+    parser.add_argument('--workouts-dir', default=DEFAULT_WORKOUTS_DIR,
+                        help=f'Directory with index.json and category files '
+                             f'(default: {DEFAULT_WORKOUTS_DIR})')
+    parser.add_argument('--intervals-library', default=DEFAULT_INTERVALS_LIBRARY,
+                        help=f'Additional library file (default: {DEFAULT_INTERVALS_LIBRARY})')
+    parser.add_argument('-o', '--output', default=DEFAULT_OUTPUT,
+                        help=f'Compiled artifact (default: {DEFAULT_OUTPUT})')
+    parser.add_argument('--force', action='store_true',
+                        help='Rebuild even if the sources are unchanged')
+    parser.add_argument('-r', '--report', default=None,
+                        help='Write the validation report as JSON')
+    parser.add_argument('--find', nargs='*', metavar='KEY=VALUE', default=None,
+                        help='Query the artifact, e.g. category=FTP min_duration=60 max_tss=80')
+    parser.set_defaults(func=run)
+
+
+def run(args) -> int:
+    index_path = os.path.join(args.workouts_dir, 'index.json')
+    if not os.path.exists(index_path):
+        print(f"❌ Workout index not found: {index_path}")
+        return 1
+
+    print("📚 Workout library")
+    print("=" * 50)
+    try:
+        report, rebuilt = build(args.workouts_dir, args.intervals_library, args.output,
+                                args.force)
+    except (KeyError, ValueError) as e:
+        print(f"❌ Cannot read the workout library: {e}")
+        return 1
+    print(f"{'✅ Compiled' if rebuilt else '♻️  Sources unchanged, kept'}: {args.output} "
+          f"({os.path.getsize(args.output) / 1024:.0f} KB)")
+    print_report(report)
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"📋 Report saved to: {args.report}")
+
+    if args.find is not None:
+        criteria = dict(item.split('=', 1) for item in args.find)
+        numeric = {key: float(value) for key, value in criteria.items() if key != 'category'}
+        matches = WorkoutLibrary.load(args.output).find(criteria.get('category'), **numeric)
+        print(f"\n🔎 {len(matches)} match(es)")
+        for workout in matches:
+            print(f"   {workout['id']:<44} {workout['category']:<13} "
+                  f"{workout['duration_s'] / 60:4.0f} min  TSS {workout['tss']:5.1f}  "
+                  f"IF {workout['if']:.2f}")
+    return 1 if report['errors'] else 0
@@ -0,0 +1,195 @@
+"""
+Chunked reading of feature matrices and incremental writing of predictions.
+
+Supported inputs: .npy (memory-mapped), .csv (header with feature names, or
+headerless with the features as the first columns) and .parquet (requires
+pyarrow). Outputs: .npy, .csv and .parquet.
+"""
+
+import csv
+import os
+
+import numpy as np
+
+NPY_MAGIC = b'\x93NUMPY'
+# Fixed header size for appendable .npy files (multiple of 64 as required)
+NPY_HEADER_BYTES = 128
+
+
+def file_format(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower().lstrip('.')
+    if ext not in ('npy', 'csv', 'parquet'):
+        raise ValueError(f"Unsupported file format: {path} (use .npy, .csv or .parquet)")
+    return ext
+
+
+def open_npy(path: str) -> np.ndarray:
+    """Memory-map a 2D .npy matrix."""
+    matrix = np.load(path, mmap_mode='r')
+    if matrix.ndim != 2:
+        raise ValueError(f"Expected a 2D matrix in {path}, got shape {matrix.shape}")
+    return matrix
+
+
+def iter_feature_chunks(path: str, features: list, chunk_rows: int):
+    """Yield float32 (rows, len(features)) chunks of the input in order."""
+    fmt = file_format(path)
+    if fmt == 'npy':
+        yield from _iter_npy(path, len(features), chunk_rows)
+    elif fmt == 'csv':
+        yield from _iter_csv(path, features, chunk_rows)
+    else:
+        yield from _iter_parquet(path, features, chunk_rows)
+
+
+def _iter_npy(path: str, num_features: int, chunk_rows: int):
+    matrix = open_npy(path)
+    if matrix.shape[1] != num_features:
+        raise ValueError(f"Expected {num_features} columns in {path}, got {matrix.shape[1]}")
+    for start in range(0, matrix.shape[0], chunk_rows):
+        yield np.asarray(matrix[start:start + chunk_rows], dtype=np.float32)
+
+
+def _iter_csv(path: str, features: list, chunk_rows: int):
+    with open(path, 'r', newline='') as f:
+        reader = csv.reader(f)
+        first = next(reader, None)
+        if first is None:
+            return
+
+        if set(features) <= set(first):
+            columns = [first.index(name) for name in features]
+            pending = []
+        else:
+            # Headerless: features are the leading columns
+            columns = list(range(len(features)))
+            pending = [first]
+
+        def parse(rows):
+            short = next((row for row in rows if len(row) < len(features)), None)
+            if short is not None:
+                raise ValueError(f"Expected {len(features)} columns in {path}, "
+                                 f"got a row with {len(short)}")
+            return np.array([[float(row[c]) if row[c] != '' else np.nan for c in columns]
+                             for row in rows], dtype=np.float32)
+
+        for row in reader:
+            pending.append(row)
+            if len(pending) == chunk_rows:
+                yield parse(pending)
+                pending = []
+        if pending:
+            yield parse(pending)
+
+
+def _iter_parquet(path: str, features: list, chunk_rows: int):
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(path)
+    for batch in parquet_file.iter_batches(batch_size=chunk_rows, columns=features):
+        yield np.column_stack([
+            batch.column(name).to_numpy(zero_copy_only=False).astype(np.float32)
+            for name in features
+        ])
+
+
+def _npy_header(dtype: np.dtype, shape: tuple) -> bytes:
+    header = repr({'descr': np.lib.format.dtype_to_descr(dtype),
+                   'fortran_order': False, 'shape': shape}).encode('latin1')
+    # magic (6) + version (2) + header length (2) + header + padding + newline
+    padding = NPY_HEADER_BYTES - 10 - len(header) - 1
+    return NPY_MAGIC + b'\x01\x00' + (NPY_HEADER_BYTES - 10).to_bytes(2, 'little') + \
+        header + b' ' * padding + b'\n'
+
+
+class NpyAppender:
+    """Append rows of a fixed dtype and row shape to a .npy file; complete after close()."""
+
+    def __init__(self, path: str, dtype, row_shape: tuple = ()):
+        self.dtype = np.dtype(dtype)
+        self.row_shape = tuple(row_shape)
+        self.rows = 0
+        self._file = open(path, 'wb')
+        self._file.write(_npy_header(self.dtype, (0,) + self.row_shape))
+
+    def write(self, values: np.ndarray):
+        values = np.ascontiguousarray(values, dtype=self.dtype)
+        if values.shape[1:] != self.row_shape:
+            raise ValueError(f"Expected rows of shape {self.row_shape}, got {values.shape[1:]}")
+        self._file.write(values.tobytes())
+        self.rows += len(values)
+
+    def close(self):
+        self._file.seek(0)
+        self._file.write(_npy_header(self.dtype, (self.rows,) + self.row_shape))
+        self._file.close()
+
+
+class PredictionWriter:
+    """
+    Append predictions chunk by chunk to <path>.tmp. close() completes the
+    file and moves it to path; discard() (or leaving a with block on an
+    exception) deletes it, so a failed run never leaves a valid-looking file.
+    """
+
+    def __init__(self, path: str, column: str = 'predicted_tss'):
+        self.path = path
+        self.column = column
+        self.format = file_format(path)
+        self.rows = 0
+        self._temp_path = f'{path}.tmp'
+        self._file = None
+        self._writer = None
+
+        if self.format == 'npy':
+            self._file = open(self._temp_path, 'wb')
+            self._file.write(_npy_header(np.dtype(np.float32), (0,)))
+        elif self.format == 'csv':
+            self._file = open(self._temp_path, 'w', newline='')
+            self._file.write(f'{column}\n')
+
+    def write(self, values: np.ndarray):
+        values = np.asarray(values, dtype=np.float32).ravel()
+        if self.format == 'npy':
+            self._file.write(values.tobytes())
+        elif self.format == 'csv':
+            np.savetxt(self._file, values, fmt='%.6g')
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.table({self.column: values})
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self._temp_path, table.schema)
+            self._writer.write_table(table)
+        self.rows += len(values)
+
+    def close(self):
+        if self.format == 'parquet' and self._writer is None:
+            self.write(np.empty(0, dtype=np.float32))
+        if self.format == 'npy':
+            # Rewrite the fixed-size header with the final row count
+            self._file.seek(0)
+            self._file.write(_npy_header(np.dtype(np.float32), (self.rows,)))
+        self._close_files()
+        os.replace(self._temp_path, self.path)
+
+    def discard(self):
+        self._close_files()
+        if os.path.exists(self._temp_path):
+            os.remove(self._temp_path)
+
+    def _close_files(self):
+        if self._file is not None:
+            self._file.close()
+        if self._writer is not None:
+            self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if exc[0] is not None:
+            self.discard()
+        else:
+            self.close()
@@ -0,0 +1,108 @@
+"""
+Loading XGBoost models and feature lists, hashing input artifacts.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+
+DEFAULT_MODEL = 'model_tss_predictor.bst'
+DEFAULT_FEATURES = 'model_features.json'
+DEFAULT_OUTPUT = 'tss-predictor-v1.onnx'
+
+# First byte of every pickle written with protocol 2 or newer
+PICKLE_MAGIC = b'\x80'
+
+
+def load_features(features_path: str) -> list:
+    """Load feature names from JSON file (either metadata schema)."""
+    with open(features_path, 'r') as f:
+        data = json.load(f)
+
+    features = data.get('features') or data.get('feature_names') or []
+    if not features:
+        raise ValueError(f"No feature names found in {features_path}")
+    return features
+
+
+def load_model(model_path: str):
+    """Load a pickled XGBRegressor or a native XGBoost model file."""
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"Model file not found: {model_path}")
+
+    with open(model_path, 'rb') as f:
+        is_pickle = f.read(1) == PICKLE_MAGIC
+
+    if is_pickle:
+        with open(model_path, 'rb') as f:
+            return pickle.load(f)
+
+    import xgboost as xgb
+    booster = xgb.Booster()
+    booster.load_model(model_path)
+    return booster
+
+
+def get_booster(model):
+    """Return the underlying Booster of an sklearn wrapper (or the booster itself)."""
+    return model.get_booster() if hasattr(model, 'get_booster') else model
+
+
+def parse_base_score(value) -> float:
+    """Parse base_score as stored by XGBoost (plain float or '[2.8639478E2]')."""
+    if isinstance(value, str):
+        value = value.strip('[]')
+    return float(value)
+
+
+def read_base_score(model) -> float:
+    """base_score from the booster configuration (cheaper than a full model dump)."""
+    config = json.loads(get_booster(model).save_config())
+    return parse_base_score(config['learner']['learner_model_param']['base_score'])
+
+
+def booster_config(model, work_dir: str) -> dict:
+    """Dump the booster to JSON and return the parsed model document."""
+    temp_file = os.path.join(work_dir, 'model.json')
+    get_booster(model).save_model(temp_file)
+    with open(temp_file, 'r') as f:
+        return json.load(f)
+
+
+def fix_base_score(model, work_dir: str):
+    """
+    Return a booster with base_score rewritten as a plain float string.
+
+    XGBoost >= 2.0 stores base_score in array notation, which onnxmltools
+    cannot parse. The model is round-tripped through JSON in work_dir.
+    """
+    import xgboost as xgb
+
+    from .profiling import stage
+
+    with stage('base_score_fix.dump_json'):
+        config = booster_config(model, work_dir)
+    params = config["learner"]["learner_model_param"]
+    params["base_score"] = str(parse_base_score(params["base_score"]))
+
+    with stage('base_score_fix.write_json'):
+        temp_file = os.path.join(work_dir, 'model_fixed.json')
+        with open(temp_file, 'w') as f:
+            # json.dumps encodes in one C call; json.dump streams through
+            # Python and takes ~4x as long on this model
+            f.write(json.dumps(config))
+
+    with stage('base_score_fix.load_json'):
+        fixed_booster = xgb.Booster()
+        fixed_booster.load_model(temp_file)
+    return fixed_booster
+
+
+def file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    """Hash a file in fixed-size chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -0,0 +1,186 @@
+"""
+Offline graph optimization.
+
+Runs onnxruntime's graph optimizations once at build time and saves the
+result as an optimized .onnx and an ORT-format (.ort) model, so that
+serving can create its session with optimizations disabled instead of
+repeating them on every cold start.
+
+'extended' is the default level: 'all' adds layout transformations that can
+be specific to the build machine's CPU.
+"""
+
+import json
+import os
+import statistics
+import time
+
+from .runtime import create_session
+
+DEFAULT_LEVEL = 'extended'
+OFFLINE_LEVELS = ('basic', 'extended', 'all')
+
+
+def _check_level(level: str):
+    if level not in OFFLINE_LEVELS:
+        raise ValueError(f"Unknown optimization level '{level}' (use {', '.join(OFFLINE_LEVELS)})")
+
+
+def optimized_paths(onnx_path: str) -> dict:
+    stem = onnx_path[:-len('.onnx')] if onnx_path.endswith('.onnx') else onnx_path
+    return {'onnx': f'{stem}.opt.onnx', 'ort': f'{stem}.ort'}
+
+
+def _save_optimized(onnx_path: str, output_path: str, level: str, ort_format: bool):
+    import onnxruntime as rt
+
+    levels = {
+        'basic': rt.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+        'extended': rt.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+        'all': rt.GraphOptimizationLevel.ORT_ENABLE_ALL,
+    }
+    options = rt.SessionOptions()
+    options.graph_optimization_level = levels[level]
+    options.optimized_model_filepath = output_path
+    if ort_format:
+        options.add_session_config_entry('session.save_model_format', 'ORT')
+    rt.InferenceSession(onnx_path, options, providers=['CPUExecutionProvider'])
+
+
+def session_create_ms(model_path: str, optimization: str, repeats: int = 5) -> float:
+    """Median time to create an InferenceSession, in milliseconds."""
+    timings = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        create_session(model_path, optimization=optimization)
+        timings.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(timings)
+
+
+def optimize_model(onnx_path: str, level: str = DEFAULT_LEVEL, repeats: int = 5) -> dict:
+    """
+    Write <name>.opt.onnx and <name>.ort next to onnx_path and measure the
+    session-creation time saved compared with optimizing at load time.
+    """
+    _check_level(level)
+    paths = optimized_paths(onnx_path)
+    print(f"\n⚙️  Optimizing graph offline (level '{level}')...")
+    _save_optimized(onnx_path, paths['onnx'], level, ort_format=False)
+    _save_optimized(onnx_path, paths['ort'], level, ort_format=True)
+
+    # Baseline: what the app does today (optimize 'all' while loading)
+    baseline_ms = session_create_ms(onnx_path, 'all', repeats)
+    report = {
+        'level': level,
+        'baseline': {'path': onnx_path, 'size_bytes': os.path.getsize(onnx_path),
+                     'session_create_ms': baseline_ms},
+    }
+    for kind, path in paths.items():
+        create_ms = session_create_ms(path, 'disable', repeats)
+        report[kind] = {
+            'path': path,
+            'size_bytes': os.path.getsize(path),
+            'session_create_ms': create_ms,
+            'saved_ms': baseline_ms - create_ms,
+        }
+
+    print(f"   - Session create (raw, optimize on load): {baseline_ms:.1f} ms")
+    for kind in ('onnx', 'ort'):
+        entry = report[kind]
+        print(f"   - {entry['path']}: {entry['session_create_ms']:.1f} ms "
+              f"(saves {entry['saved_ms']:.1f} ms, {entry['size_bytes'] / (1024 * 1024):.2f} MB)")
+    return report
+
+
+def metadata_fields(onnx_path: str, level: str) -> dict:
+    """Metadata entries describing the optimized artifacts of onnx_path."""
+    _check_level(level)
+    return {
+        "graphOptimizationLevel": level,
+        "optimizedArtifacts": {
+            kind: os.path.basename(path) for kind, path in optimized_paths(onnx_path).items()
+        },
+    }
+
+
+def update_metadata(onnx_path: str, level: str):
+    """
+    Add metadata_fields to the model's metadata JSON and, for a bundle, to
+    its embedded metadata. Call it before optimize_model: onnxruntime copies
+    the metadata_props into both artifacts. Returns the metadata, or None if
+    the model has none.
+    """
+    from .bundle import embed_metadata, read_metadata
+    from .convert import metadata_path_for
+
+    metadata_path = metadata_path_for(onnx_path)
+    embedded = read_metadata(onnx_path)
+    if os.path.exists(metadata_path):
+        with open(metadata_path, 'r') as f:
+            metadata = json.load(f)
+    elif embedded:
+        metadata = embedded
+    else:
+        return None
+
+    metadata.update(metadata_fields(onnx_path, level))
+    if embedded:
+        metadata.pop('modelHash', None)
+        metadata = embed_metadata(onnx_path, metadata)
+        print(f"📦 Bundle metadata updated: {onnx_path}")
+    with open(metadata_path, 'w') as f:
+        json.dump(metadata, f, indent=2)
+    print(f"📋 Metadata updated: {metadata_path}")
+    return metadata
+
+
+def record_in_manifest(manifest_path: str, onnx_path: str, metadata: dict) -> dict:
+    """
+    Record the bundle and its optimized artifacts in the manifest. The
+    artifacts carry the bundle's metadata, modelHash included: it identifies
+    the graph they were optimized from. Returns the bundle's entry.
+    """
+    from .bundle import update_manifest
+
+    entries = {path: update_manifest(manifest_path, path, metadata)
+               for path in (onnx_path, *optimized_paths(onnx_path).values())}
+    revisions = ', '.join(f"{os.path.basename(path)} revision {entry['revision']}"
+                          for path, entry in entries.items())
+    print(f"🗂️  Manifest {manifest_path}: {revisions}")
+    return entries[onnx_path]
+
+
+def register(subparsers):
+    parser = subparsers.add_parser(
+        'optimize',
+        help='Optimize an ONNX graph offline and save ORT-format variant',
+        description='Run onnxruntime graph optimizations ahead of time and report the '
+                    'session-creation time saved'
+    )
+    parser.add_argument('-i', '--input', default='tss-predictor-v1.onnx',
+                        help='ONNX model to optimize')
+    parser.add_argument('--level', default=DEFAULT_LEVEL, choices=OFFLINE_LEVELS,
+                        help=f'Graph optimization level (default: {DEFAULT_LEVEL})')
+    parser.add_argument('--repeats', type=int, default=5,
+                        help='Session creations to time per artifact (default: 5)')
+    parser.add_argument('--manifest', default=None,
+                        help='Bundle manifest to update (default: model-manifest.json next to '
+                             'the model)')
+    parser.set_defaults(func=run)
+
+
+def run(args) -> int:
+    from .bundle import manifest_path_for, read_metadata
+
+    if not os.path.exists(args.input):
+        print(f"❌ Model file not found: {args.input}")
+        return 1
+
+    # Metadata first, so that the artifacts are written with it
+    metadata = update_metadata(args.input, args.level)
+    optimize_model(args.input, args.level, args.repeats)
+    if metadata and read_metadata(args.input):
+        record_in_manifest(args.manifest or manifest_path_for(args.input), args.input, metadata)
+
+    print("✅ Optimized artifacts written")
+    return 0
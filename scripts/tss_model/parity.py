@@ -0,0 +1,242 @@
+"""
+Cross-backend parity validation on a large, realistic feature corpus.
+
+The corpus is built by simulating daily training for many athletes with
+synth.py and running it through the feature engine, so every feature has
+the range and the correlations the app produces (zero days, weekly rhythm,
+training blocks, CTL/ATL from the same EMA as src/lib/fitnessMetrics.ts).
+Converted models are scored in batches and compared with the XGBoost
+model's own predictions.
+"""
+
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .convert import PARITY_RTOL, convert_model
+from .features import FEATURE_NAMES, compute_features
+from .model_io import DEFAULT_FEATURES, DEFAULT_MODEL, get_booster, load_features, load_model
+from .runtime import load_predictor
+from .synth import iter_blocks
+
+DEFAULT_ROWS = 1_000_000
+DEFAULT_BATCH_ROWS = 65536
+DEFAULT_BACKENDS = ['onnxmltools-fixed', 'hummingbird']
+PERCENTILES = (50, 90, 99, 99.9)
+# Leaf values reach ~1e6 and cancel, so float32 summation order alone moves
+# predictions near zero by up to ~16 TSS (XGBoost itself is ~80 TSS away
+# from an exact float64 sum). Still far below the 286 TSS base_score bug.
+DEFAULT_ATOL = 32.0
+
+SEASON_DAYS = 365
+
+
+def simulate_daily_metrics(athletes: int, days: int = SEASON_DAYS, seed: int = 0) -> dict:
+    """
+    Seeded daily TSS/CTL/ATL/TSB for `athletes` athletes over `days` days
+    from the synth generator, grouped by athlete and keyed by the argument
+    names of compute_features.
+    """
+    blocks = list(iter_blocks(athletes, days, seed))
+
+    def column(name):
+        return np.concatenate([block[name] for block in blocks])
+
+    return {
+        'dates': column('date'),
+        'tss': column('tss'),
+        'ctl': column('ctl'),
+        'atl': column('atl'),
+        'tsb': column('tsb'),
+        'athlete_ids': column('athlete_id'),
+    }
+
+
+def feature_corpus(rows: int, seed: int = 0) -> np.ndarray:
+    """A (rows, 15) float32 feature matrix from simulated athlete seasons."""
+    athletes = -(-rows // SEASON_DAYS)
+    features = compute_features(**simulate_daily_metrics(athletes, SEASON_DAYS, seed))
+    return features[:rows].astype(np.float32)
+
+
+def default_workers() -> int:
+    return os.cpu_count() or 1
+
+
+def xgboost_predictor(model_path: str, threads: int = 0):
+    """
+    The original model as predict(X) -> (N,) float32, evaluated by XGBoost
+    (threads=0: XGBoost's default, all cores).
+    """
+    booster = get_booster(load_model(model_path))
+    if threads:
+        booster.set_param({'nthread': threads})
+
+    def predict(X: np.ndarray) -> np.ndarray:
+        return np.asarray(booster.inplace_predict(X), dtype=np.float32).ravel()
+
+    return predict
+
+
+def deviation_summary(deviation: np.ndarray) -> dict:
+    summary = {'max_abs': float(deviation.max()), 'mean_abs': float(deviation.mean())}
+    for p, value in zip(PERCENTILES, np.percentile(deviation, PERCENTILES)):
+        summary[f'p{p:g}_abs'] = float(value)
+    return summary
+
+
+def check_parity(reference, candidates: dict, X: np.ndarray,
+                 batch_rows: int = DEFAULT_BATCH_ROWS, rtol: float = PARITY_RTOL,
+                 atol: float = DEFAULT_ATOL, workers: int = 1) -> dict:
+    """
+    Score X with the reference and every candidate predictor in batches and
+    summarize each candidate's deviation from the reference.
+
+    The batches of all predictors run concurrently on `workers` threads
+    (XGBoost, onnxruntime and the NumPy forest release the GIL while they
+    predict), so the predictors should be thread-safe and, with several
+    workers, use one thread each. A row passes if |Δ| <= atol + rtol * |reference|.
+    """
+    n = len(X)
+    predictors = [reference, *candidates.values()]
+    predictions = [np.empty(n, dtype=np.float32) for _ in predictors]
+    busy = [0.0] * len(predictors)
+
+    def score(task):
+        index, start = task
+        t0 = time.perf_counter()
+        stop = start + batch_rows
+        predictions[index][start:stop] = predictors[index](X[start:stop])
+        return index, time.perf_counter() - t0
+
+    tasks = [(index, start) for start in range(0, n, batch_rows)
+             for index in range(len(predictors))]
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max(1, workers)) as pool:
+        for index, seconds in pool.map(score, tasks):
+            busy[index] += seconds
+    wall_seconds = time.perf_counter() - t0
+
+    expected = predictions[0]
+    scale = np.abs(expected)
+    report = {'rows': n, 'rtol': rtol, 'atol': atol, 'workers': workers,
+              'reference_seconds': busy[0], 'wall_seconds': wall_seconds,
+              'rows_per_second': n / wall_seconds if wall_seconds > 0 else 0.0,
+              'candidates': {}}
+
+    for label, predicted, seconds in zip(candidates, predictions[1:], busy[1:]):
+        deviation = np.abs(predicted - expected)
+        summary = deviation_summary(deviation)
+        summary['max_rel'] = float((deviation / np.maximum(1.0, scale)).max())
+        summary['rows_over_tolerance'] = int(np.count_nonzero(deviation > atol + rtol * scale))
+        summary['worst_row'] = int(deviation.argmax())
+        summary['seconds'] = seconds
+        summary['passed'] = summary['rows_over_tolerance'] == 0
+        report['candidates'][label] = summary
+    return report
+
+
+def _candidate_models(args, work_dir: str) -> dict:
+    """Models given with --models plus conversions for --backends."""
+    models = {os.path.basename(path): path for path in args.models}
+    for backend in args.backends:
+        output_path = os.path.join(work_dir, f'{backend}.onnx')
+        try:
+            convert_model(args.input, args.features, output_path, backend=backend, validate=False)
+        except ImportError as e:
+            print(f"⚠️  Skipping backend '{backend}': {e}")
+            continue
+        models[backend] = output_path
+    return models
+
+
+def register(subparsers):
+    parser = subparsers.add_parser(
+        'parity',
+        help='Compare converted models with XGBoost on a large realistic corpus',
+        description='Cross-backend parity check: deviation of converted models from the '
+                    'original XGBoost predictions'
+    )
+    parser.add_argument('-i', '--input', default=DEFAULT_MODEL,
+                        help='Original XGBoost model (the reference)')
+    parser.add_argument('--features', default=DEFAULT_FEATURES,
+                        help='Path to features JSON file')
+    parser.add_argument('-m', '--models', nargs='*', default=[],
+                        help='Model files to check (.onnx, .ort, .npz, ...)')
+    parser.add_argument('--backends', nargs='*', default=DEFAULT_BACKENDS,
+                        help=f'Convert with these backends and check the results '
+                             f'(default: {" ".join(DEFAULT_BACKENDS)})')
+    parser.add_argument('--data', help='.npy feature matrix to use instead of the simulated corpus')
+    parser.add_argument('--rows', type=int, default=DEFAULT_ROWS,
+                        help=f'Rows in the simulated corpus (default: {DEFAULT_ROWS:,})')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--batch-rows', type=int, default=DEFAULT_BATCH_ROWS)
+    parser.add_argument('-j', '--workers', type=int, default=default_workers(),
+                        help='Threads scoring batches of all models concurrently '
+                             '(default: CPU count)')
+    parser.add_argument('--rtol', type=float, default=PARITY_RTOL,
+                        help=f'Allowed relative deviation per row (default: {PARITY_RTOL})')
+    parser.add_argument('--atol', type=float, default=DEFAULT_ATOL,
+                        help=f'Allowed absolute deviation in TSS (default: {DEFAULT_ATOL})')
+    parser.add_argument('-o', '--output', help='Write the JSON report here')
+    parser.set_defaults(func=run)
+
+
+def run(args) -> int:
+    for path, label in ((args.input, 'Model'), (args.features, 'Features')):
+        if not os.path.exists(path):
+            print(f"❌ {label} file not found: {path}")
+            return 1
+
+    features = load_features(args.features)
+    if args.data is None and features != FEATURE_NAMES:
+        print(f"❌ {args.features} does not match the feature engine; pass --data")
+        return 1
+
+    print("⚖️  Cross-backend parity check")
+    print("=" * 50)
+
+    if args.data:
+        X = np.load(args.data, mmap_mode='r')
+        print(f"📂 Corpus: {args.data} {X.shape}")
+    else:
+        t0 = time.perf_counter()
+        X = feature_corpus(args.rows, args.seed)
+        print(f"🧬 Simulated corpus: {X.shape} in {time.perf_counter() - t0:.1f}s")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        models = _candidate_models(args, work_dir)
+        if not models:
+            print("❌ Nothing to check: pass --models and/or --backends")
+            return 1
+        # One thread per predictor call: the concurrency comes from the workers
+        threads = 1 if args.workers > 1 else 0
+        candidates = {label: load_predictor(path, threads) for label, path in models.items()}
+        report = check_parity(xgboost_predictor(args.input, threads), candidates, X,
+                              args.batch_rows, args.rtol, args.atol, args.workers)
+
+    print(f"\n   {report['rows']:,} rows in {report['wall_seconds']:.1f}s on "
+          f"{report['workers']} worker(s) ({report['rows_per_second']:,.0f} rows/s); "
+          f"reference (xgboost) {report['reference_seconds']:.1f}s")
+    for label, summary in report['candidates'].items():
+        status = '✅' if summary['passed'] else '❌'
+        print(f"   {status} {label:<20} max={summary['max_abs']:.4f} p50={summary['p50_abs']:.4f} "
+              f"p99={summary['p99_abs']:.4f} p99.9={summary['p99.9_abs']:.4f} TSS "
+              f"max rel={summary['max_rel']:.2e} ({summary['rows_over_tolerance']} rows over, "
+              f"{summary['seconds']:.1f}s)")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n📋 Report saved to: {args.output}")
+
+    failed = [label for label, summary in report['candidates'].items() if not summary['passed']]
+    if failed:
+        print(f"❌ Parity failed for: {', '.join(failed)}")
+        return 1
+    print("✅ All candidates within tolerance")
+    return 0
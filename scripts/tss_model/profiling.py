@@ -0,0 +1,157 @@
+"""
+Stage-level wall time and memory profiling.
+
+Code marks its stages with `with stage('name'):`. That is free unless a
+Profiler is active (`with profiler.active():`). While one is active, a
+sampler thread reads the process RSS every few milliseconds, and every stage
+records its wall time, its RSS at start and end, and the highest RSS seen
+while it ran. Nested stages are recorded as well.
+
+The saved report is JSON with a summary per stage. It is also a Chrome trace
+(`traceEvents`): chrome://tracing or https://ui.perfetto.dev show the
+stages as a timeline with an RSS counter track.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+DEFAULT_SAMPLE_INTERVAL = 0.005
+
+_active = None
+
+
+def current_rss_mb() -> float:
+    """Resident set size now (None where /proc is not available)."""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far (None where unsupported)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    import sys
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def stage(name: str):
+    """Context manager timing `name` in the active profiler (no-op without one)."""
+    return _active.stage(name) if _active is not None else nullcontext()
+
+
+class Profiler:
+    """Records stages and RSS samples while active."""
+
+    def __init__(self, sample_interval: float = DEFAULT_SAMPLE_INTERVAL):
+        self.sample_interval = sample_interval
+        self.stages = []
+        self.samples = []
+        self._open = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._started = None
+
+    def _now_ms(self) -> float:
+        return (time.perf_counter() - self._started) * 1000
+
+    def _sample(self):
+        rss = current_rss_mb()
+        if rss is None:
+            return
+        with self._lock:
+            self.samples.append((self._now_ms(), rss))
+            for record in self._open:
+                record['peak_rss_mb'] = max(record['peak_rss_mb'], rss)
+
+    def _sampler(self):
+        while not self._stop.wait(self.sample_interval):
+            self._sample()
+
+    @contextmanager
+    def active(self):
+        """Make this the profiler that stage() reports to."""
+        global _active
+        previous, _active = _active, self
+        self._started = time.perf_counter()
+        self._stop.clear()
+        sampler = threading.Thread(target=self._sampler, name='rss-sampler', daemon=True)
+        sampler.start()
+        try:
+            yield self
+        finally:
+            self._stop.set()
+            sampler.join()
+            _active = previous
+
+    @contextmanager
+    def stage(self, name: str):
+        rss = current_rss_mb()
+        record = {
+            'name': name,
+            'depth': len(self._open),
+            'start_ms': self._now_ms(),
+            'rss_start_mb': rss,
+            'peak_rss_mb': rss or 0.0,
+        }
+        with self._lock:
+            self._open.append(record)
+        try:
+            yield record
+        finally:
+            self._sample()
+            with self._lock:
+                self._open.remove(record)
+            record['wall_ms'] = self._now_ms() - record['start_ms']
+            record['rss_end_mb'] = current_rss_mb()
+            if rss is None:
+                # No /proc: only the process-wide peak so far is known
+                record['peak_rss_mb'] = peak_rss_mb()
+            self.stages.append(record)
+
+    def report(self) -> dict:
+        stages = sorted(self.stages, key=lambda record: record['start_ms'])
+        events = [{
+            'name': record['name'], 'ph': 'X', 'pid': os.getpid(), 'tid': 0,
+            'ts': record['start_ms'] * 1000, 'dur': record['wall_ms'] * 1000,
+            'args': {key: record[key] for key in ('rss_start_mb', 'rss_end_mb', 'peak_rss_mb')},
+        } for record in stages]
+        events += [{'name': 'rss_mb', 'ph': 'C', 'pid': os.getpid(), 'tid': 0, 'ts': ms * 1000,
+                    'args': {'rss_mb': rss}} for ms, rss in self.samples]
+        return {
+            'stages': stages,
+            'total_ms': self._now_ms() if self._started else 0.0,
+            'peak_rss_mb': peak_rss_mb(),
+            'sample_interval_ms': self.sample_interval * 1000,
+            'traceEvents': events,
+            'displayTimeUnit': 'ms',
+        }
+
+    def save(self, path: str) -> dict:
+        report = self.report()
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+        return report
+
+
+def print_summary(report: dict):
+    """One line per stage, nested stages indented."""
+    print(f"\n⏱️  Profile ({report['total_ms']:.0f} ms, peak RSS {report['peak_rss_mb'] or 0:.0f} MB)")
+    for record in report['stages']:
+        name = '  ' * record['depth'] + record['name']
+        peak = record['peak_rss_mb']
+        delta = (record['rss_end_mb'] - record['rss_start_mb']
+                 if record['rss_start_mb'] is not None else None)
+        print(f"   {name:<28} {record['wall_ms']:9.1f} ms  peak {peak or 0:7.0f} MB"
+              + (f"  Δ {delta:+7.1f} MB" if delta is not None else ''))
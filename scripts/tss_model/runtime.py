@@ -0,0 +1,50 @@
+"""
+Prediction runtimes behind a common callable: predict(X) -> (N,) float32.
+
+ONNX models (.onnx, .ort) run in onnxruntime; XGBoost models and compiled
+forests (.bst, .json, .npz) run in the NumPy evaluator.
+"""
+
+import numpy as np
+
+ONNX_EXTENSIONS = ('.onnx', '.ort')
+
+# Names accepted on the command line for onnxruntime graph optimization levels
+OPTIMIZATION_LEVELS = ('disable', 'basic', 'extended', 'all')
+
+
+def create_session(model_path: str, threads: int = 0, optimization: str = 'all'):
+    """Create a CPU InferenceSession (threads=0 lets onnxruntime decide)."""
+    import onnxruntime as rt
+
+    levels = {
+        'disable': rt.GraphOptimizationLevel.ORT_DISABLE_ALL,
+        'basic': rt.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+        'extended': rt.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+        'all': rt.GraphOptimizationLevel.ORT_ENABLE_ALL,
+    }
+    options = rt.SessionOptions()
+    options.intra_op_num_threads = threads
+    options.graph_optimization_level = levels[optimization]
+    return rt.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+
+
+def session_predictor(session):
+    """Wrap an InferenceSession as predict(X) -> (N,) float32."""
+    input_name = session.get_inputs()[0].name
+    output_name = session.get_outputs()[0].name
+
+    def predict(X: np.ndarray) -> np.ndarray:
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        return session.run([output_name], {input_name: X})[0].ravel()
+
+    return predict
+
+
+def load_predictor(model_path: str, threads: int = 0, optimization: str = 'all'):
+    """Load any supported model file as predict(X) -> (N,) float32."""
+    if model_path.endswith(ONNX_EXTENSIONS):
+        return session_predictor(create_session(model_path, threads, optimization))
+
+    from .forest import load_forest
+    return load_forest(model_path).predict
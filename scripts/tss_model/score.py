@@ -0,0 +1,195 @@
+"""
+Streaming, multi-process batch scoring.
+
+The input is processed in fixed-size blocks. Each worker process holds its
+own predictor (one InferenceSession per worker) and reads its block straight
+from a memory-mapped file: .npy inputs are mapped in place, CSV and Parquet
+inputs are first appended chunk by chunk to a float32 spool file. Predictions
+are written in input order as blocks complete, so memory use depends on the
+block size and worker count, not on the input size.
+"""
+
+import multiprocessing
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from .matrix_io import PredictionWriter, file_format, iter_feature_chunks, open_npy
+from .model_io import DEFAULT_FEATURES, DEFAULT_OUTPUT, load_features
+from .runtime import load_predictor
+
+DEFAULT_CHUNK_ROWS = 65536
+
+# Per-process predictor, created by _init_worker
+_worker = {}
+
+
+def _init_worker(model_path: str, threads: int):
+    _worker['predict'] = load_predictor(model_path, threads)
+
+
+def _score_block(task) -> np.ndarray:
+    path, offset, rows, dtype, num_features = task
+    block = np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=(rows, num_features))
+    return _worker['predict'](block)
+
+
+def iter_blocks(input_path: str, features: list, chunk_rows: int, spool_dir: str):
+    """
+    Yield (path, offset, rows, dtype, num_features) descriptors of
+    memory-mappable input blocks.
+    """
+    num_features = len(features)
+
+    if file_format(input_path) == 'npy':
+        matrix = open_npy(input_path)
+        if matrix.shape[1] != num_features:
+            raise ValueError(f"Expected {num_features} columns in {input_path}, got {matrix.shape[1]}")
+        if matrix.flags['C_CONTIGUOUS']:
+            row_bytes = num_features * matrix.dtype.itemsize
+            for start in range(0, matrix.shape[0], chunk_rows):
+                rows = min(chunk_rows, matrix.shape[0] - start)
+                yield (input_path, matrix.offset + start * row_bytes, rows,
+                       matrix.dtype.str, num_features)
+            return
+
+    # Spool parsed chunks to a flat float32 file the workers can map
+    spool_path = os.path.join(spool_dir, 'input.f32')
+    with open(spool_path, 'wb') as spool:
+        for chunk in iter_feature_chunks(input_path, features, chunk_rows):
+            offset = spool.tell()
+            spool.write(np.ascontiguousarray(chunk, dtype=np.float32).tobytes())
+            spool.flush()
+            yield (spool_path, offset, len(chunk), '<f4', num_features)
+
+
+def _monitored(blocks, monitor):
+    """Pass block descriptors through, adding each block to the drift sketches."""
+    for task in blocks:
+        path, offset, rows, dtype, num_features = task
+        monitor.update(np.memmap(path, dtype=dtype, mode='r', offset=offset,
+                                 shape=(rows, num_features)))
+        yield task
+
+
+def score_file(
+    model_path: str,
+    input_path: str,
+    output_path: str,
+    features_path: str = DEFAULT_FEATURES,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    workers: int = 1,
+    threads: int = None,
+    monitor=None,
+) -> dict:
+    """
+    Score every row of input_path and write predictions to output_path.
+    With a DriftMonitor, every block is also added to its sketches.
+    """
+    features = load_features(features_path)
+    if threads is None:
+        # One thread per worker avoids oversubscribing the cores
+        threads = 1 if workers > 1 else 0
+
+    started = time.perf_counter()
+    pool = None
+    with tempfile.TemporaryDirectory() as spool_dir, PredictionWriter(output_path) as writer:
+        blocks = iter_blocks(input_path, features, chunk_rows, spool_dir)
+        if monitor is not None:
+            blocks = _monitored(blocks, monitor)
+        if workers > 1:
+            pool = multiprocessing.Pool(workers, initializer=_init_worker,
+                                        initargs=(model_path, threads))
+            results = pool.imap(_score_block, blocks)
+        else:
+            _init_worker(model_path, threads)
+            results = map(_score_block, blocks)
+
+        try:
+            for predictions in results:
+                writer.write(predictions)
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+
+    elapsed = time.perf_counter() - started
+    return {
+        'rows': writer.rows,
+        'seconds': elapsed,
+        'rows_per_second': writer.rows / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def register(subparsers):
+    parser = subparsers.add_parser(
+        'score',
+        help='Batch-score a feature matrix',
+        description='Stream a feature matrix (.npy, .csv, .parquet) through the model in '
+                    'fixed-size blocks across worker processes'
+    )
+    parser.add_argument('-i', '--input', required=True,
+                        help='Feature matrix (.npy, .csv or .parquet)')
+    parser.add_argument('-o', '--output', required=True,
+                        help='Predictions output (.npy, .csv or .parquet)')
+    parser.add_argument('-m', '--model', default=DEFAULT_OUTPUT,
+                        help='ONNX model, or .bst/.json/.npz for the NumPy forest')
+    parser.add_argument('--features', default=DEFAULT_FEATURES,
+                        help='Path to features JSON file (column order)')
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS,
+                        help=f'Rows per block (default: {DEFAULT_CHUNK_ROWS})')
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count() or 1,
+                        help='Worker processes (default: CPU count)')
+    parser.add_argument('--threads', type=int, default=None,
+                        help='Intra-op threads per worker (default: 1 with several workers)')
+    parser.add_argument('--drift-profile',
+                        help='Reference profile: monitor the scored features for drift')
+    parser.add_argument('--drift-state',
+                        help='Drift sketch state JSON to continue from and update')
+    parser.set_defaults(func=run)
+
+
+def run(args) -> int:
+    for path, label in ((args.model, 'Model'), (args.input, 'Input'),
+                        (args.drift_profile, 'Drift profile')):
+        if path and not os.path.exists(path):
+            print(f"❌ {label} file not found: {path}")
+            return 1
+
+    monitor = None
+    if args.drift_profile:
+        from .drift import open_monitor
+        try:
+            monitor = open_monitor(args.drift_profile, args.drift_state,
+                                   load_features(args.features))
+        except ValueError as e:
+            print(f"❌ {e}")
+            return 1
+
+    print(f"🎯 Scoring {args.input} with {args.model} ({args.workers} worker(s))...")
+    try:
+        stats = score_file(
+            model_path=args.model,
+            input_path=args.input,
+            output_path=args.output,
+            features_path=args.features,
+            chunk_rows=args.chunk_rows,
+            workers=args.workers,
+            threads=args.threads,
+            monitor=monitor,
+        )
+    except (ValueError, OSError) as e:
+        print(f"❌ Scoring failed: {e}")
+        return 1
+    print(f"✅ {stats['rows']} predictions written to {args.output} "
+          f"in {stats['seconds']:.2f}s ({stats['rows_per_second']:,.0f} rows/s)")
+
+    if monitor is not None:
+        from .drift import print_scores, save_state
+        print_scores(monitor.scores())
+        if args.drift_state:
+            save_state(args.drift_state, monitor)
+            print(f"\n💾 Drift state saved to: {args.drift_state}")
+    return 0
@@ -0,0 +1,308 @@
+"""
+Micro-batching inference server.
+
+Loads the model once and serves predictions over HTTP (JSON). Concurrent
+requests are queued and run as one batch once max_batch_size rows are
+waiting or the oldest request has waited max_wait_ms, whichever comes
+first. While a batch runs, new requests keep queueing, so batches grow with
+load. Only the standard library and the model runtime are needed.
+
+Endpoints:
+    POST /predict   {"features": [n numbers]} or {"instances": [[...], ...]}
+    GET  /metrics   queue depth, batch-size and latency histograms
+    GET  /health
+"""
+
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .model_io import DEFAULT_FEATURES, DEFAULT_OUTPUT, load_features
+from .runtime import load_predictor
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_MAX_BATCH_SIZE = 256
+DEFAULT_MAX_WAIT_MS = 2.0
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+LATENCY_BUCKETS_MS = (0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+MAX_BODY_BYTES = 1 << 20
+
+
+class Histogram:
+    """Bucket counts: counts[i] holds values in (bounds[i-1], bounds[i]]; the last bucket is +Inf."""
+
+    def __init__(self, bounds):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        index = next((i for i, bound in enumerate(self.bounds) if value <= bound), len(self.bounds))
+        self.counts[index] += 1
+        self.total += 1
+        self.sum += value
+
+    def snapshot(self) -> dict:
+        labels = [str(bound) for bound in self.bounds] + ['+Inf']
+        return {
+            'buckets': dict(zip(labels, self.counts)),
+            'count': self.total,
+            'mean': self.sum / self.total if self.total else 0.0,
+        }
+
+
+class MicroBatcher:
+    """Collects rows from concurrent callers and predicts them in batches."""
+
+    def __init__(self, predict, num_features: int, max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+                 max_wait_ms: float = DEFAULT_MAX_WAIT_MS):
+        self.predict = predict
+        self.num_features = num_features
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.latency_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.max_queue_depth = 0
+        self._queue = None
+        self._queued_rows = 0
+        self._worker = None
+        # One inference at a time; onnxruntime parallelizes inside the batch
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    @property
+    def queue_depth(self) -> int:
+        """Rows waiting for a batch."""
+        return self._queued_rows
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._executor.shutdown(wait=True)
+
+    async def submit(self, rows: np.ndarray) -> np.ndarray:
+        """Queue (k, num_features) rows and wait for their k predictions."""
+        rows = np.asarray(rows, dtype=np.float32).reshape(-1, self.num_features)
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((rows, future, time.perf_counter()))
+        self._queued_rows += len(rows)
+        self.max_queue_depth = max(self.max_queue_depth, self._queued_rows)
+        return await future
+
+    async def _next_batch(self) -> list:
+        first = await self._queue.get()
+        batch, rows = [first], len(first[0])
+        deadline = first[2] + self.max_wait
+
+        while rows < self.max_batch_size:
+            if self._queue.empty():
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            else:
+                item = self._queue.get_nowait()
+            batch.append(item)
+            rows += len(item[0])
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            X = np.concatenate([rows for rows, _, _ in batch])
+            self._queued_rows -= len(X)
+            self.batch_sizes.observe(len(X))
+
+            try:
+                predictions = await loop.run_in_executor(self._executor, self.predict, X)
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            done = time.perf_counter()
+            offset = 0
+            for rows, future, queued_at in batch:
+                if not future.done():
+                    future.set_result(predictions[offset:offset + len(rows)])
+                offset += len(rows)
+                self.latency_ms.observe((done - queued_at) * 1000)
+
+    def metrics(self) -> dict:
+        return {
+            'queue_depth': self.queue_depth,
+            'max_queue_depth': self.max_queue_depth,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000,
+            'batch_size': self.batch_sizes.snapshot(),
+            'latency_ms': self.latency_ms.snapshot(),
+        }
+
+
+class InferenceServer:
+    """Minimal HTTP/1.1 JSON front end (keep-alive) for a MicroBatcher."""
+
+    def __init__(self, batcher: MicroBatcher, model_path: str = None):
+        self.batcher = batcher
+        self.model_path = model_path
+        self.started = time.time()
+        self.requests = 0
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode('latin1').split(' ', 2)
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length', 0))
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, 413, {'error': 'Request body too large'})
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                status, payload = await self.route(method, path, body)
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, method: str, path: str, body: bytes) -> tuple:
+        if method == 'POST' and path == '/predict':
+            self.requests += 1
+            try:
+                request = json.loads(body)
+                single = 'features' in request
+                rows = np.asarray([request['features']] if single else request['instances'],
+                                  dtype=np.float32)
+                if rows.ndim != 2 or rows.shape[1] != self.batcher.num_features:
+                    raise ValueError(f"Expected rows of {self.batcher.num_features} features")
+            except (KeyError, TypeError, ValueError) as e:
+                return 400, {'error': f'Invalid request: {e}'}
+
+            try:
+                predictions = (await self.batcher.submit(rows)).tolist()
+            except Exception as e:
+                return 500, {'error': f'Prediction failed: {e}'}
+            return 200, {'prediction': predictions[0]} if single else {'predictions': predictions}
+
+        if method == 'GET' and path == '/metrics':
+            return 200, {
+                'model': self.model_path,
+                'uptime_seconds': time.time() - self.started,
+                'requests': self.requests,
+                **self.batcher.metrics(),
+            }
+        if method == 'GET' and path == '/health':
+            return 200, {'status': 'ok'}
+        return 404, {'error': f'Not found: {method} {path}'}
+
+    @staticmethod
+    async def _respond(writer, status: int, payload: dict, keep_alive: bool = False):
+        reasons = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 413: 'Payload Too Large',
+                   500: 'Internal Server Error'}
+        body = json.dumps(payload).encode()
+        head = (f'HTTP/1.1 {status} {reasons.get(status, "")}\r\n'
+                f'Content-Type: application/json\r\n'
+                f'Content-Length: {len(body)}\r\n'
+                f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n')
+        writer.write(head.encode('latin1') + body)
+        await writer.drain()
+
+
+async def start_server(predict, num_features: int, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                       max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+                       max_wait_ms: float = DEFAULT_MAX_WAIT_MS, model_path: str = None) -> tuple:
+    """Start batcher and HTTP server; returns (asyncio server, InferenceServer)."""
+    batcher = MicroBatcher(predict, num_features, max_batch_size, max_wait_ms)
+    batcher.start()
+    app = InferenceServer(batcher, model_path)
+    server = await asyncio.start_server(app.handle, host, port)
+    return server, app
+
+
+def register(subparsers):
+    parser = subparsers.add_parser(
+        'serve',
+        help='Serve predictions over HTTP with micro-batching',
+        description='Load the model once and serve JSON predictions, batching concurrent '
+                    'requests'
+    )
+    parser.add_argument('-m', '--model', default=DEFAULT_OUTPUT,
+                        help='ONNX model, or .bst/.json/.npz for the NumPy forest')
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--max-batch-size', type=int, default=DEFAULT_MAX_BATCH_SIZE,
+                        help=f'Rows per batch (default: {DEFAULT_MAX_BATCH_SIZE})')
+    parser.add_argument('--max-wait-ms', type=float, default=DEFAULT_MAX_WAIT_MS,
+                        help=f'Longest a request waits for a batch to fill (default: {DEFAULT_MAX_WAIT_MS})')
+    parser.add_argument('--threads', type=int, default=0,
+                        help='onnxruntime intra-op threads (default: onnxruntime decides)')
+    parser.add_argument('--features', default=DEFAULT_FEATURES,
+                        help='Path to features JSON file (sets the row width)')
+    parser.add_argument('--num-features', type=int, default=None,
+                        help='Features per row (default: the number in --features)')
+    parser.set_defaults(func=run)
+
+
+def run(args) -> int:
+    if not os.path.exists(args.model):
+        print(f"❌ Model file not found: {args.model}")
+        return 1
+
+    num_features = args.num_features
+    if num_features is None:
+        if not os.path.exists(args.features):
+            print(f"❌ Features file not found: {args.features} (or pass --num-features)")
+            return 1
+        num_features = len(load_features(args.features))
+
+    predict = load_predictor(args.model, threads=args.threads)
+
+    async def main():
+        server, _ = await start_server(predict, num_features, args.host, args.port,
+                                       args.max_batch_size, args.max_wait_ms, args.model)
+        print(f"🚀 Serving {args.model} on http://{args.host}:{args.port} "
+              f"({num_features} features, batch ≤ {args.max_batch_size}, "
+              f"wait ≤ {args.max_wait_ms} ms)")
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("\n👋 Server stopped")
+    return 0
@@ -0,0 +1,416 @@
+"""
+Append-only on-disk feature store.
+
+Holds the 15 model features for every (athlete, date) that was added, one
+raw float32 file per feature column, memory-mapped for reading. Training,
+scoring and backtesting jobs read the stored rows instead of re-deriving
+the rolling windows.
+
+Per athlete the store keeps the rolling state the features depend on: the
+last 42 TSS entries, the entry count, the last CTL/ATL/TSB and the last
+date. New days are featurized with compute_features on just that state
+plus the new rows, so appending costs the same whatever the length of the
+history, and the values are identical to a full recompute.
+
+Layout:
+    <store>/columns/<feature>.f32   feature columns (row-aligned)
+    <store>/athlete.i32, date.i32    athlete index and day number per row
+    <store>/segments/<n>.npz         one per append: its sorted (athlete, date)
+                                     keys -> row, and the new state of the
+                                     athletes it touched
+    <store>/meta.json                row count and the live segments
+
+meta.json is the only commit point. An append writes its columns and a new
+segment file, then replaces meta.json. If it is interrupted before that, the
+next open truncates the extra column bytes and deletes segment files that
+meta.json does not list, so the store is back at the last commit.
+
+Segments are merged size-tiered: while the older of the newest two is at
+most MERGE_FACTOR times the size of the newer, they are replaced by one.
+There are O(log rows) segments to search, and a row is rewritten O(log rows)
+times in total, instead of the whole index on every append.
+"""
+
+import io
+import json
+import os
+
+import numpy as np
+
+from .cache import _atomic_write
+from .features import FEATURE_NAMES, compute_features, load_daily_metrics
+
+DEFAULT_STORE = 'feature-store'
+WINDOW = 42
+STORE_VERSION = 2
+MERGE_FACTOR = 2
+STATE_FIELDS = ('recent_tss', 'history', 'ctl', 'atl', 'tsb', 'last_day')
+
+
+def _empty_state(count: int) -> dict:
+    """Rolling state of `count` athletes with no history."""
+    return {
+        'recent_tss': np.zeros((count, WINDOW)),
+        'history': np.zeros(count, dtype=np.int64),
+        'ctl': np.zeros(count), 'atl': np.zeros(count), 'tsb': np.zeros(count),
+        'last_day': np.full(count, np.iinfo(np.int64).min),
+    }
+
+
+class FeatureStore:
+    """Append-only feature columns with an (athlete, date) index."""
+
+    def __init__(self, path: str = DEFAULT_STORE):
+        self.path = path
+        os.makedirs(os.path.join(path, 'columns'), exist_ok=True)
+        os.makedirs(os.path.join(path, 'segments'), exist_ok=True)
+
+        meta_path = os.path.join(path, 'meta.json')
+        if os.path.exists(meta_path):
+            with open(meta_path, 'r') as f:
+                self.meta = json.load(f)
+            if self.meta.get('version') != STORE_VERSION:
+                raise ValueError(f"{path} has store version {self.meta.get('version')}, "
+                                 f"expected {STORE_VERSION}; rebuild it")
+            if self.meta['columns'] != FEATURE_NAMES:
+                raise ValueError(f"{path} was built with different feature columns")
+        else:
+            self.meta = {'version': STORE_VERSION, 'columns': FEATURE_NAMES, 'rows': 0,
+                         'generation': 0, 'segments': []}
+
+        self._load_segments()
+        self._athlete_index = {athlete: i
+                               for i, athlete in enumerate(self.state['athlete_ids'].tolist())}
+        self._truncate_to(self.num_rows)
+        self._remove_orphans()
+
+    @property
+    def num_rows(self) -> int:
+        return self.meta['rows']
+
+    @property
+    def athlete_ids(self) -> np.ndarray:
+        return self.state['athlete_ids']
+
+    def _column_paths(self) -> dict:
+        paths = {name: os.path.join(self.path, 'columns', f'{name}.f32') for name in FEATURE_NAMES}
+        paths['athlete'] = os.path.join(self.path, 'athlete.i32')
+        paths['date'] = os.path.join(self.path, 'date.i32')
+        return paths
+
+    def _segment_path(self, name: str) -> str:
+        return os.path.join(self.path, 'segments', name)
+
+    def _load_segments(self):
+        """Read the committed segments; for each athlete the newest state wins."""
+        loaded = []
+        for name in self.meta['segments']:
+            with np.load(self._segment_path(name)) as segment:
+                loaded.append({key: segment[key] for key in segment.files})
+
+        count = max((int(s['athletes'].max()) + 1 for s in loaded if len(s['athletes'])),
+                    default=0)
+        self.state = _empty_state(count)
+        athlete_ids = np.empty(count, dtype=object)
+        for segment in loaded:
+            athletes = segment['athletes']
+            athlete_ids[athletes] = segment['athlete_ids']
+            for name in STATE_FIELDS:
+                self.state[name][athletes] = segment[name]
+        self.state['athlete_ids'] = athlete_ids.astype(str)
+
+        self._segments = [{'name': name, 'keys': s['keys'], 'rows': s['rows'],
+                           'athletes': s['athletes']}
+                          for name, s in zip(self.meta['segments'], loaded)]
+
+    def _truncate_to(self, rows: int):
+        """Drop rows past the committed count (left by an interrupted append)."""
+        for path in self._column_paths().values():
+            if os.path.exists(path) and os.path.getsize(path) > rows * 4:
+                with open(path, 'r+b') as f:
+                    f.truncate(rows * 4)
+
+    def _remove_orphans(self):
+        """Delete segment files meta.json does not list (interrupted appends or merges)."""
+        live = set(self.meta['segments'])
+        for name in os.listdir(os.path.join(self.path, 'segments')):
+            if name not in live:
+                os.remove(self._segment_path(name))
+
+    def column(self, name: str) -> np.ndarray:
+        """Read-only memory map of one column (a feature, 'athlete' or 'date')."""
+        dtype = np.int32 if name in ('athlete', 'date') else np.float32
+        if self.num_rows == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(self._column_paths()[name], dtype=dtype, mode='r', shape=(self.num_rows,))
+
+    def matrix(self, rows=None) -> np.ndarray:
+        """(N, 15) float32 features of the given rows (default: all, in row order)."""
+        columns = [self.column(name) for name in FEATURE_NAMES]
+        if rows is not None:
+            columns = [column[rows] for column in columns]
+        if columns[0].size == 0:
+            return np.zeros((0, len(FEATURE_NAMES)), dtype=np.float32)
+        return np.stack(columns, axis=1)
+
+    @staticmethod
+    def _keys(athlete_index: np.ndarray, days: np.ndarray) -> np.ndarray:
+        """Index keys sorting by athlete, then date."""
+        return (np.asarray(athlete_index, dtype=np.int64) << 32) + (np.asarray(days) + 2 ** 31)
+
+    def rows(self, athlete_ids, dates) -> np.ndarray:
+        """Row number of each (athlete, date), -1 where the store has no such day."""
+        athlete_index = np.array([self._athlete_index.get(a, -1)
+                                  for a in np.asarray(athlete_ids).astype(str).tolist()],
+                                 dtype=np.int64)
+        days = np.asarray(dates, dtype='datetime64[D]').astype(np.int64)
+        result = np.full(len(days), -1, dtype=np.int64)
+        known = np.flatnonzero(athlete_index >= 0)
+        if len(known) == 0:
+            return result
+
+        keys = self._keys(athlete_index[known], days[known])
+        for segment in self._segments:
+            segment_keys = segment['keys']
+            if len(segment_keys) == 0:
+                continue
+            position = np.minimum(np.searchsorted(segment_keys, keys), len(segment_keys) - 1)
+            hit = segment_keys[position] == keys
+            result[known[hit]] = segment['rows'][position[hit]]
+        return result
+
+    def get(self, athlete_ids, dates) -> np.ndarray:
+        """(k, 15) features for the given (athlete, date) pairs; KeyError if any is missing."""
+        rows = self.rows(athlete_ids, dates)
+        if np.any(rows < 0):
+            raise KeyError(f"{int(np.sum(rows < 0))} of {len(rows)} (athlete, date) pairs "
+                           f"not in the store")
+        return self.matrix(rows)
+
+    def history(self, athlete_id) -> tuple:
+        """(dates, (n, 15) features) of one athlete, in date order."""
+        index = self._athlete_index.get(str(athlete_id))
+        if index is None:
+            raise KeyError(f"Athlete {athlete_id} not in the store")
+        bounds = [index << 32, (index + 1) << 32]
+        parts = [np.zeros(0, dtype=np.int64)]
+        for segment in self._segments:
+            lo, hi = np.searchsorted(segment['keys'], bounds)
+            parts.append(segment['rows'][lo:hi])
+        # An athlete's days are only ever appended in date order, so row order is date order
+        rows = np.sort(np.concatenate(parts))
+        return self.column('date')[rows].astype('datetime64[D]'), self.matrix(rows)
+
+    def append(self, dates, tss, ctl, atl, tsb, athlete_ids=None) -> dict:
+        """
+        Featurize and store new days. Days on or before an athlete's last
+        stored day are skipped, so overlapping exports can be re-added.
+        Returns {'added', 'skipped', 'new_athletes'}.
+        """
+        n = len(tss)
+        athlete_ids = (np.zeros(n, dtype=np.int64) if athlete_ids is None
+                       else np.asarray(athlete_ids)).astype(str)
+        days = np.asarray(dates, dtype='datetime64[D]').astype(np.int64)
+        values = {name: np.nan_to_num(np.asarray(v, dtype=np.float64))
+                  for name, v in (('tss', tss), ('ctl', ctl), ('atl', atl), ('tsb', tsb))}
+
+        new_athletes = self._register_athletes(athlete_ids)
+        athlete_index = np.array([self._athlete_index[a] for a in athlete_ids.tolist()],
+                                 dtype=np.int64)
+
+        # New rows only, grouped by athlete and in date order
+        keep = days > self.state['last_day'][athlete_index]
+        order = np.flatnonzero(keep)[np.lexsort((days[keep], athlete_index[keep]))]
+        if len(order) == 0:
+            return {'added': 0, 'skipped': n, 'new_athletes': new_athletes}
+        athlete_index, days = athlete_index[order], days[order]
+        values = {name: v[order] for name, v in values.items()}
+        if np.any((np.diff(days) == 0) & (np.diff(athlete_index) == 0)):
+            raise ValueError("Duplicate (athlete, date) rows in the input")
+
+        features, segments = self._featurize(athlete_index, days, values)
+        self._write_rows(athlete_index, days, features)
+        self._update_state(segments)
+
+        # Rows are in (athlete, date) order, so the new keys are already sorted
+        segment = self._write_segment(self._keys(athlete_index, days),
+                                      self.num_rows + np.arange(len(order), dtype=np.int64),
+                                      segments['athletes'])
+        self._commit(self._segments + [segment], self.num_rows + len(order))
+        self._merge_segments()
+        return {'added': len(order), 'skipped': n - len(order), 'new_athletes': new_athletes}
+
+    def _register_athletes(self, athlete_ids: np.ndarray) -> int:
+        """Add state for athletes the store has not seen; returns how many."""
+        unseen = [a for a in dict.fromkeys(athlete_ids.tolist()) if a not in self._athlete_index]
+        for a in unseen:
+            self._athlete_index[a] = len(self._athlete_index)
+
+        state, empty = self.state, _empty_state(len(unseen))
+        state['athlete_ids'] = np.concatenate([state['athlete_ids'], np.array(unseen, dtype=str)])
+        for name in STATE_FIELDS:
+            state[name] = np.concatenate([state[name], empty[name]])
+        return len(unseen)
+
+    def _featurize(self, athlete_index, days, values) -> tuple:
+        """
+        Features of the new rows: each athlete's stored window (up to 42
+        entries, last CTL/ATL/TSB on the newest) is prepended to its new
+        rows, compute_features runs once, and the prefix rows are dropped.
+        """
+        state = self.state
+        athletes, counts = np.unique(athlete_index, return_counts=True)
+        prefix = np.minimum(state['history'][athletes], WINDOW)
+        lengths = prefix + counts
+        seg_start = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+        total = int(lengths.sum())
+
+        segment = np.repeat(np.arange(len(athletes)), lengths)
+        offset = np.arange(total) - seg_start[segment]
+        is_new = offset >= prefix[segment]
+        new_positions = np.flatnonzero(is_new)
+
+        combined = {name: np.zeros(total) for name in values}
+        combined_days = np.zeros(total, dtype=np.int64)
+        for name, v in values.items():
+            combined[name][new_positions] = v
+        combined_days[new_positions] = days
+
+        # Prefix: right-aligned stored TSS, synthetic consecutive dates
+        old = np.flatnonzero(~is_new)
+        back = prefix[segment[old]] - offset[old]          # 1 = newest stored entry
+        combined['tss'][old] = state['recent_tss'][athletes[segment[old]], WINDOW - back]
+        combined_days[old] = state['last_day'][athletes[segment[old]]] - back + 1
+        newest = old[back == 1]
+        for name in ('ctl', 'atl', 'tsb'):
+            combined[name][newest] = state[name][athletes[segment[newest]]]
+
+        features = compute_features(combined_days.astype('datetime64[D]'), combined['tss'],
+                                    combined['ctl'], combined['atl'], combined['tsb'], segment)
+        segments = {'athletes': athletes, 'seg_start': seg_start, 'seg_end': seg_start + lengths,
+                    'counts': counts, 'days': combined_days, **combined}
+        return features[new_positions].astype(np.float32), segments
+
+    def _update_state(self, segments: dict):
+        """Keep the last 42 entries and the last day's values of each segment."""
+        state = self.state
+        athletes, seg_start = segments['athletes'], segments['seg_start']
+        seg_end = segments['seg_end']
+        window = seg_end[:, None] - WINDOW + np.arange(WINDOW)
+        valid = window >= seg_start[:, None]
+        state['recent_tss'][athletes] = np.where(valid, segments['tss'][np.maximum(window, 0)], 0.0)
+        state['history'][athletes] += segments['counts']
+        last = seg_end - 1
+        for name in ('ctl', 'atl', 'tsb'):
+            state[name][athletes] = segments[name][last]
+        state['last_day'][athletes] = segments['days'][last]
+
+    def _write_rows(self, athlete_index, days, features):
+        paths = self._column_paths()
+        for j, name in enumerate(FEATURE_NAMES):
+            with open(paths[name], 'ab') as f:
+                f.write(np.ascontiguousarray(features[:, j]).tobytes())
+        with open(paths['athlete'], 'ab') as f:
+            f.write(athlete_index.astype(np.int32).tobytes())
+        with open(paths['date'], 'ab') as f:
+            f.write(days.astype(np.int32).tobytes())
+
+    def _write_segment(self, keys, rows, athletes) -> dict:
+        """
+        Write a segment file: sorted index keys -> rows, and the current
+        state of `athletes`. It is not live until _commit lists it.
+        """
+        self.meta['generation'] += 1
+        name = f"{self.meta['generation']:08d}.npz"
+        buffer = io.BytesIO()
+        np.savez(buffer, keys=keys, rows=rows, athletes=athletes,
+                 athlete_ids=self.state['athlete_ids'][athletes],
+                 **{field: self.state[field][athletes] for field in STATE_FIELDS})
+        _atomic_write(self._segment_path(name), buffer.getvalue())
+        return {'name': name, 'keys': keys, 'rows': rows, 'athletes': athletes}
+
+    def _commit(self, segments: list, rows: int):
+        """Replace meta.json (the commit point), then delete segments it no longer lists."""
+        meta = dict(self.meta, rows=rows, segments=[s['name'] for s in segments])
+        _atomic_write(os.path.join(self.path, 'meta.json'),
+                      json.dumps(meta, indent=2).encode('utf-8'))
+        self.meta, self._segments = meta, segments
+        self._remove_orphans()
+
+    def _merge_segments(self):
+        """Merge the newest two segments while they are within MERGE_FACTOR in size."""
+        while len(self._segments) > 1:
+            older, newer = self._segments[-2:]
+            if len(older['keys']) > MERGE_FACTOR * len(newer['keys']):
+                break
+            total = len(older['keys']) + len(newer['keys'])
+            position = (np.searchsorted(older['keys'], newer['keys'])
+                        + np.arange(len(newer['keys'])))
+            from_older = np.ones(total, dtype=bool)
+            from_older[position] = False
+            keys = np.empty(total, dtype=np.int64)
+            rows = np.empty(total, dtype=np.int64)
+            keys[position], keys[from_older] = newer['keys'], older['keys']
+            rows[position], rows[from_older] = newer['rows'], older['rows']
+
+            # The newest two segments hold the latest state of their athletes,
+            # which is what self.state has for them
+            merged = self._write_segment(keys, rows,
+                                         np.union1d(older['athletes'], newer['athletes']))
+            self._commit(self._segments[:-2] + [merged], self.num_rows)
+
+
+def register(subparsers):
+    parser = subparsers.add_parser(
+        'store',
+        help='Add daily metrics to the on-disk feature store or read from it',
+        description='Append-only, memory-mapped feature store indexed by (athlete, date)'
+    )
+    parser.add_argument('-s', '--store', default=DEFAULT_STORE,
+                        help=f'Store directory (default: {DEFAULT_STORE})')
+    parser.add_argument('-i', '--input',
+                        help='CSV with date, tss, ctl, atl, tsb [, athlete_id] to append')
+    parser.add_argument('--export', metavar='NPY',
+                        help='Write all stored features as an (N, 15) float32 .npy')
+    parser.add_argument('--lookup', nargs=2, metavar=('ATHLETE', 'DATE'),
+                        help='Print the features of one athlete and date')
+    parser.set_defaults(func=run)
+
+
+def run(args) -> int:
+    if args.input and not os.path.exists(args.input):
+        print(f"❌ Input file not found: {args.input}")
+        return 1
+
+    try:
+        store = FeatureStore(args.store)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+
+    if args.input:
+        print(f"📂 Loading daily metrics from {args.input}...")
+        try:
+            result = store.append(**load_daily_metrics(args.input))
+        except ValueError as e:
+            print(f"❌ {e}")
+            return 1
+        print(f"✅ Added {result['added']} day(s), skipped {result['skipped']} already stored, "
+              f"{result['new_athletes']} new athlete(s)")
+
+    print(f"🗄️  {args.store}: {store.num_rows:,} rows, {len(store.athlete_ids)} athlete(s)")
+
+    if args.lookup:
+        athlete, date = args.lookup
+        try:
+            row = store.get([athlete], [date])[0]
+        except KeyError as e:
+            print(f"❌ {e.args[0]}")
+            return 1
+        for name, value in zip(FEATURE_NAMES, row):
+            print(f"   {name:<10} {value:12.4f}")
+
+    if args.export:
+        np.save(args.export, store.matrix())
+        print(f"📤 Feature matrix saved to: {args.export}")
+    return 0
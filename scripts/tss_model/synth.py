@@ -0,0 +1,231 @@
+"""
+Seeded synthetic athlete histories for load and scale testing.
+
+Athletes are generated in fixed blocks of BLOCK_ATHLETES. Each block draws
+from its own stream, np.random.default_rng([seed, block]), so the output
+depends only on the seed and the athlete count. It does not depend on how
+much is written at a time. Every block is one (athletes, days) array
+operation. Daily TSS combines:
+
+    level        per-athlete typical TSS (lognormal) with a slow yearly trend
+    week         short weekday rides, one long weekend day, a preferred rest day
+    blocks       3 or 4 week mesocycles: building weeks, then a recovery week
+    season       yearly cycle peaking in the athlete's summer (date-based, so
+                 it lines up with the mon_sin/mon_cos features)
+    breaks       illness/vacation gaps of 3-14 days, about twice a year
+    noise        gamma-distributed day-to-day variation, random rest days
+
+CTL/ATL/TSB come from the same EMA as backfill (alpha = 2 / (N + 1)),
+starting from 0 on each athlete's first day. A backfill of the generated
+TSS therefore reproduces them. Rows are grouped by athlete, then date (the
+layout compute_features expects). They are written block by block, as
+.npy columns in a directory or as Parquet row groups.
+"""
+
+import os
+import time
+
+import numpy as np
+
+from .backfill import ATL_DAYS, CTL_DAYS, ema_alpha, ema_filter
+
+BLOCK_ATHLETES = 1024
+DEFAULT_OUTPUT = 'synthetic-athletes'
+DEFAULT_START = '2021-01-01'
+COLUMNS = ('athlete_id', 'date', 'tss', 'ctl', 'atl', 'tsb')
+
+# Day of the week as in features.py / JS getDay(): 0 = Sunday
+_EPOCH_WEEKDAY = 4
+BREAKS_PER_YEAR = 2.0
+MAX_TSS = 450
+
+
+def generate_block(block: int, athletes: int, days: int, seed: int = 0,
+                   start: str = DEFAULT_START) -> dict:
+    """
+    Daily metrics of `athletes` athletes (ids from block * BLOCK_ATHLETES)
+    over `days` days, as flat athlete-major columns.
+    """
+    rng = np.random.default_rng([seed, block])
+    shape = (athletes, days)
+    day = np.arange(days)
+
+    # Per-athlete parameters
+    level = rng.lognormal(np.log(55), 0.45, athletes)
+    trend = rng.normal(0.05, 0.1, athletes)                  # log-change per year
+    rest_rate = rng.uniform(0.08, 0.3, athletes)
+    rest_day = rng.integers(0, 7, athletes)
+    long_day = np.where(rng.random(athletes) < 0.7, 6, 0)    # Saturday or Sunday
+    long_ratio = rng.uniform(1.5, 2.3, athletes)
+    cycle_weeks = rng.integers(3, 5, athletes)
+    cycle_phase = rng.integers(0, 28, athletes)
+    season_amplitude = rng.uniform(0.1, 0.45, athletes)
+    season_peak = np.where(rng.random(athletes) < 0.9, 190, 5) + rng.integers(-30, 31, athletes)
+
+    first_day = (np.datetime64(start, 'D').astype(np.int64)
+                 + rng.integers(0, 365, athletes))
+    day_number = first_day[:, None] + day                   # (athletes, days)
+    dates = day_number.astype('datetime64[D]')
+
+    # Weekly rhythm
+    weekday = (day_number + _EPOCH_WEEKDAY) % 7
+    weekly = np.where(weekday == long_day[:, None], long_ratio[:, None], 0.85)
+
+    # Mesocycles: the load builds over the weeks of a block, the last week recovers
+    week_in_cycle = ((day + cycle_phase[:, None]) // 7) % cycle_weeks[:, None]
+    recovery = week_in_cycle == cycle_weeks[:, None] - 1
+    periodization = np.where(recovery, 0.6, 0.9 + 0.1 * week_in_cycle)
+
+    # Seasonality on the calendar day of the year
+    day_of_year = (dates - dates.astype('datetime64[Y]')).astype(np.int64)
+    season = 1 + season_amplitude[:, None] * np.cos(
+        2 * np.pi * (day_of_year - season_peak[:, None]) / 365.25)
+    progression = np.exp(trend[:, None] * day / 365.25)
+
+    tss = (level[:, None] * weekly * periodization * season * progression
+           * rng.gamma(4.0, 0.25, shape))
+
+    # Rest days (mostly on the preferred day) and multi-day breaks
+    rest_chance = np.where(weekday == rest_day[:, None], 0.75, rest_rate[:, None])
+    rest = rng.random(shape) < rest_chance
+    starts = rng.random(shape) < BREAKS_PER_YEAR / 365
+    until = np.where(starts, day + rng.integers(3, 15, shape), 0)
+    in_break = np.maximum.accumulate(until, axis=1) > day
+    tss = np.where(rest | in_break, 0.0, np.minimum(np.round(tss), MAX_TSS))
+
+    # EMAs day-major over all athletes of the block
+    ctl = ema_filter(tss.T, ema_alpha(CTL_DAYS)).T
+    atl = ema_filter(tss.T, ema_alpha(ATL_DAYS)).T
+
+    ids = block * BLOCK_ATHLETES + np.arange(athletes, dtype=np.int64)
+    return {
+        'athlete_id': np.repeat(ids, days),
+        'date': dates.ravel(),
+        'tss': tss.ravel(),
+        'ctl': ctl.ravel(),
+        'atl': atl.ravel(),
+        'tsb': (ctl - atl).ravel(),
+    }
+
+
+def iter_blocks(athletes: int, days: int, seed: int = 0, start: str = DEFAULT_START):
+    """Yield generate_block results covering athletes 0 .. athletes - 1."""
+    for block, first in enumerate(range(0, athletes, BLOCK_ATHLETES)):
+        yield generate_block(block, min(BLOCK_ATHLETES, athletes - first), days, seed, start)
+
+
+class ColumnWriter:
+    """Generated blocks as one .npy file per column in a directory."""
+
+    def __init__(self, directory: str, features: bool = False):
+        from .features import FEATURE_NAMES
+        from .matrix_io import NpyAppender
+
+        os.makedirs(directory, exist_ok=True)
+        dtypes = {'athlete_id': np.int64, 'date': 'datetime64[D]'}
+        self._columns = {name: NpyAppender(os.path.join(directory, f'{name}.npy'),
+                                           dtypes.get(name, np.float64))
+                         for name in COLUMNS}
+        self._features = (NpyAppender(os.path.join(directory, 'features.npy'), np.float32,
+                                      (len(FEATURE_NAMES),)) if features else None)
+
+    def write(self, data: dict, features: np.ndarray = None):
+        for name, appender in self._columns.items():
+            appender.write(data[name])
+        if self._features is not None:
+            self._features.write(features)
+
+    def close(self):
+        for appender in self._columns.values():
+            appender.close()
+        if self._features is not None:
+            self._features.close()
+
+
+class ParquetRowGroupWriter:
+    """Generated blocks as row groups of one Parquet file."""
+
+    def __init__(self, path: str, features: bool = False):
+        self.path = path
+        self.features = features
+        self._writer = None
+
+    def write(self, data: dict, features: np.ndarray = None):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        from .features import FEATURE_NAMES
+
+        columns = dict(data)
+        if self.features:
+            columns.update({name: features[:, i] for i, name in enumerate(FEATURE_NAMES)})
+        table = pa.table(columns)
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.path, table.schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def generate(output: str, athletes: int, days: int, seed: int = 0, start: str = DEFAULT_START,
+             features: bool = False) -> dict:
+    """Generate and write all blocks; returns row count and timings."""
+    from .features import compute_features
+
+    writer = (ParquetRowGroupWriter(output, features) if output.endswith('.parquet')
+              else ColumnWriter(output, features))
+    started = time.perf_counter()
+    rows = 0
+    try:
+        for data in iter_blocks(athletes, days, seed, start):
+            matrix = None
+            if features:
+                matrix = compute_features(
+                    data['date'], data['tss'], data['ctl'], data['atl'], data['tsb'],
+                    athlete_ids=data['athlete_id']).astype(np.float32)
+            writer.write(data, matrix)
+            rows += len(data['tss'])
+    finally:
+        writer.close()
+    seconds = time.perf_counter() - started
+    return {'rows': rows, 'seconds': seconds,
+            'rows_per_second': rows / seconds if seconds > 0 else 0.0}
+
+
+def register(subparsers):
+    parser = subparsers.add_parser(
+        'synth',
+        help='Generate synthetic athlete histories for load testing',
+        description='Generate seeded multi-year daily TSS/CTL/ATL/TSB histories with weekly, '
+                    'mesocycle and seasonal structure, written block by block'
+    )
+    parser.add_argument('-o', '--output', default=DEFAULT_OUTPUT,
+                        help=f'Directory of .npy columns, or a .parquet file '
+                             f'(default: {DEFAULT_OUTPUT})')
+    parser.add_argument('--athletes', type=int, default=100_000,
+                        help='Number of athletes (default: 100,000)')
+    parser.add_argument('--years', type=float, default=3,
+                        help='History length per athlete in years (default: 3)')
+    parser.add_argument('--start', default=DEFAULT_START,
+                        help=f'Earliest first day; each athlete starts within a year of it '
+                             f'(default: {DEFAULT_START})')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+    parser.add_argument('--features', action='store_true',
+                        help='Also write the 15 model features of every row')
+    parser.set_defaults(func=run)
+
+
+def run(args) -> int:
+    days = int(round(args.years * 365))
+    if args.athletes < 1 or days < 1:
+        print("❌ Need at least one athlete and one day")
+        return 1
+
+    print(f"🧪 Generating {args.athletes:,} athletes × {days:,} days "
+          f"({args.athletes * days:,} rows, seed {args.seed})...")
+    stats = generate(args.output, args.athletes, days, args.seed, args.start, args.features)
+    print(f"✅ {stats['rows']:,} rows written to {args.output} in {stats['seconds']:.1f}s "
+          f"({stats['rows_per_second']:,.0f} rows/s)")
+    return 0
@@ -0,0 +1,252 @@
+"""
+Train the TSS model from exported daily metrics.
+
+Builds the 15-feature matrix with the feature engine (row i predicts day
+i's TSS from the days before it), holds out the most recent days of every
+athlete for early stopping and trains with XGBoost's multithreaded `hist`
+tree method on a QuantileDMatrix, which bins the features once instead of
+keeping a second float copy of the matrix. The model is saved in XGBoost's
+native JSON format and can go straight into `convert`.
+
+Every stage is timed and the process's peak RSS is reported, so a weekly
+retrain can be checked against its time budget.
+"""
+
+import json
+import os
+import time
+
+import numpy as np
+
+from .features import FEATURE_NAMES, compute_features, load_daily_metrics, segment_starts
+from .profiling import peak_rss_mb
+
+DEFAULT_MODEL_OUTPUT = 'model_tss_predictor.json'
+DEFAULT_VALIDATION_DAYS = 28
+DEFAULT_ROUNDS = 2000
+DEFAULT_EARLY_STOPPING = 50
+
+DEFAULT_PARAMS = {
+    'objective': 'reg:squarederror',
+    'eval_metric': 'rmse',
+    'tree_method': 'hist',
+    'max_depth': 6,
+    'eta': 0.05,
+    'subsample': 0.8,
+    'colsample_bytree': 0.8,
+    'min_child_weight': 5,
+    'max_bin': 256,
+}
+
+
+def training_data(dates, tss, ctl, atl, tsb, athlete_ids=None, min_history: int = 1) -> dict:
+    """
+    Features and targets for every day with at least min_history earlier
+    days of the same athlete. Returns X (float32), y (float32), dates and
+    athlete_ids (None for a single athlete).
+    """
+    dates = np.asarray(dates, dtype='datetime64[D]')
+    features = compute_features(dates, tss, ctl, atl, tsb, athlete_ids)
+    n = len(features)
+    keep = np.arange(n) - segment_starts(athlete_ids, n) >= min_history
+
+    return {
+        'X': features[keep].astype(np.float32),
+        'y': np.nan_to_num(np.asarray(tss, dtype=np.float64))[keep].astype(np.float32),
+        'dates': dates[keep],
+        'athlete_ids': None if athlete_ids is None else np.asarray(athlete_ids)[keep],
+    }
+
+
+def days_before_end(dates: np.ndarray, athlete_ids=None) -> np.ndarray:
+    """Days from each row to its athlete's last date (rows grouped by athlete, sorted by date)."""
+    day = np.asarray(dates, dtype='datetime64[D]').astype(np.int64)
+    starts = segment_starts(athlete_ids, len(day))
+    is_start = np.ones(len(day), dtype=bool)
+    is_start[1:] = starts[1:] != starts[:-1]
+    last_day = np.maximum.reduceat(day, np.flatnonzero(is_start))[np.cumsum(is_start) - 1]
+    return last_day - day
+
+
+def time_split(dates: np.ndarray, validation_days: int, athlete_ids=None) -> np.ndarray:
+    """Boolean mask of the validation rows: each athlete's last validation_days calendar days."""
+    return days_before_end(dates, athlete_ids) < validation_days
+
+
+def train_model(X: np.ndarray, y: np.ndarray, validation: np.ndarray = None, params: dict = None,
+                num_boost_round: int = DEFAULT_ROUNDS,
+                early_stopping_rounds: int = DEFAULT_EARLY_STOPPING, threads: int = 0) -> tuple:
+    """
+    Train on the rows outside the validation mask, stopping early on the
+    validation RMSE. threads=0 uses every core. Returns (booster, report).
+    """
+    import xgboost as xgb
+
+    params = {**DEFAULT_PARAMS, **(params or {}), 'nthread': threads or os.cpu_count()}
+    report = {'params': params, 'stages': {}}
+
+    # No feature_names: onnxmltools only accepts XGBoost's default f0..f14,
+    # the order lives in model_features.json
+    t0 = time.perf_counter()
+    if validation is not None and validation.any():
+        train = ~validation
+        dtrain = xgb.QuantileDMatrix(X[train], y[train], max_bin=params['max_bin'],
+                                     nthread=params['nthread'])
+        dvalid = xgb.QuantileDMatrix(X[validation], y[validation], ref=dtrain,
+                                     nthread=params['nthread'])
+        evals = [(dtrain, 'train'), (dvalid, 'validation')]
+    else:
+        dtrain = xgb.QuantileDMatrix(X, y, max_bin=params['max_bin'], nthread=params['nthread'])
+        evals, early_stopping_rounds = [(dtrain, 'train')], None
+    report['stages']['dmatrix_seconds'] = time.perf_counter() - t0
+    report['train_rows'] = dtrain.num_row()
+    report['validation_rows'] = int(validation.sum()) if validation is not None else 0
+
+    t0 = time.perf_counter()
+    history = {}
+    booster = xgb.train(params, dtrain, num_boost_round=num_boost_round, evals=evals,
+                        early_stopping_rounds=early_stopping_rounds, evals_result=history,
+                        verbose_eval=False)
+    report['stages']['train_seconds'] = time.perf_counter() - t0
+
+    report['rounds'] = booster.num_boosted_rounds()
+    if early_stopping_rounds:
+        report['best_iteration'] = booster.best_iteration
+    if 'validation' in history:
+        index = booster.best_iteration if early_stopping_rounds else -1
+        report['validation_metrics'] = {name: float(values[index])
+                                        for name, values in history['validation'].items()}
+        report['validation_rmse'] = report['validation_metrics']['rmse']
+    report['train_rmse'] = float(history['train']['rmse'][-1])
+    return booster, report
+
+
+def save_model(booster, path: str):
+    """
+    Save in XGBoost's native JSON format, trimmed to the best iteration when
+    early stopping ran (convert exports every tree in the file).
+    """
+    best = getattr(booster, 'best_iteration', None)
+    if best is not None and best + 1 < booster.num_boosted_rounds():
+        booster = booster[:best + 1]
+    booster.save_model(path)
+
+
+def features_path_for(model_path: str) -> str:
+    """Feature list JSON written next to a trained model."""
+    stem = model_path[:-len('.json')] if model_path.endswith('.json') else model_path
+    return f'{stem}.features.json'
+
+
+def register(subparsers):
+    parser = subparsers.add_parser(
+        'train',
+        help='Train the XGBoost model from daily metrics',
+        description='Build features from exported daily metrics, train with hist and early '
+                    'stopping, and save a native XGBoost JSON model'
+    )
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('-i', '--input', help='CSV with date, tss, ctl, atl, tsb [, athlete_id]')
+    source.add_argument('--simulate', type=int, metavar='ATHLETES',
+                        help='Train on a simulated season for this many athletes')
+    parser.add_argument('-o', '--output', default=DEFAULT_MODEL_OUTPUT,
+                        help=f'Native XGBoost JSON model (default: {DEFAULT_MODEL_OUTPUT})')
+    parser.add_argument('--features-output',
+                        help='Feature list JSON for convert (default: <output>.features.json, '
+                             'so the tracked model_features.json is left alone)')
+    parser.add_argument('--validation-days', type=int, default=DEFAULT_VALIDATION_DAYS,
+                        help=f'Most recent days held out for early stopping '
+                             f'(default: {DEFAULT_VALIDATION_DAYS}, 0 to disable)')
+    parser.add_argument('--rounds', type=int, default=DEFAULT_ROUNDS,
+                        help=f'Maximum boosting rounds (default: {DEFAULT_ROUNDS})')
+    parser.add_argument('--early-stopping', type=int, default=DEFAULT_EARLY_STOPPING,
+                        help=f'Stop after this many rounds without improvement '
+                             f'(default: {DEFAULT_EARLY_STOPPING})')
+    parser.add_argument('--max-depth', type=int, default=DEFAULT_PARAMS['max_depth'])
+    parser.add_argument('--eta', type=float, default=DEFAULT_PARAMS['eta'])
+    parser.add_argument('--threads', type=int, default=0,
+                        help='Training threads (default: all cores)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--onnx', metavar='PATH',
+                        help='Also convert the trained model to ONNX at PATH')
+    parser.add_argument('-r', '--report', help='Write the training report (JSON) here')
+    parser.set_defaults(func=run)
+
+
+def run(args) -> int:
+    if args.input and not os.path.exists(args.input):
+        print(f"❌ Input file not found: {args.input}")
+        return 1
+
+    print("🏋️  TSS model training")
+    print("=" * 50)
+    started = time.perf_counter()
+    stages = {}
+
+    t0 = time.perf_counter()
+    if args.input:
+        print(f"📂 Loading daily metrics from {args.input}...")
+        data = load_daily_metrics(args.input)
+    else:
+        from .parity import simulate_daily_metrics
+        print(f"🧬 Simulating a season for {args.simulate} athlete(s)...")
+        data = simulate_daily_metrics(args.simulate, seed=args.seed)
+    stages['load_seconds'] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    dataset = training_data(**data)
+    stages['features_seconds'] = time.perf_counter() - t0
+    print(f"   - Feature matrix {dataset['X'].shape} in {stages['features_seconds']:.1f}s")
+    if len(dataset['y']) == 0:
+        print("❌ No training rows (every athlete needs at least two days)")
+        return 1
+
+    validation = (time_split(dataset['dates'], args.validation_days, dataset['athlete_ids'])
+                  if args.validation_days else None)
+    print(f"🔧 Training (hist, up to {args.rounds} rounds, early stopping {args.early_stopping})...")
+    booster, report = train_model(
+        dataset['X'], dataset['y'], validation,
+        params={'max_depth': args.max_depth, 'eta': args.eta, 'seed': args.seed},
+        num_boost_round=args.rounds, early_stopping_rounds=args.early_stopping,
+        threads=args.threads,
+    )
+    stages.update(report['stages'])
+
+    t0 = time.perf_counter()
+    features_output = args.features_output or features_path_for(args.output)
+    save_model(booster, args.output)
+    with open(features_output, 'w') as f:
+        json.dump({'features': FEATURE_NAMES}, f, indent=2)
+    stages['save_seconds'] = time.perf_counter() - t0
+
+    rounds = report.get('best_iteration', report['rounds'] - 1) + 1
+    print(f"✅ Model saved to: {args.output} ({rounds} trees), features to {features_output}")
+    if 'validation_rmse' in report:
+        print(f"   - Validation RMSE: {report['validation_rmse']:.2f} TSS "
+              f"({report['validation_rows']} rows), train RMSE {report['train_rmse']:.2f}")
+
+    if args.onnx:
+        from .convert import convert_model
+
+        t0 = time.perf_counter()
+        print()
+        convert_model(model_path=args.output, features_path=features_output,
+                      output_path=args.onnx)
+        stages['convert_seconds'] = time.perf_counter() - t0
+
+    report['stages'] = stages
+    report['total_seconds'] = time.perf_counter() - started
+    report['peak_rss_mb'] = peak_rss_mb()
+    report['rows'] = len(dataset['y'])
+
+    print(f"\n⏱️  Total {report['total_seconds']:.1f}s: "
+          + ", ".join(f"{name.removesuffix('_seconds')} {seconds:.1f}s"
+                      for name, seconds in stages.items()))
+    if report['peak_rss_mb'] is not None:
+        print(f"   Peak memory: {report['peak_rss_mb']:.0f} MB")
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"📋 Report saved to: {args.report}")
+    return 0
@@ -0,0 +1,340 @@
+"""
+Hyperparameter search with time-series folds, run on a process pool.
+
+The feature matrix is built once and saved as .npy files in the work
+directory; every worker memory-maps them instead of rebuilding features.
+Folds are expanding windows per athlete: fold k validates on a block of
+each athlete's days and trains on everything before it, so no trial sees
+the future.
+
+Finished trials are cached as JSON in <work_dir>/trials, keyed by the
+dataset, the parameters and the folds, so an interrupted search resumes
+where it stopped. Besides accuracy, each candidate's single-row ONNX
+latency and file size are reported, because a deeper or larger forest
+makes every predictTSS call slower. Workers only train and save the last
+fold's model; latency is measured afterwards in the parent, one model at a
+time, so it is not skewed by trials still training on the other cores.
+"""
+
+import hashlib
+import itertools
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from . import __version__
+from .cache import _atomic_write
+from .train import DEFAULT_PARAMS, days_before_end, train_model, training_data
+
+DEFAULT_WORK_DIR = '.tuning'
+DEFAULT_FOLDS = 3
+DEFAULT_FOLD_DAYS = 28
+DEFAULT_GRID = {
+    'max_depth': [4, 6, 8],
+    'eta': [0.05, 0.1],
+    'n_estimators': [200, 500],
+    'subsample': [0.8, 1.0],
+}
+COST_BACKEND = 'onnxmltools-fixed'
+# Part of the trial key: trials timed under load by older versions are redone
+COST_VERSION = 2
+
+
+def materialize(load, work_dir: str, source: str) -> dict:
+    """
+    Save features, targets and days-before-end as .npy in work_dir, unless
+    they were already built from the same source. load() returns the daily
+    metrics and is only called when the matrix has to be built. Returns the
+    dataset info ('reused' tells whether the files were already there).
+    """
+    info_path = os.path.join(work_dir, 'dataset.json')
+    if os.path.exists(info_path):
+        with open(info_path, 'r') as f:
+            info = json.load(f)
+        if info['source'] == source:
+            return {**info, 'reused': True}
+
+    os.makedirs(work_dir, exist_ok=True)
+    dataset = training_data(**load())
+    np.save(os.path.join(work_dir, 'X.npy'), dataset['X'])
+    np.save(os.path.join(work_dir, 'y.npy'), dataset['y'])
+    np.save(os.path.join(work_dir, 'age.npy'),
+            days_before_end(dataset['dates'], dataset['athlete_ids']).astype(np.int32))
+
+    info = {'source': source, 'rows': len(dataset['y']),
+            'fingerprint': hashlib.sha256(f"{source}:{__version__}".encode()).hexdigest()}
+    _atomic_write(info_path, json.dumps(info, indent=2).encode('utf-8'))
+    return {**info, 'reused': False}
+
+
+def fold_masks(age: np.ndarray, folds: int, fold_days: int) -> list:
+    """
+    (train, validation) masks, oldest fold first. Fold k validates on the
+    days [folds-k-1, folds-k) * fold_days before each athlete's last day and
+    trains on the days before those.
+    """
+    masks = []
+    for k in range(folds):
+        newest = (folds - k - 1) * fold_days
+        oldest = newest + fold_days
+        masks.append((age >= oldest, (age >= newest) & (age < oldest)))
+    return masks
+
+
+def parameter_grid(grid: dict, trials: int = None, seed: int = 0) -> list:
+    """Every combination of grid values, or a seeded sample of `trials` of them."""
+    names = sorted(grid)
+    combinations = [dict(zip(names, values))
+                    for values in itertools.product(*(grid[name] for name in names))]
+    if trials and trials < len(combinations):
+        rng = np.random.default_rng(seed)
+        combinations = [combinations[i] for i in sorted(rng.choice(len(combinations), trials,
+                                                                    replace=False))]
+    return combinations
+
+
+def trial_key(fingerprint: str, params: dict, folds: int, fold_days: int) -> str:
+    encoded = json.dumps({'dataset': fingerprint, 'params': params, 'folds': folds,
+                          'fold_days': fold_days, 'cost': COST_VERSION},
+                         sort_keys=True).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def inference_cost(booster, num_features: int, repeats_seconds: float = 0.3) -> dict:
+    """Single-row and batch latency of the model converted to ONNX (one thread)."""
+    from .backends import get_backend
+    from .bench import measure, summarize
+    from .runtime import create_session, session_predictor
+
+    spec = get_backend(COST_BACKEND)
+    with tempfile.TemporaryDirectory() as work_dir:
+        onnx_path = os.path.join(work_dir, 'model.onnx')
+        with open(onnx_path, 'wb') as f:
+            f.write(spec.convert(booster, num_features, spec.default_opset, work_dir))
+        predict = session_predictor(create_session(onnx_path, threads=1))
+        size_bytes = os.path.getsize(onnx_path)
+
+    rng = np.random.default_rng(0)
+    X = (rng.random((1000, num_features)) * 300).astype(np.float32)
+    single = summarize(measure(predict, X[:1], min_time=repeats_seconds), 1)
+    batch = summarize(measure(predict, X, min_time=repeats_seconds), len(X))
+    return {
+        'backend': COST_BACKEND,
+        'size_bytes': size_bytes,
+        'single_row_p50_ms': single['p50_ms'],
+        'single_row_p99_ms': single['p99_ms'],
+        'batch_rows_per_second': batch['rows_per_second'],
+    }
+
+
+def run_trial(work_dir: str, params: dict, folds: int, fold_days: int, threads: int = 1,
+              model_path: str = None) -> dict:
+    """
+    Cross-validate one parameter set on the memory-mapped dataset (runs in a
+    worker). The last fold's model, which has seen the most data and is the
+    closest to the final model, is saved to model_path for inference_cost.
+    """
+    X = np.load(os.path.join(work_dir, 'X.npy'), mmap_mode='r')
+    y = np.load(os.path.join(work_dir, 'y.npy'), mmap_mode='r')
+    age = np.load(os.path.join(work_dir, 'age.npy'), mmap_mode='r')
+
+    params = dict(params)
+    rounds = params.pop('n_estimators')
+    params['eval_metric'] = ['mae', 'rmse']
+
+    started = time.perf_counter()
+    scores = []
+    for train, validation in fold_masks(age, folds, fold_days):
+        if not train.any() or not validation.any():
+            continue
+        rows = train | validation
+        booster, report = train_model(X[rows], y[rows], validation[rows], params,
+                                      num_boost_round=rounds, early_stopping_rounds=None,
+                                      threads=threads)
+        scores.append(report['validation_metrics'])
+    if not scores:
+        raise ValueError("No fold has both training and validation rows; use fewer or shorter folds")
+
+    if model_path:
+        booster.save_model(model_path)
+    return {
+        'rmse': float(np.mean([s['rmse'] for s in scores])),
+        'mae': float(np.mean([s['mae'] for s in scores])),
+        'fold_rmse': [s['rmse'] for s in scores],
+        'train_seconds': time.perf_counter() - started,
+        'inference': None,
+    }
+
+
+def pareto_front(results: list) -> list:
+    """Indices of results not beaten on both RMSE and single-row latency."""
+    front = []
+    for i, a in enumerate(results):
+        dominated = any(
+            b['rmse'] <= a['rmse'] and
+            b['inference']['single_row_p50_ms'] <= a['inference']['single_row_p50_ms'] and
+            (b['rmse'] < a['rmse'] or
+             b['inference']['single_row_p50_ms'] < a['inference']['single_row_p50_ms'])
+            for b in results
+        )
+        if not dominated:
+            front.append(i)
+    return front
+
+
+def search(work_dir: str, fingerprint: str, candidates: list, folds: int = DEFAULT_FOLDS,
+           fold_days: int = DEFAULT_FOLD_DAYS, workers: int = None, threads: int = 1) -> list:
+    """
+    Run every candidate not already in the trial cache on a process pool,
+    then measure the inference cost of the new models one at a time.
+    Returns one result per candidate (cached or new), in candidate order.
+    """
+    from .model_io import load_model
+
+    trial_dir = os.path.join(work_dir, 'trials')
+    os.makedirs(trial_dir, exist_ok=True)
+
+    results = [None] * len(candidates)
+    paths = {}
+    pending = []
+    for i, params in enumerate(candidates):
+        key = trial_key(fingerprint, params, folds, fold_days)
+        paths[i] = (os.path.join(trial_dir, f'{key}.json'),
+                    os.path.join(trial_dir, f'{key}.model.json'))
+        if os.path.exists(paths[i][0]):
+            with open(paths[i][0], 'r') as f:
+                cached = json.load(f)
+            # A trained trial whose cost was not measured yet still has its model
+            if cached['inference'] is not None or os.path.exists(paths[i][1]):
+                results[i] = {**cached, 'cached': True}
+                continue
+        pending.append(i)
+
+    if pending:
+        print(f"🚀 Running {len(pending)} trial(s), {len(candidates) - len(pending)} cached...")
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(run_trial, work_dir, candidates[i], folds, fold_days, threads,
+                                   paths[i][1]): i
+                       for i in pending}
+            for future in as_completed(futures):
+                i = futures[future]
+                result = {'params': candidates[i], **future.result()}
+                _atomic_write(paths[i][0], json.dumps(result, indent=2).encode('utf-8'))
+                results[i] = {**result, 'cached': False}
+                print(f"   ✓ {_describe(candidates[i])}: RMSE {result['rmse']:.2f}")
+
+    unmeasured = [i for i, result in enumerate(results) if result['inference'] is None]
+    if unmeasured:
+        print(f"⏱️  Measuring inference cost of {len(unmeasured)} model(s), one at a time...")
+        num_features = np.load(os.path.join(work_dir, 'X.npy'), mmap_mode='r').shape[1]
+        for i in unmeasured:
+            result_path, model_path = paths[i]
+            results[i]['inference'] = inference_cost(load_model(model_path), num_features)
+            stored = {key: value for key, value in results[i].items() if key != 'cached'}
+            _atomic_write(result_path, json.dumps(stored, indent=2).encode('utf-8'))
+            os.remove(model_path)
+            print(f"   ✓ {_describe(candidates[i])}: "
+                  f"{results[i]['inference']['single_row_p50_ms']:.3f} ms/row")
+    return results
+
+
+def _describe(params: dict) -> str:
+    return ' '.join(f'{name}={value}' for name, value in sorted(params.items()))
+
+
+def register(subparsers):
+    parser = subparsers.add_parser(
+        'tune',
+        help='Hyperparameter search with time-series folds',
+        description='Grid or random search over XGBoost parameters on a process pool, '
+                    'reporting accuracy and inference cost per candidate'
+    )
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('-i', '--input', help='CSV with date, tss, ctl, atl, tsb [, athlete_id]')
+    source.add_argument('--simulate', type=int, metavar='ATHLETES',
+                        help='Search on a simulated season for this many athletes')
+    parser.add_argument('--work-dir', default=DEFAULT_WORK_DIR,
+                        help=f'Feature matrix and trial cache (default: {DEFAULT_WORK_DIR})')
+    for name, values in DEFAULT_GRID.items():
+        kind = float if isinstance(values[0], float) else int
+        parser.add_argument(f'--{name.replace("_", "-")}', type=kind, nargs='+', default=values,
+                            help=f'Values to try (default: {" ".join(map(str, values))})')
+    parser.add_argument('--trials', type=int,
+                        help='Sample this many combinations instead of the full grid')
+    parser.add_argument('--folds', type=int, default=DEFAULT_FOLDS)
+    parser.add_argument('--fold-days', type=int, default=DEFAULT_FOLD_DAYS,
+                        help=f'Validation days per fold and athlete (default: {DEFAULT_FOLD_DAYS})')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Worker processes (default: one per core)')
+    parser.add_argument('--threads', type=int, default=1,
+                        help='Training threads per worker (default: 1)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', help='Write the JSON report here')
+    parser.set_defaults(func=run)
+
+
+def run(args) -> int:
+    from .model_io import file_sha256
+
+    if args.input and not os.path.exists(args.input):
+        print(f"❌ Input file not found: {args.input}")
+        return 1
+
+    print("🎛️  Hyperparameter search")
+    print("=" * 50)
+
+    if args.input:
+        source = f'file:{file_sha256(args.input)}'
+    else:
+        source = f'simulate:{args.simulate}:{args.seed}'
+
+    def load():
+        if args.input:
+            from .features import load_daily_metrics
+            return load_daily_metrics(args.input)
+        from .parity import simulate_daily_metrics
+        return simulate_daily_metrics(args.simulate, seed=args.seed)
+
+    t0 = time.perf_counter()
+    info = materialize(load, args.work_dir, source)
+    print(f"📦 Feature matrix: {info['rows']:,} rows in {args.work_dir} "
+          f"({'reused' if info['reused'] else f'built in {time.perf_counter() - t0:.1f}s'})")
+
+    grid = {name: getattr(args, name) for name in DEFAULT_GRID}
+    candidates = parameter_grid(grid, args.trials, args.seed)
+    for params in candidates:
+        params['seed'] = args.seed
+    try:
+        results = search(args.work_dir, info['fingerprint'], candidates, args.folds,
+                         args.fold_days, args.workers, args.threads)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+
+    front = set(pareto_front(results))
+    order = sorted(range(len(results)), key=lambda i: results[i]['rmse'])
+    print(f"\n   {'':2} {'RMSE':>7} {'MAE':>7} {'ms/row':>8} {'KB':>7}  parameters")
+    for i in order:
+        r = results[i]
+        marker = '⭐' if i in front else '  '
+        cost = r['inference']
+        print(f"   {marker} {r['rmse']:7.2f} {r['mae']:7.2f} {cost['single_row_p50_ms']:8.3f} "
+              f"{cost['size_bytes'] / 1024:7.0f}  {_describe(r['params'])}")
+    print("   ⭐ = no other candidate is both more accurate and faster")
+
+    if args.output:
+        report = {
+            'dataset': info,
+            'folds': args.folds,
+            'fold_days': args.fold_days,
+            'base_params': DEFAULT_PARAMS,
+            'results': [{**results[i], 'pareto': i in front} for i in order],
+        }
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n📋 Report saved to: {args.output}")
+    return 0
@@ -0,0 +1,188 @@
+"""
+Persistent worker: runs tss_model commands sent as JSON lines.
+
+Each job runs in this process, so xgboost, onnxmltools, onnxruntime or
+Hummingbird are imported once, not once per job. Jobs come from stdin
+(responses on stdout) or from a local socket, and run one at a time.
+
+    job:      {"id": "v2-hb", "args": ["convert", "--backend", "hummingbird", "-o", "v2.onnx"]}
+    response: {"id": "v2-hb", "exit_code": 0, "seconds": 1.93, "output": "..."}
+    control:  {"command": "ping"}, {"command": "shutdown"}
+
+`args` is the same argument list as on the command line; the command's
+printed output is returned in `output` instead of being written to stdout.
+"""
+
+import importlib
+import io
+import json
+import os
+import socketserver
+import stat
+import sys
+import threading
+import time
+from contextlib import redirect_stderr, redirect_stdout
+
+from .backends import BACKENDS, DEFAULT_BACKEND
+
+
+def preload(backends: list) -> dict:
+    """Import the modules the given backends need; returns seconds per module (None if missing)."""
+    modules = dict.fromkeys(module for name in backends for module in BACKENDS[name].imports)
+    modules['onnxruntime'] = None          # used for validation by every backend
+    timings = {}
+    for module in modules:
+        t0 = time.perf_counter()
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            timings[module] = None
+            continue
+        timings[module] = time.perf_counter() - t0
+    return timings
+
+
+def run_job(job: dict) -> dict:
+    """Run one job in-process and return its response."""
+    from .cli import main
+
+    response = {'id': job.get('id')}
+    args = job.get('args')
+    if not isinstance(args, list) or not args or args[0] == 'worker':
+        return {**response, 'exit_code': 2, 'error': "'args' must be a tss_model command line"}
+
+    output = io.StringIO()
+    t0 = time.perf_counter()
+    try:
+        with redirect_stdout(output), redirect_stderr(output):
+            exit_code = main([str(arg) for arg in args])
+    except SystemExit as e:                 # argparse errors and --help
+        exit_code = e.code if isinstance(e.code, int) else 1
+    except Exception as e:
+        exit_code = 1
+        response['error'] = f'{type(e).__name__}: {e}'
+    response.update(exit_code=exit_code, seconds=time.perf_counter() - t0,
+                    output=output.getvalue())
+    return response
+
+
+class Worker:
+    """Parses request lines and serializes jobs across connections."""
+
+    def __init__(self):
+        self.jobs = 0
+        self.started = time.time()
+        self.stopping = threading.Event()
+        self._lock = threading.Lock()
+
+    def handle(self, line: str) -> dict:
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError('expected a JSON object')
+        except ValueError as e:
+            return {'error': f'Invalid request: {e}', 'exit_code': 2}
+
+        command = request.get('command')
+        if command == 'ping':
+            return {'id': request.get('id'), 'status': 'ok', 'jobs': self.jobs,
+                    'uptime_seconds': time.time() - self.started}
+        if command == 'shutdown':
+            self.stopping.set()
+            return {'id': request.get('id'), 'status': 'stopping'}
+
+        with self._lock:
+            self.jobs += 1
+            return run_job(request)
+
+    def serve_stream(self, infile, outfile):
+        """Answer one request per input line until EOF or shutdown."""
+        for line in infile:
+            if not line.strip():
+                continue
+            outfile.write(json.dumps(self.handle(line)) + '\n')
+            outfile.flush()
+            if self.stopping.is_set():
+                break
+
+    def make_server(self, socket_path: str = None, port: int = None):
+        """A threading socket server on a Unix socket path or 127.0.0.1:port."""
+        worker = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                stream = io.TextIOWrapper(self.wfile, encoding='utf-8', write_through=True)
+                worker.serve_stream(io.TextIOWrapper(self.rfile, encoding='utf-8'), stream)
+                stream.detach()
+                if worker.stopping.is_set():
+                    threading.Thread(target=self.server.shutdown, daemon=True).start()
+
+        if socket_path:
+            if os.path.lexists(socket_path):
+                # A stale socket from an earlier run is replaced; anything else is kept
+                if not _is_socket(socket_path):
+                    raise ValueError(f"{socket_path} exists and is not a socket")
+                os.unlink(socket_path)
+            return socketserver.ThreadingUnixStreamServer(socket_path, Handler)
+        return socketserver.ThreadingTCPServer(('127.0.0.1', port), Handler)
+
+
+def _is_socket(path: str) -> bool:
+    return stat.S_ISSOCK(os.lstat(path).st_mode)
+
+
+def register(subparsers):
+    parser = subparsers.add_parser(
+        'worker',
+        help='Run conversion jobs from stdin or a local socket in one warm process',
+        description='Persistent worker: reads JSON-line jobs ({"args": [...]}) and runs them '
+                    'without re-importing the conversion libraries'
+    )
+    listen = parser.add_mutually_exclusive_group()
+    listen.add_argument('--socket', metavar='PATH', help='Listen on a Unix socket')
+    listen.add_argument('--port', type=int, help='Listen on 127.0.0.1:PORT')
+    parser.add_argument('--preload', nargs='*', default=[DEFAULT_BACKEND],
+                        choices=sorted(BACKENDS), metavar='BACKEND',
+                        help=f'Import these backends before the first job '
+                             f'(default: {DEFAULT_BACKEND})')
+    parser.set_defaults(func=run)
+
+
+def run(args) -> int:
+    # Status lines go to stderr: in stdin mode stdout carries the responses
+    log = sys.stderr
+    timings = preload(args.preload)
+    loaded = [f"{module} {seconds:.1f}s" for module, seconds in timings.items()
+              if seconds is not None]
+    missing = [module for module, seconds in timings.items() if seconds is None]
+    print(f"🔥 Preloaded: {', '.join(loaded) or 'nothing'}", file=log)
+    if missing:
+        print(f"⚠️  Not installed: {', '.join(missing)}", file=log)
+
+    worker = Worker()
+    if not (args.socket or args.port):
+        print("👂 Reading jobs from stdin", file=log)
+        worker.serve_stream(sys.stdin, sys.stdout)
+        return 0
+
+    try:
+        server = worker.make_server(args.socket, args.port)
+    except (AttributeError, OSError, ValueError) as e:
+        print(f"❌ Cannot listen: {e}", file=log)
+        return 1
+    # Identifies the socket this process created, for the cleanup below
+    created = os.lstat(args.socket).st_ino if args.socket else None
+    where = args.socket or f"127.0.0.1:{args.port}"
+    print(f"👂 Listening on {where}", file=log)
+    try:
+        with server:
+            server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if (created is not None and os.path.lexists(args.socket) and _is_socket(args.socket)
+                and os.lstat(args.socket).st_ino == created):
+            os.unlink(args.socket)
+    print(f"👋 Worker stopped after {worker.jobs} job(s)", file=log)
+    return 0
@@ -0,0 +1,300 @@
+"""
+Bulk ZWO (Zwift / MyWhoosh workout) export of the workout library.
+
+Each FTP tier gets one zip pack with a .zwo file per workout. ZWO powers
+are fractions of FTP, so the steps are the same in every tier. The tier
+shows in the step names, the description and the tags as target watts.
+The XML follows buildZwoXML in src/lib/zwoGenerator.ts.
+
+Every tier runs in its own worker process, and each file is written into
+that tier's zip as soon as it is rendered, so no pack is held in memory.
+Zip entries have a fixed timestamp, so unchanged content gives an
+identical archive. The pack manifest stores a hash of each file's inputs
+(workout, tier, renderer version). A tier whose hashes all match, and
+whose archive is unchanged, is skipped without rendering.
+"""
+
+import hashlib
+import json
+import os
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .cache import _atomic_write
+from .library import DEFAULT_INTERVALS_LIBRARY, DEFAULT_WORKOUTS_DIR
+
+RENDERER_VERSION = 1
+DEFAULT_TIERS = tuple(range(150, 401, 25))
+DEFAULT_OUTPUT_DIR = 'zwo-packs'
+DEFAULT_AUTHOR = 'Adaptive Training System'
+MANIFEST_NAME = 'zwo-manifest.json'
+# Warmups ramp up from, and cooldowns down to, this fraction of FTP (as the presets do)
+RAMP_POWER = 0.50
+ZIP_DATE = (2020, 1, 1, 0, 0, 0)
+
+
+def _attr(value) -> str:
+    """Attribute value as JavaScript's String() would render it."""
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _esc(text: str) -> str:
+    return (text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+            .replace('"', '&quot;'))
+
+
+def _attrs(**values) -> str:
+    return ''.join(f' {key[0].upper() + key[1:]}="{_esc(_attr(value))}"'
+                   for key, value in values.items() if value is not None)
+
+
+def build_zwo_xml(title: str, steps: list, description: str = '', author: str = DEFAULT_AUTHOR,
+                  sport_type: str = 'bike', tags: list = ('Custom',)) -> str:
+    """ZWO document for steps given as (element, attributes) pairs."""
+    step_xml = '\n    '.join(f'<{element}{_attrs(**attributes)} />'
+                               for element, attributes in steps)
+    tag_xml = '\n    '.join(f'<tag name="{_esc(tag)}"/>' for tag in tags)
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<workout_file>
+  <author>{_esc(author)}</author>
+  <name>{_esc(title)}</name>
+  <description>{_esc(description)}</description>
+  <sportType>{sport_type}</sportType>
+  <tags>
+    {tag_xml}
+  </tags>
+  <workout>
+    {step_xml}
+  </workout>
+</workout_file>"""
+
+
+def _watts(power: float, ftp: int) -> int:
+    return round(power * ftp)
+
+
+def zwo_steps(segments: list, ftp: int) -> list:
+    """Compiled library segments (see library.py) as ZWO steps named with target watts."""
+    steps = []
+    for segment in segments:
+        label = segment.get('text') or segment['type'].capitalize()
+        cadence = segment.get('cadence')
+        kind = segment['type']
+        if kind in ('warmup', 'cooldown') and segment['intensity'] > RAMP_POWER:
+            low, high = RAMP_POWER, segment['intensity']
+            if kind == 'cooldown':
+                low, high = high, low
+            steps.append(('Warmup' if kind == 'warmup' else 'Cooldown', {
+                'duration': segment['duration_s'], 'powerLow': low, 'powerHigh': high,
+                'name': f'{label} ({_watts(low, ftp)}-{_watts(high, ftp)} W)',
+                'cadence': cadence}))
+        elif 'duration_s' in segment:
+            steps.append(('SteadyState', {
+                'duration': segment['duration_s'], 'power': segment['intensity'],
+                'name': f"{label} ({_watts(segment['intensity'], ftp)} W)", 'cadence': cadence}))
+        elif segment['rest_s']:
+            steps.append(('IntervalsT', {
+                'repeat': segment['repeats'], 'onDuration': segment['work_s'],
+                'offDuration': segment['rest_s'], 'onPower': segment['work_intensity'],
+                'offPower': segment['rest_intensity'],
+                'name': f"{label} ({_watts(segment['work_intensity'], ftp)} W)",
+                'cadence': cadence}))
+        else:
+            steps.append(('SteadyState', {
+                'duration': segment['repeats'] * segment['work_s'],
+                'power': segment['work_intensity'],
+                'name': f"{label} ({_watts(segment['work_intensity'], ftp)} W)",
+                'cadence': cadence}))
+    return steps
+
+
+def render_workout(workout: dict, ftp: int, author: str = DEFAULT_AUTHOR) -> str:
+    """ZWO document of one compiled workout (WorkoutLibrary.row) for one FTP."""
+    description = (f"{workout['name']} ({workout['category']}): "
+                   f"{workout['duration_s'] / 60:.0f} min, TSS {workout['tss']:.0f}, "
+                   f"IF {workout['if']:.2f}. Watts for FTP {ftp} W.")
+    return build_zwo_xml(workout['name'], zwo_steps(workout['segments'], ftp), description,
+                         author, tags=[workout['category'], f'FTP {ftp}W'])
+
+
+def entry_name(workout: dict) -> str:
+    return f"{workout['category'].lower()}/{workout['id']}.zwo"
+
+
+def entry_key(workout: dict, ftp: int, author: str = DEFAULT_AUTHOR) -> str:
+    """Hash of everything a rendered file depends on."""
+    inputs = {key: workout[key] for key in ('id', 'name', 'category', 'duration_s', 'tss', 'if',
+                                            'segments')}
+    encoded = json.dumps([RENDERER_VERSION, ftp, author, inputs], sort_keys=True)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def pack_name(ftp: int) -> str:
+    return f'zwo-ftp-{ftp}.zip'
+
+
+def export_tier(workouts: list, ftp: int, path: str, author: str = DEFAULT_AUTHOR) -> dict:
+    """Render every workout for one FTP straight into a zip at path (in a worker process)."""
+    from .model_io import file_sha256
+
+    t0 = time.perf_counter()
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        with zipfile.ZipFile(temp_path, 'w', zipfile.ZIP_DEFLATED) as pack:
+            for workout in workouts:
+                info = zipfile.ZipInfo(entry_name(workout), ZIP_DATE)
+                info.compress_type = zipfile.ZIP_DEFLATED
+                pack.writestr(info, render_workout(workout, ftp, author))
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+    return {'ftp': ftp, 'file': os.path.basename(path), 'files': len(workouts),
+            'sha256': file_sha256(path), 'sizeBytes': os.path.getsize(path),
+            'seconds': time.perf_counter() - t0}
+
+
+def load_manifest(path: str) -> dict:
+    if not os.path.exists(path):
+        return {'rendererVersion': RENDERER_VERSION, 'tiers': {}}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def plan_tiers(workouts: list, tiers: list, output_dir: str, manifest: dict,
+               author: str = DEFAULT_AUTHOR, force: bool = False) -> dict:
+    """Per tier: the entry hashes and how they differ from the manifest."""
+    from .model_io import file_sha256
+
+    plans = {}
+    for ftp in tiers:
+        entries = {entry_name(workout): entry_key(workout, ftp, author) for workout in workouts}
+        previous = manifest['tiers'].get(str(ftp), {})
+        old = previous.get('entries', {})
+        path = os.path.join(output_dir, pack_name(ftp))
+        unchanged_pack = (os.path.exists(path) and previous.get('sha256') == file_sha256(path))
+        plans[ftp] = {
+            'path': path,
+            'entries': entries,
+            'added': sum(name not in old for name in entries),
+            'changed': sum(name in old and old[name] != key for name, key in entries.items()),
+            'removed': sum(name not in entries for name in old),
+        }
+        plans[ftp]['skip'] = (not force and unchanged_pack
+                              and not any(plans[ftp][k] for k in ('added', 'changed', 'removed')))
+    return plans
+
+
+def export_packs(workouts: list, tiers: list, output_dir: str = DEFAULT_OUTPUT_DIR,
+                 workers: int = None, author: str = DEFAULT_AUTHOR, force: bool = False) -> list:
+    """
+    Write one pack per FTP tier in parallel, skipping tiers whose inputs and
+    archive are unchanged. Returns one summary per tier.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    manifest = load_manifest(manifest_path)
+    plans = plan_tiers(workouts, tiers, output_dir, manifest, author, force)
+
+    results = {}
+    for ftp, plan in plans.items():
+        if plan['skip']:
+            previous = manifest['tiers'][str(ftp)]
+            results[ftp] = {'ftp': ftp, 'file': previous['file'], 'files': len(plan['entries']),
+                            'sha256': previous['sha256'], 'sizeBytes': previous['sizeBytes'],
+                            'seconds': 0.0, 'skipped': True}
+
+    pending = [ftp for ftp, plan in plans.items() if not plan['skip']]
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(export_tier, workouts, ftp, plans[ftp]['path'], author): ftp
+                       for ftp in pending}
+            for future in as_completed(futures):
+                ftp = futures[future]
+                result = {**future.result(), 'skipped': False}
+                result.update({key: plans[ftp][key] for key in ('added', 'changed', 'removed')})
+                results[ftp] = result
+                manifest['tiers'][str(ftp)] = {
+                    'file': result['file'], 'sha256': result['sha256'],
+                    'sizeBytes': result['sizeBytes'], 'entries': plans[ftp]['entries'],
+                }
+                print(f"   ✓ FTP {ftp} W: {result['files']} files, "
+                      f"{result['sizeBytes'] / 1024:.0f} KB in {result['seconds']:.1f}s")
+
+    manifest['rendererVersion'] = RENDERER_VERSION
+    _atomic_write(manifest_path, json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    return [results[ftp] for ftp in tiers]
+
+
+def load_workouts(library_path: str = None, workouts_dir: str = DEFAULT_WORKOUTS_DIR,
+                  intervals_library: str = DEFAULT_INTERVALS_LIBRARY) -> tuple:
+    """Compiled workouts from the artifact or else the sources; returns (workouts, errors)."""
+    from .library import WorkoutLibrary, compile_library, read_sources
+
+    if library_path:
+        library = WorkoutLibrary.load(library_path)
+        errors = []
+    else:
+        artifact, report = compile_library(*read_sources(workouts_dir, intervals_library))
+        library = WorkoutLibrary(artifact)
+        errors = report['errors']
+    return [library.row(row) for row in range(len(library))], errors
+
+
+def register(subparsers):
+    parser = subparsers.add_parser(
+        'zwo',
+        help='Export the workout library as ZWO packs per FTP tier',
+        description='Render every workout for every FTP tier on a process pool, streaming '
+                    'each tier into a zip pack; unchanged tiers are skipped'
+    )
+    parser.add_argument('--library', default=None,
+                        help='Compiled library artifact (default: compile the sources)')
+    parser.add_argument('--workouts-dir', default=DEFAULT_WORKOUTS_DIR,
+                        help=f'Workout category files (default: {DEFAULT_WORKOUTS_DIR})')
+    parser.add_argument('--intervals-library', default=DEFAULT_INTERVALS_LIBRARY,
+                        help=f'Additional library file (default: {DEFAULT_INTERVALS_LIBRARY})')
+    parser.add_argument('--ftp', type=int, nargs='+', default=list(DEFAULT_TIERS),
+                        help='FTP tiers in watts (default: 150 to 400 in steps of 25)')
+    parser.add_argument('-o', '--output-dir', default=DEFAULT_OUTPUT_DIR,
+                        help=f'Directory for the packs and {MANIFEST_NAME} '
+                             f'(default: {DEFAULT_OUTPUT_DIR})')
+    parser.add_argument('--author', default=DEFAULT_AUTHOR)
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Worker processes (default: one per core)')
+    parser.add_argument('--force', action='store_true',
+                        help='Rewrite every pack even if nothing changed')
+    parser.set_defaults(func=run)
+
+
+def run(args) -> int:
+    source = args.library or os.path.join(args.workouts_dir, 'index.json')
+    if not os.path.exists(source):
+        print(f"❌ Workout library not found: {source}")
+        return 1
+
+    print("🚴 ZWO export")
+    print("=" * 50)
+    workouts, errors = load_workouts(args.library, args.workouts_dir, args.intervals_library)
+    for error in errors:
+        print(f"⚠️  Left out: {error}")
+    tiers = sorted(set(args.ftp))
+    print(f"📚 {len(workouts)} workouts x {len(tiers)} FTP tiers")
+
+    t0 = time.perf_counter()
+    results = export_packs(workouts, tiers, args.output_dir, args.workers, args.author,
+                           args.force)
+    written = [r for r in results if not r['skipped']]
+    print(f"\n✅ {len(written)} pack(s) written, {len(results) - len(written)} unchanged "
+          f"in {time.perf_counter() - t0:.1f}s")
+    for r in written:
+        print(f"   - {os.path.join(args.output_dir, r['file'])}: {r['added']} added, "
+              f"{r['changed']} changed, {r['removed']} removed")
+    print(f"📋 Manifest: {os.path.join(args.output_dir, MANIFEST_NAME)}")
+    return 0
@@ -24,7 +24,38 @@ try {
 
 const bucket = admin.storage().bucket();
 
-async function uploadFile(localPath, remotePath) {
+const MANIFEST_PATH = path.join(__dirname, 'model-manifest.json');
+
+/**
+ * Custom metadata for a model from the bundle manifest (written by
+ * `python -m tss_model convert`). The app compares sha256 with its cached
+ * copy via getMetadata() and reads the feature order from here, so it only
+ * downloads the .onnx when it changed.
+ */
+function bundleMetadata(localPath) {
+  if (!fs.existsSync(MANIFEST_PATH)) {
+    return undefined;
+  }
+  const manifest = JSON.parse(fs.readFileSync(MANIFEST_PATH, 'utf8'));
+  const entry = manifest.models[path.basename(localPath)];
+  if (!entry) {
+    return undefined;
+  }
+  const metadata = {
+    sha256: entry.sha256,
+    modelHash: entry.modelHash,
+    revision: String(entry.revision),
+    version: entry.version,
+    features: JSON.stringify(entry.features),
+  };
+  // Plain (non-bundle) conversions have no baseScore; do not upload "undefined"
+  if (entry.baseScore !== undefined) {
+    metadata.baseScore = String(entry.baseScore);
+  }
+  return metadata;
+}
+
+async function uploadFile(localPath, remotePath, customMetadata) {
   console.log(`\nUploading ${localPath} → ${remotePath}...`);
   
   try {
@@ -36,6 +67,7 @@ async function uploadFile(localPath, remotePath) {
       metadata: {
         contentType: remotePath.endsWith('.onnx') ? 'application/octet-stream' : 'application/json',
         cacheControl: 'public, max-age=3600',
+        metadata: customMetadata,
       }
     });
     
@@ -67,6 +99,11 @@ async function main() {
       remote: 'ml-models/tss-predictor-v1.json'
     }
   ];
+  if (fs.existsSync(MANIFEST_PATH)) {
+    files.push({ local: MANIFEST_PATH, remote: 'ml-models/model-manifest.json' });
+  } else {
+    console.warn('⚠️  No model-manifest.json: uploading the model without bundle metadata');
+  }
   
   // Check files exist
   for (const file of files) {
@@ -79,7 +116,8 @@ async function main() {
   // Upload files
   let success = true;
   for (const file of files) {
-    const uploaded = await uploadFile(file.local, file.remote);
+    const customMetadata = file.local.endsWith('.onnx') ? bundleMetadata(file.local) : undefined;
+    const uploaded = await uploadFile(file.local, file.remote, customMetadata);
     if (!uploaded) {
       success = false;
     }
@@ -4,7 +4,7 @@
  */
 
 import * as ort from 'onnxruntime-node';
-import { getStorage, ref, getDownloadURL } from 'firebase/storage';
+import { getStorage, ref, getDownloadURL, getBytes, getMetadata } from 'firebase/storage';
 import { storage } from './firebase';
 import { DailyMetrics, UserProfile, ModelFeatures, TssPrediction } from '@/types';
 
@@ -20,6 +20,28 @@ const MODEL_CONFIG = {
 let cachedSession: ort.InferenceSession | null = null;
 let modelMetadata: any | null = null;
 let lastLoadTime: number = 0;
+let cachedModelHash: string | null = null;
+
+/**
+ * Model metadata from the storage object's custom metadata, set from the
+ * bundle manifest by scripts/upload-to-storage.js (values are strings;
+ * features is JSON-encoded)
+ */
+function bundleMetadata(customMetadata?: Record<string, string>): any | null {
+  if (!customMetadata?.features) {
+    return null;
+  }
+  try {
+    return {
+      ...customMetadata,
+      features: JSON.parse(customMetadata.features),
+      baseScore: Number(customMetadata.baseScore),
+      revision: Number(customMetadata.revision),
+    };
+  } catch {
+    return null;
+  }
+}
 
 /**
  * Load model metadata from Firebase Storage
@@ -42,6 +64,9 @@ async function loadModelMetadata(): Promise<any> {
 
 /**
  * Load ONNX model from Firebase Storage
+ *
+ * After the cache period only the object metadata is fetched; the model is
+ * downloaded again only if its hash changed.
  */
 async function loadModel(): Promise<ort.InferenceSession> {
   const now = Date.now();
@@ -52,29 +77,42 @@ async function loadModel(): Promise<ort.InferenceSession> {
     return cachedSession;
   }
   
+  const modelRef = ref(storage, MODEL_CONFIG.path);
+  
+  // One small request: content hash and bundle metadata
+  let storageMetadata = null;
+  try {
+    storageMetadata = await getMetadata(modelRef);
+  } catch (error) {
+    console.warn('⚠️  Could not check model metadata:', error);
+  }
+  const modelHash = storageMetadata?.customMetadata?.sha256 ?? storageMetadata?.md5Hash ?? null;
+  
+  if (cachedSession && modelHash && modelHash === cachedModelHash) {
+    console.log('📦 Model unchanged, keeping cached session');
+    lastLoadTime = now;
+    return cachedSession;
+  }
+  
   console.log('🔄 Loading ONNX model from Firebase Storage...');
   
   try {
-    // Get download URL
-    const modelRef = ref(storage, MODEL_CONFIG.path);
-    const url = await getDownloadURL(modelRef);
-    
     // Fetch model file
-    const response = await fetch(url);
-    const arrayBuffer = await response.arrayBuffer();
+    const arrayBuffer = await getBytes(modelRef);
     
     // Create ONNX session
-    const session = await ort.InferenceSession.create(arrayBuffer, {
+    const session = await ort.InferenceSession.create(new Uint8Array(arrayBuffer), {
       executionProviders: ['cpu'], // Use CPU for Node.js
       graphOptimizationLevel: 'all',
     });
     
     // Cache the session
     cachedSession = session;
+    cachedModelHash = modelHash;
     lastLoadTime = now;
     
-    // Load metadata
-    modelMetadata = await loadModelMetadata();
+    // Load metadata (bundles carry it in the storage metadata)
+    modelMetadata = bundleMetadata(storageMetadata?.customMetadata) ?? await loadModelMetadata();
     
     console.log('✅ Model loaded successfully');
     console.log('   Input:', session.inputNames);
@@ -192,7 +230,7 @@ export async function predictTSS(
     // Convert to array
     const featureArray = featuresToArray(
       features,
-      modelMetadata?.feature_names
+      modelMetadata?.features ?? modelMetadata?.feature_names
     );
     
     // Prepare input tensor
@@ -280,5 +318,6 @@ export function clearModelCache(): void {
   cachedSession = null;
   modelMetadata = null;
   lastLoadTime = 0;
+  cachedModelHash = null;
   console.log('🗑️  Model cache cleared');
 }